@@ -0,0 +1,84 @@
+import itertools
+import re
+from collections import namedtuple
+
+# TfidfVectorizer's default token pattern, applied to lowercased text
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+TOKEN_RE = re.compile(TOKEN_PATTERN)
+# Sentence-ending punctuation runs and citation markers, found in one pass
+MARKER_RE = re.compile(r"[.!?]+|\[\d+\]|\(\d{4}\)")
+
+TextStats = namedtuple("TextStats", "word_count sentence_count avg_words has_citations tokens")
+
+
+def analyze_text(text, tokenize=True):
+    # One analysis stage per article: every statistic is computed once and
+    # the token stream is handed on to the vectorizer instead of being
+    # re-tokenized. Each scan is a single C-level regex/split pass, which
+    # in CPython beats classifying one combined match stream in Python.
+    word_count = len(text.split())
+    sentence_breaks, has_citations = _count_markers(text)
+    # Callers that vectorize some other way (e.g. long documents scored in
+    # windows) can skip building the token list
+    tokens = TOKEN_RE.findall(text.lower()) if tokenize else None
+    return _text_stats(word_count, sentence_breaks, has_citations, tokens)
+
+
+def analyze_words(words, batch_words=4096):
+    # analyze_text(text, tokenize=False) over a stream of whitespace-separated
+    # words (see chunked.iter_words), so long documents are never split into
+    # one list. No marker contains whitespace, so scanning space-joined
+    # batches of words finds the same markers as scanning the whole text.
+    words = iter(words)
+    word_count = sentence_breaks = 0
+    has_citations = False
+    while True:
+        batch = list(itertools.islice(words, batch_words))
+        if not batch:
+            break
+        word_count += len(batch)
+        breaks, citations = _count_markers(" ".join(batch))
+        sentence_breaks += breaks
+        has_citations = has_citations or citations
+    return _text_stats(word_count, sentence_breaks, has_citations, None)
+
+
+def _count_markers(text):
+    sentence_breaks = 0
+    has_citations = False
+    for marker in MARKER_RE.findall(text):
+        if marker[0] in "[(":
+            has_citations = True
+        else:
+            sentence_breaks += 1
+    return sentence_breaks, has_citations
+
+
+def _text_stats(word_count, sentence_breaks, has_citations, tokens):
+    sentence_count = sentence_breaks + 1  # same count re.split(r'[.!?]+', ...) gives
+    avg_words = round(word_count/max(1, sentence_count), 1)
+    return TextStats(word_count, sentence_count, avg_words, has_citations, tokens)
+
+
+def calculate_reliability_score(text, stats=None):
+    # Simplified example - you could implement more sophisticated metrics
+    if stats is None:
+        stats = analyze_text(text)
+    factors = {
+        'length': min(stats.word_count, 500) / 500,  # Longer text gets higher score up to 500 words
+        'has_citations': 1 if stats.has_citations else 0,
+        'sentiment_balance': 0.7,  # Placeholder for sentiment analysis
+        'source_credibility': 0.8,  # Placeholder for source checking
+    }
+    
+    # Weighted average
+    weights = {'length': 0.2, 'has_citations': 0.3, 'sentiment_balance': 0.2, 'source_credibility': 0.3}
+    score = sum(factor * weights[key] for key, factor in factors.items())
+    return min(max(score, 0), 1)  # Ensure between 0 and 1
+
+
+def content_statistics(text, stats=None):
+    # Word, sentence and average sentence length shown in the result view
+    if stats is None:
+        stats = analyze_text(text)
+    return stats.word_count, stats.sentence_count, stats.avg_words
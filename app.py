@@ -1,8 +1,26 @@
 import streamlit as st
-import joblib
 import pandas as pd
-import time
-import re
+import os
+import html
+import logging
+from contextlib import nullcontext
+
+from analysis import analyze_text, analyze_words, calculate_reliability_score
+from chunked import AGGREGATION_RULES, iter_text_chunks, iter_words, score_long_document
+from cache import CachedPrediction, PredictionCache, normalize_text, score_with_cache
+from dedup import NearDuplicateIndex
+from explain import Explainer, feature_terms
+from metrics import INPUT_CHARS, REGISTRY, REQUEST_SECONDS, REQUESTS, cache_collector, observe_stages, start_http_server, start_textfile_writer
+from profiler import profiler_from_env
+from hashing import read_labeled
+from ingest import UrlCache, fetch_articles
+from jobs import FINISHED, JobManager
+from online import FeedbackLog, OnlineLearner
+from pipeline import MODEL_PATH, default_vectorizer_path, predict_with_proba, vectorize_analyzed
+from registry import ModelManager, ModelRegistry
+from timing import StageTimer
+
+logging.basicConfig(level=logging.INFO)
 
 # Page configuration
 st.set_page_config(
@@ -130,21 +148,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Helper functions
-def calculate_reliability_score(text):
-    # Simplified example - you could implement more sophisticated metrics
-    factors = {
-        'length': min(len(text.split()), 500) / 500,  # Longer text gets higher score up to 500 words
-        'has_citations': 1 if re.search(r'\[\d+\]|\(\d{4}\)', text) else 0,
-        'sentiment_balance': 0.7,  # Placeholder for sentiment analysis
-        'source_credibility': 0.8,  # Placeholder for source checking
-    }
-    
-    # Weighted average
-    weights = {'length': 0.2, 'has_citations': 0.3, 'sentiment_balance': 0.2, 'source_credibility': 0.3}
-    score = sum(factor * weights[key] for key, factor in factors.items())
-    return min(max(score, 0), 1)  # Ensure between 0 and 1
+# Articles longer than this are scored in overlapping windows (see chunked.py)
+LONG_DOCUMENT_CHARS = 20_000
 
+# Helper functions
 def get_confidence_color(confidence):
     if confidence > 0.8:
         return "#10B981"  # Green
@@ -153,18 +160,122 @@ def get_confidence_color(confidence):
     else:
         return "#EF4444"  # Red
 
-# Load models
+# Serve the promoted registry version (or the local artifacts); a watcher
+# thread swaps in new versions without a restart
 @st.cache_resource
-def load_models():
+def load_model_manager():
     try:
-        vectorizer = joblib.load("vectorizer.jb")
-        model = joblib.load("model.jb")
-        return vectorizer, model
+        return ModelManager(ModelRegistry(), fallback_paths=(default_vectorizer_path(), MODEL_PATH)).start()
     except Exception as e:
         st.error(f"Error loading models: {e}")
-        return None, None
+        return None
+
+# Both are keyed on the fingerprint of the model a request was served with,
+# passed to every lookup from the `serving` snapshot below
+@st.cache_resource
+def load_prediction_cache():
+    # Set FAKENEWS_CACHE_DB to a file path to keep predictions across restarts
+    return PredictionCache(capacity=10_000, path=os.environ.get("FAKENEWS_CACHE_DB"), fingerprint_fn=None)
+
+@st.cache_resource
+def load_near_duplicate_index():
+    # Set FAKENEWS_DEDUP_INDEX to a path prefix to memory-map the index from
+    # disk; it is flushed there periodically and at shutdown
+    index = NearDuplicateIndex(
+        capacity=50_000,
+        path=os.environ.get("FAKENEWS_DEDUP_INDEX"),
+        fingerprint_fn=None,
+    )
+    index.start_flusher()
+    return index
+
+@st.cache_resource(max_entries=2)
+def load_feature_terms(_vectorizer, vectorizer_fingerprint):
+    # Inverse vocabulary for explanations, built once per vectorizer file;
+    # online updates only change the model, so they reuse it
+    return feature_terms(_vectorizer)
+
+@st.cache_resource
+def load_feedback_log():
+    # Set FAKENEWS_FEEDBACK_LOG to a JSONL path to keep reviewer corrections
+    return FeedbackLog(os.environ.get("FAKENEWS_FEEDBACK_LOG"))
 
-vectorizer, model = load_models()
+@st.cache_resource(max_entries=2)
+def load_online_learner(_model_manager, _feedback_log, base_version, base_fingerprint, base_promotion):
+    # Online updates need FAKENEWS_HOLDOUT (a labeled file) as their guardrail.
+    # Keyed on the base version and its promotion, so promoting a new version
+    # or rolling back starts a new learner; a restart resumes the last one
+    # from its checkpoints and the feedback log.
+    holdout_path = os.environ.get("FAKENEWS_HOLDOUT")
+    if not holdout_path:
+        return None
+    base_key = (base_version, base_fingerprint, base_promotion)
+
+    def publish(learner):
+        # The promotion is part of the fingerprint: step n after a rollback
+        # has other weights than step n before it, and must not share cache entries
+        fingerprint = f"{base_fingerprint}+{base_promotion or 'local'}.{learner.step}"
+        _model_manager.publish(learner.version, fingerprint, learner.scorer, base_key)
+
+    base = _model_manager.active
+    learner = OnlineLearner(
+        base.vectorizer, base.model, holdout=read_labeled(holdout_path),
+        base_version=base_version, base_fingerprint=base_fingerprint, base_promotion=base_promotion,
+        checkpoint_dir=os.environ.get("FAKENEWS_CHECKPOINT_DIR"), feedback_log=_feedback_log, on_update=publish,
+    )
+    if learner.step:
+        publish(learner)
+    return learner
+
+@st.cache_resource
+def load_url_cache():
+    return UrlCache(capacity=1000)
+
+@st.cache_resource
+def load_job_manager(_model_manager):
+    # Bulk jobs outlive script reruns. FAKENEWS_JOB_DIR keeps uploads and
+    # results somewhere other than a temp dir; FAKENEWS_JOB_WORKERS sets the
+    # scoring processes per job (default: one per core).
+    if _model_manager is None:
+        return None
+    return JobManager(
+        _model_manager,
+        workdir=os.environ.get("FAKENEWS_JOB_DIR"),
+        workers=int(os.environ.get("FAKENEWS_JOB_WORKERS", "0")) or None,
+    )
+
+model_manager = load_model_manager()
+# Read once per script run, so a swap mid-request never mixes versions
+serving = model_manager.active if model_manager is not None else None
+vectorizer, model = (serving.vectorizer, serving.model) if serving is not None else (None, None)
+model_version = serving.version if serving is not None else None
+model_fingerprint = serving.fingerprint if serving is not None else None
+explainer = Explainer(vectorizer, model, load_feature_terms(vectorizer, serving.vectorizer_fingerprint)) if serving is not None else None
+prediction_cache = load_prediction_cache()
+near_duplicate_index = load_near_duplicate_index()
+feedback_log = load_feedback_log()
+online_learner = load_online_learner(model_manager, feedback_log, *model_manager.base_key) if model_manager is not None else None
+url_cache = load_url_cache()
+job_manager = load_job_manager(model_manager)
+
+@st.cache_resource
+def start_instrumentation(_model_manager, _prediction_cache, _near_duplicate_index, _job_manager):
+    # Registered once per process. FAKENEWS_METRICS_PORT serves /metrics,
+    # FAKENEWS_METRICS_FILE rewrites a textfile-collector file, and
+    # FAKENEWS_PROFILE_SLOW_MS dumps stacks of slower analyses.
+    REGISTRY.register_collector(cache_collector("prediction_cache", _prediction_cache.stats))
+    REGISTRY.register_collector(cache_collector("near_duplicate", _near_duplicate_index.stats))
+    if _model_manager is not None:
+        REGISTRY.register_collector(_model_manager.collect_metrics)
+    if _job_manager is not None:
+        REGISTRY.register_collector(_job_manager.collect_metrics)
+    if os.environ.get("FAKENEWS_METRICS_PORT"):
+        start_http_server(int(os.environ["FAKENEWS_METRICS_PORT"]))
+    if os.environ.get("FAKENEWS_METRICS_FILE"):
+        start_textfile_writer(os.environ["FAKENEWS_METRICS_FILE"])
+    return profiler_from_env()
+
+profiler = start_instrumentation(model_manager, prediction_cache, near_duplicate_index, job_manager)
 
 # Sidebar with improved content and no image
 with st.sidebar:
@@ -215,6 +326,23 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+    if serving is not None:
+        st.caption(f"Serving model version {serving.version} ({serving.fingerprint[:8]})")
+
+    with st.expander("Prediction cache"):
+        cache_stats = prediction_cache.stats()
+        st.caption(
+            f"{cache_stats['size']}/{cache_stats['capacity']} entries · "
+            f"{cache_stats['hits']} hits ({cache_stats['disk_hits']} from disk) · "
+            f"{cache_stats['misses']} misses · {cache_stats['evictions']} evictions · "
+            f"hit rate {cache_stats['hit_rate']*100:.0f}%"
+        )
+        dedup_stats = near_duplicate_index.stats()
+        st.caption(
+            f"Near-duplicates: {dedup_stats['size']}/{dedup_stats['capacity']} articles · "
+            f"{dedup_stats['hits']} matches · {dedup_stats['evictions']} evictions"
+        )
+
 # Main content
 col1, col2, col3 = st.columns([1, 3, 1])
 with col2:
@@ -222,42 +350,152 @@ with col2:
     st.markdown('<p class="sub-header">AI-powered analysis to identify misinformation in news articles</p>', unsafe_allow_html=True)
 
 # Tabs with improved design
-tab1, tab2 = st.tabs(["📝 Analyze Content", "📊 Results Interpretation"])
+tab1, tab2, tab3 = st.tabs(["📝 Analyze Content", "📊 Results Interpretation", "📦 Bulk Analysis"])
 
 with tab1:
-    input_method = st.radio("Select input method:", ["Text", "URL"], horizontal=True)
+    input_method = st.radio("Select input method:", ["Text", "URL", "URL List"], horizontal=True)
     
     if input_method == "Text":
         news_input = st.text_area("Enter the news article text:", height=200, 
                                 placeholder="Paste the full text of the news article here for analysis...")
+    elif input_method == "URL":
+        news_input = st.text_input("Enter news article URL:", placeholder="https://example.com/news-article")
     else:
-        news_url = st.text_input("Enter news article URL:", placeholder="https://example.com/news-article")
-        news_input = news_url  # In a real app, you'd fetch and process the URL content
+        news_input = st.text_area("Enter news article URLs, one per line:", height=200,
+                                placeholder="https://example.com/news-article\nhttps://example.org/another-story")
+    
+    if input_method != "URL List":
+        with st.expander("Long document options"):
+            aggregation_rule = st.selectbox(
+                "How window scores are combined for long articles:", AGGREGATION_RULES,
+                help=f"Texts over {LONG_DOCUMENT_CHARS:,} characters are scored in overlapping windows.")
     
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
         predict_button = st.button("Analyze Article", use_container_width=True)
 
-    if predict_button:
+    if predict_button and input_method == "URL List":
+        urls = [line.strip() for line in news_input.splitlines() if line.strip()]
+        if urls:
+            with st.spinner(f"Fetching {len(urls)} articles..."):
+                articles = fetch_articles(urls, cache=url_cache)
+            
+            # Score every successfully extracted article in one batch
+            fetched = [a for a in articles if not a.error and a.text.strip()]
+            verdicts = {}
+            if fetched:
+                labels, probas = score_with_cache(prediction_cache, vectorizer, model, [a.text for a in fetched],
+                                                  model_fingerprint)
+                verdicts = {a.url: (label, row) for a, label, row in zip(fetched, labels, probas)}
+                for article in fetched:
+                    INPUT_CHARS.observe(len(article.text), source="app")
+                REQUESTS.inc(len(fetched), source="app", outcome="url_list")
+            
+            rows = []
+            for article in articles:
+                label, row = verdicts.get(article.url, (None, None))
+                rows.append({
+                    "URL": article.url,
+                    "Title": article.title,
+                    "Verdict": ("Real" if label == 1 else "Fake") if label is not None else "",
+                    "Confidence": f"{max(row)*100:.1f}%" if row is not None else "",
+                    "Words": len(article.text.split()),
+                    "Status": article.error or ("No article text found" if not article.text.strip() else "OK"),
+                    "Model": model_version if label is not None else "",
+                })
+            st.markdown("### Analysis Results")
+            st.caption(f"Analyzed {len(fetched)} of {len(articles)} URLs")
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.warning("Please enter at least one URL to analyze.")
+
+    elif predict_button:
+        fetch_failed = False
+        if input_method == "URL" and news_input.strip():
+            with st.spinner("Fetching article content..."):
+                article = fetch_articles([news_input], cache=url_cache)[0]
+            if article.error:
+                st.error(f"Could not fetch the article: {article.error}")
+            elif not article.text.strip():
+                st.error("No article text could be extracted from this page.")
+            else:
+                st.caption(f"Fetched **{article.title or article.url}** ({len(article.text.split())} words)")
+            fetch_failed = bool(article.error) or not article.text.strip()
+            news_input = article.text
+        
         if news_input and news_input.strip():
-            with st.spinner("Analyzing article content..."):
-                # Progress bar with improved visual feedback
-                progress_bar = st.progress(0)
-                for i in range(100):
-                    time.sleep(0.01)  # Simulating analysis time
-                    progress_bar.progress(i + 1)
+            # Stack sampling of slow analyses; the session is stopped even when
+            # the script run is interrupted (st.stop, st.rerun or an error)
+            profiled = profiler.profile("analysis") if profiler is not None else nullcontext()
+            with st.spinner("Analyzing article content..."), profiled:
+                # Progress bar driven by real stage completion
+                progress_bar = st.progress(0, text="Analyzing text...")
+                stage_labels = {
+                    "analyze": "Vectorizing...",
+                    "vectorize": "Scoring...",
+                    "score": "Checking reliability signals...",
+                    "reliability": "Rendering results...",
+                    "render": "Done",
+                }
+                timer = StageTimer(on_stage=lambda name, t: progress_bar.progress(t.fraction_done, text=stage_labels[name]))
+                
+                # One pass over the text gives the statistics and the tokens
+                with timer.stage("analyze"):
+                    long_document = len(news_input) > LONG_DOCUMENT_CHARS
+                    if long_document:
+                        # Streamed word by word, like the windows scored below
+                        text_stats = analyze_words(iter_words(iter_text_chunks(news_input)))
+                    else:
+                        text_stats = analyze_text(news_input)
+                    near_duplicate = None
+                    if long_document:
+                        # Window scores depend on the aggregation rule, so they bypass the cache
+                        cached, cache_hit = None, False
+                    else:
+                        normalized_input = normalize_text(news_input)
+                        cached = prediction_cache.get(normalized_input, model_fingerprint)
+                        if cached is None:
+                            # Lightly edited re-posts reuse the verdict of the story they copy
+                            signature = near_duplicate_index.signature(tokens=text_stats.tokens)
+                            near_duplicate = near_duplicate_index.query(signature=signature, fingerprint=model_fingerprint)
+                            if near_duplicate is not None:
+                                # The stored terms would describe the other article, so none are shown
+                                cached = CachedPrediction(near_duplicate.label, near_duplicate.proba)
+                        cache_hit = cached is not None
                 
-                # Make prediction
-                transform_input = vectorizer.transform([news_input])
-                prediction = model.predict(transform_input)
-                proba = model.predict_proba(transform_input)[0]
+                # Make prediction (both stages are skipped on a cache hit;
+                # long documents are vectorized window by window while scoring)
+                with timer.stage("vectorize"):
+                    if not cache_hit and not long_document:
+                        transform_input = vectorize_analyzed(vectorizer, [normalized_input], [text_stats])
+                with timer.stage("score"):
+                    if long_document:
+                        long_result = score_long_document(vectorizer, model, news_input, rule=aggregation_rule)
+                        cached = CachedPrediction(long_result.label, [long_result.prob_fake, long_result.prob_real])
+                    elif not cache_hit:
+                        labels, probas = predict_with_proba(model, transform_input)
+                        explanation = explainer.explain(transform_input, top_k=5, texts=[normalized_input])[0]
+                        cached = CachedPrediction(int(labels[0]), probas[0], explanation)
+                        prediction_cache.put(normalized_input, cached.label, cached.proba, fingerprint=model_fingerprint,
+                                             explanation=explanation)
+                        if signature is not None:
+                            near_duplicate_index.add(cached.label, cached.proba, signature=signature,
+                                                     fingerprint=model_fingerprint)
+                    prediction, proba, explanation = [cached.label], cached.proba, cached.explanation
                 
                 # Calculate confidence and reliability
-                confidence = proba[1] if prediction[0] == 1 else proba[0]
-                reliability_score = calculate_reliability_score(news_input)
+                with timer.stage("reliability"):
+                    confidence = proba[1] if prediction[0] == 1 else proba[0]
+                    reliability_score = calculate_reliability_score(news_input, text_stats)
+                    word_count, sentence_count, avg_words = text_stats.word_count, text_stats.sentence_count, text_stats.avg_words
                 
+                timer.start("render")
                 # Display result with enhanced visual design
                 st.markdown("### Analysis Result")
+                st.caption(f"Model version {model_version}")
+                if near_duplicate is not None:
+                    st.caption(f"Matched a previously analyzed article ({near_duplicate.similarity*100:.0f}% similar); "
+                               "its verdict was reused.")
                 
                 if prediction[0] == 1:
                     st.markdown(f"""
@@ -307,10 +545,6 @@ with tab1:
                     """.format(reliability_score*100, reliability_score*100, get_confidence_color(reliability_score)), unsafe_allow_html=True)
                     
                     # Content statistics
-                    word_count = len(news_input.split())
-                    sentence_count = len(re.split(r'[.!?]+', news_input))
-                    avg_words = round(word_count/max(1, sentence_count), 1)
-                    
                     st.markdown("""
                     <div class="metric-card">
                         <div class="metric-title">Content Statistics</div>
@@ -332,48 +566,61 @@ with tab1:
                     """.format(word_count, sentence_count, avg_words), unsafe_allow_html=True)
                 
                 with col2:
-                    # Credibility factors visualization
-                    factors = {
-                        'Source Credibility': 0.8,
-                        'Factual Content': 0.75 if prediction[0] == 1 else 0.4,
-                        'Neutral Language': 0.7 if prediction[0] == 1 else 0.3,
-                        'Internal Consistency': 0.85 if prediction[0] == 1 else 0.5
-                    }
-                    
+                    # Terms whose TF-IDF weight times the model coefficient moved the decision most
                     st.markdown("""
                     <div class="metric-card">
-                        <div class="metric-title">Credibility Factors</div>
+                        <div class="metric-title">Top Contributing Terms</div>
                     """, unsafe_allow_html=True)
                     
-                    for factor, score in factors.items():
-                        st.markdown(f"""
-                        <div style="margin-bottom: 0.5rem;">
-                            <div style="display: flex; justify-content: space-between; margin-bottom: 0.2rem;">
-                                <span style="font-size: 0.9rem;">{factor}</span>
-                                <span style="font-size: 0.9rem; font-weight: 600;">{score*100:.0f}%</span>
+                    if long_document:
+                        st.caption("Term contributions are not computed for long documents scored in windows.")
+                    elif explanation is None:
+                        st.caption("Term contributions are not stored for verdicts reused from another article.")
+                    else:
+                        contributing = explanation.real_terms + explanation.fake_terms
+                        largest = max((abs(t.contribution) for t in contributing), default=1.0)
+                        for term in contributing:
+                            color = "#10B981" if term.contribution > 0 else "#EF4444"
+                            st.markdown(f"""
+                            <div style="margin-bottom: 0.5rem;">
+                                <div style="display: flex; justify-content: space-between; margin-bottom: 0.2rem;">
+                                    <span style="font-size: 0.9rem;">{html.escape(term.term)} <span style="color: #6B7280;">→ {'Real' if term.contribution > 0 else 'Fake'}</span></span>
+                                    <span style="font-size: 0.9rem; font-weight: 600;">{term.contribution:+.2f}</span>
+                                </div>
+                                <div style="width: 100%; background-color: #E5E7EB; height: 6px; border-radius: 3px;">
+                                    <div style="width: {abs(term.contribution)/largest*100}%; background-color: {color}; height: 6px; border-radius: 3px;"></div>
+                                </div>
                             </div>
-                            <div style="width: 100%; background-color: #E5E7EB; height: 6px; border-radius: 3px;">
-                                <div style="width: {score*100}%; background-color: {get_confidence_color(score)}; height: 6px; border-radius: 3px;"></div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                            """, unsafe_allow_html=True)
                     
                     st.markdown("</div>", unsafe_allow_html=True)
                     
                     # Key findings
                     finding_color = "#10B981" if prediction[0] == 1 else "#EF4444"
-                    finding_text = "multiple credibility indicators" if prediction[0] == 1 else "potential misinformation signals"
+                    if long_document:
+                        finding_text = f"Verdict combined from {long_result.windows} windows ({long_result.rule} rule)"
+                        balance_text = f"Document-level fake probability is {long_result.prob_fake*100:.0f}%"
+                    elif explanation is None:
+                        finding_text = "Verdict reused from a previously analyzed article"
+                        balance_text = f"Fake probability is {proba[0]*100:.0f}%"
+                    else:
+                        verdict_terms = explanation.real_terms if prediction[0] == 1 else explanation.fake_terms
+                        finding_text = (f"Strongest {'Real' if prediction[0] == 1 else 'Fake'} signal: "
+                                        f"'{html.escape(verdict_terms[0].term)}'" if verdict_terms
+                                        else "No vocabulary terms support this verdict; it reflects the model baseline")
+                        balance_text = (f"Terms add {explanation.real_total:+.2f} toward Real and "
+                                        f"{explanation.fake_total:+.2f} toward Fake (baseline {explanation.intercept:+.2f})")
                     
                     st.markdown(f"""
                     <div class="metric-card">
                         <div class="metric-title">Key Findings</div>
                         <div style="display: flex; align-items: center; margin-top: 0.5rem;">
                             <div style="width: 12px; height: 12px; border-radius: 50%; background-color: {finding_color}; margin-right: 8px;"></div>
-                            <div>Analysis detected {finding_text}</div>
+                            <div>{finding_text}</div>
                         </div>
                         <div style="display: flex; align-items: center; margin-top: 0.5rem;">
                             <div style="width: 12px; height: 12px; border-radius: 50%; background-color: #3B82F6; margin-right: 8px;"></div>
-                            <div>Content structure {'supports' if prediction[0] == 1 else 'challenges'} credibility</div>
+                            <div>{balance_text}</div>
                         </div>
                         <div style="display: flex; align-items: center; margin-top: 0.5rem;">
                             <div style="width: 12px; height: 12px; border-radius: 50%; background-color: {'#10B981' if reliability_score > 0.6 else '#FBBF24'}; margin-right: 8px;"></div>
@@ -402,8 +649,67 @@ with tab1:
                         <p style="font-weight: 600; color: #FBBF24;">Our analysis is inconclusive. We strongly recommend verifying this information with established news sources.</p>
                     </div>
                     """, unsafe_allow_html=True)
-        else:
+                
+                if long_document:
+                    # Windows that pushed the verdict hardest in its direction
+                    st.markdown("### Segments That Drove the Decision")
+                    st.caption(f"Scored {long_result.windows} overlapping windows of up to 400 words, "
+                               f"combined with the '{long_result.rule}' rule.")
+                    segments = long_result.real_segments if prediction[0] == 1 else long_result.fake_segments
+                    for segment in segments:
+                        st.markdown(f"""
+                        <div class="metric-card">
+                            <div class="metric-title">Words {segment['start_word']:,}–{segment['end_word']:,} · {segment['prob_fake']*100:.0f}% fake probability</div>
+                            <div style="font-size: 0.9rem; color: #4B5563;">{html.escape(segment['preview'])}…</div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                timer.stop()
+                
+                # Per-stage latencies for this request
+                observe_stages("app", timer.timings)
+                REQUEST_SECONDS.observe(timer.total, source="app")
+                INPUT_CHARS.observe(len(news_input), source="app")
+                REQUESTS.inc(source="app", outcome="long_document" if long_document else
+                             "near_duplicate" if near_duplicate is not None else
+                             "cache_hit" if cache_hit else "scored")
+                timer.log(model_version=model_version, cache_hit=cache_hit, near_duplicate=near_duplicate is not None, chars=len(news_input))
+                with st.expander(f"Analysis timing ({timer.total*1000:.1f} ms total)"):
+                    st.table(pd.DataFrame(
+                        {"Stage": list(timer.timings), "Latency (ms)": [round(s * 1000, 2) for s in timer.timings.values()]}
+                    ))
+                st.session_state["last_analysis"] = {
+                    "text": news_input, "label": int(prediction[0]), "model_version": model_version,
+                }
+        elif not fetch_failed:
             st.warning("Please enter an article to analyze.")
+    
+    # Reviewer corrections for the most recent verdict feed the online learner
+    last_analysis = st.session_state.get("last_analysis")
+    if last_analysis is not None and input_method != "URL List":
+        with st.expander("Reviewer feedback"):
+            with st.form("feedback"):
+                correct_label = st.radio("Correct label for the last analyzed article:", ["Real", "Fake"],
+                                         index=0 if last_analysis["label"] == 1 else 1, horizontal=True)
+                if st.form_submit_button("Submit correction"):
+                    label = 1 if correct_label == "Real" else 0
+                    if online_learner is not None:
+                        update = online_learner.record(last_analysis["text"], label, last_analysis["label"],
+                                                       last_analysis["model_version"])
+                    else:
+                        feedback_log.append(last_analysis["text"], label, last_analysis["label"],
+                                            last_analysis["model_version"])
+                    if online_learner is None:
+                        st.caption("Feedback recorded. Online updates are off until FAKENEWS_HOLDOUT names a labeled file.")
+                    elif update is None:
+                        learner_stats = online_learner.stats()
+                        st.caption(f"Feedback recorded; {learner_stats['pending']}/{learner_stats['batch_size']} "
+                                   "corrections until the next model update.")
+                    elif update.accepted:
+                        st.success(f"Model updated to {online_learner.version} in {update.seconds*1000:.0f} ms "
+                                   f"(held-out accuracy {update.holdout['accuracy']*100:.1f}%).")
+                    else:
+                        st.warning(f"Update rejected: held-out accuracy fell to {update.holdout['accuracy']*100:.1f}% "
+                                   f"(baseline {online_learner.baseline['accuracy']*100:.1f}%).")
 
 with tab2:
     st.markdown("### Understanding Your Results")
@@ -420,12 +726,11 @@ with tab2:
             <li><span style="color: #EF4444; font-weight: 600;">Low Confidence (Below 60%)</span>: The AI cannot make a clear determination</li>
         </ul>
         
-        <h5 style="color: #1E3A8A; margin-top: 1rem;">Reliability Score Components</h5>
+        <h5 style="color: #1E3A8A; margin-top: 1rem;">Top Contributing Terms</h5>
         <ul>
-            <li><strong>Source Credibility</strong>: Indicators of source reputation and authority</li>
-            <li><strong>Factual Content</strong>: Presence of verifiable facts versus unsupported claims</li>
-            <li><strong>Neutral Language</strong>: Level of emotional or sensationalist language</li>
-            <li><strong>Internal Consistency</strong>: How logically consistent the article is</li>
+            <li><strong>Contribution</strong>: A word's TF-IDF weight in the article times the weight the model learned for it</li>
+            <li><strong>Positive values</strong> push the verdict toward Real, <strong>negative values</strong> toward Fake</li>
+            <li><strong>Baseline</strong>: The model's starting point before any words are counted; baseline plus all contributions gives the final score</li>
         </ul>
     </div>
     """, unsafe_allow_html=True)
@@ -473,5 +778,79 @@ with tab2:
     </div>
     """, unsafe_allow_html=True)
 
+with tab3:
+    st.markdown("### Bulk Analysis")
+    st.markdown("Upload a CSV, JSONL or Parquet file of articles. Scoring runs in the background, "
+                "so you can leave this tab, rerun the page or close it while the job finishes.")
+    
+    if job_manager is None:
+        st.error("Bulk analysis is unavailable because the model could not be loaded.")
+    else:
+        upload = st.file_uploader("Articles file", type=["csv", "jsonl", "ndjson", "json", "parquet", "pq"])
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            text_field = st.text_input("Text column", value="text")
+        with col2:
+            id_field = st.text_input("ID column (optional)", value="",
+                                     help="Left empty, rows are identified by their position in the file.")
+        with col3:
+            output_format = st.selectbox("Results format", ["parquet", "csv"],
+                                         format_func=lambda fmt: {"parquet": "Parquet", "csv": "CSV"}[fmt])
+        
+        if st.button("Start Bulk Analysis", disabled=upload is None):
+            job = job_manager.submit(upload.name, upload, text_field=text_field.strip() or "text",
+                                     id_field=id_field.strip() or None, output_format=output_format)
+            st.success(f"Started job for **{job.name}**.")
+        
+        def set_download_prepared(job_id, prepared):
+            st.session_state[f"prepared-{job_id}"] = prepared
+        
+        # Only poll while something is still running; the fragment reruns on
+        # its own, without rerunning the whole page
+        active = any(job.status not in FINISHED for job in job_manager.list_jobs())
+        
+        @st.fragment(run_every=1.0 if active else None)
+        def show_jobs():
+            jobs = job_manager.list_jobs()
+            if not jobs:
+                st.caption("No bulk jobs yet.")
+                return
+            for job in jobs:
+                with st.container(border=True):
+                    st.markdown(f"**{job.name}** · {job.status}"
+                                + (f" · model {job.model_version}" if job.model_version else ""))
+                    total = f"{job.total:,}" if job.total is not None else "?"
+                    progress_text = f"{job.processed:,} / {total} articles · {job.rate:,.0f} articles/sec"
+                    if job.eta is not None:
+                        progress_text += f" · about {job.eta:,.0f}s left"
+                    st.progress(job.fraction_done, text=progress_text)
+                    if job.error:
+                        st.error(job.error)
+                    if job.status not in FINISHED:
+                        st.button("Cancel", key=f"cancel-{job.id}", on_click=job_manager.cancel, args=(job.id,))
+                        continue
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        # The results file is read only after "Prepare download",
+                        # not on every poll of the fragment while other jobs run
+                        prepared_key = f"prepared-{job.id}"
+                        has_results = job.processed and os.path.exists(job.output_path)
+                        if has_results and st.session_state.get(prepared_key):
+                            with open(job.output_path, "rb") as f:
+                                st.download_button(
+                                    f"Download results ({job.processed:,} rows)", f, file_name=job.download_name,
+                                    key=f"download-{job.id}", on_click=set_download_prepared, args=(job.id, False),
+                                    mime="text/csv" if job.output_format == "csv" else "application/octet-stream")
+                        elif has_results:
+                            st.button(f"Prepare download ({job.processed:,} rows)", key=f"prepare-{job.id}",
+                                      on_click=set_download_prepared, args=(job.id, True))
+                    with col2:
+                        st.button("Remove", key=f"remove-{job.id}", on_click=job_manager.remove, args=(job.id,))
+            if active and not any(job.status not in FINISHED for job in jobs):
+                # Everything finished: one full rerun to stop polling
+                st.rerun()
+        
+        show_jobs()
+
 # Footer
 st.markdown('<div class="footer">© 2025 Fake News Detector | For educational purposes only | Developed with AI technology</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""Headless batch scoring for large article corpora.
+
+Usage:
+    python batch_score.py articles.jsonl scores.csv --text-field text --id-field id
+
+Input may be JSONL, CSV or Parquet and is read as a stream. Documents are
+scored in fixed-size chunks (one vectorizer transform and one predict_proba
+call per chunk) and results are written as soon as each chunk is done, so
+memory stays bounded by the chunk size rather than the corpus size.
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import time
+
+from parallel import ParallelScorer
+from pipeline import LABELS, MODEL_PATH, VECTORIZER_PATH, chunked, load_artifacts, score_texts
+
+# Articles can be far longer than the csv module's default 128 KB field limit
+csv.field_size_limit(2**31 - 1)
+
+OUTPUT_FIELDS = ["id", "label", "prob_fake", "prob_real"]
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Cannot infer format from file extension: {path}")
+
+
+def _record_id(record, id_field, row_number, require_id):
+    if not id_field:
+        return row_number
+    if id_field in record:
+        return record[id_field]
+    if require_id:
+        raise ValueError(f"Record {row_number} has no {id_field!r} field")
+    return row_number
+
+
+def _record_label(record, label_field, row_number):
+    # Unlike ids, a missing label has no sensible default
+    if label_field not in record or record[label_field] in (None, ""):
+        raise ValueError(f"Record {row_number} has no label in {label_field!r}")
+    return record[label_field]
+
+
+def _record(record, text_field, id_field, label_field, row_number, require_id):
+    doc_id = _record_id(record, id_field, row_number, require_id)
+    text = record.get(text_field) or ""
+    if label_field:
+        return doc_id, text, _record_label(record, label_field, row_number)
+    return doc_id, text
+
+
+# Readers yield (doc_id, text) pairs one record at a time, or (doc_id, text,
+# label) triples when label_field is set. A record without id_field gets its
+# row number as id, or raises when require_id is set.
+def read_jsonl(path, text_field, id_field, require_id=False, label_field=None):
+    # Blank lines are skipped and do not count as rows, as in count_records
+    with open(path, encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        for row_number, record in enumerate(records):
+            yield _record(record, text_field, id_field, label_field, row_number, require_id)
+
+
+def read_csv(path, text_field, id_field, require_id=False, label_field=None):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row_number, record in enumerate(csv.DictReader(f)):
+            yield _record(record, text_field, id_field, label_field, row_number, require_id)
+
+
+def read_parquet(path, text_field, id_field, require_id=False, label_field=None, batch_size=10_000):
+    # A missing column fails in pyarrow whether or not require_id is set
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Reading Parquet input requires pyarrow (pip install pyarrow)")
+
+    fields = [text_field] + [field for field in (id_field, label_field) if field]
+    columns = list(dict.fromkeys(fields))
+    row_number = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        for record in batch.to_pylist():
+            yield _record(record, text_field, id_field, label_field, row_number, require_id)
+            row_number += 1
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "parquet": read_parquet}
+
+
+def read_records(path, text_field="text", id_field=None, fmt=None, require_id=False, label_field=None):
+    return READERS[fmt or detect_format(path)](path, text_field, id_field, require_id, label_field)
+
+
+# Writers append one chunk of result rows at a time
+class JsonlWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        self.f.writelines(json.dumps(row) + "\n" for row in rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class CsvWriter:
+    def __init__(self, path, fieldnames=OUTPUT_FIELDS):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Writing Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.writer = None
+        # One fixed schema for every chunk. Ids are stored as strings, since
+        # inferring per chunk breaks when row-number ids and string ids mix.
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("label", pa.string()),
+            ("prob_fake", pa.float64()),
+            ("prob_real", pa.float64()),
+        ])
+
+    def write_rows(self, rows):
+        rows = [dict(row, id=None if row["id"] is None else str(row["id"])) for row in rows]
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        # An empty corpus still gets a file, with the schema and no rows
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def open_writer(path, fmt=None):
+    return WRITERS[fmt or detect_format(path)](path)
+
+
+def result_rows(ids, proba):
+    for doc_id, (p_fake, p_real) in zip(ids, proba):
+        yield {
+            "id": doc_id,
+            "label": LABELS[int(p_real > p_fake)],
+            "prob_fake": float(p_fake),
+            "prob_real": float(p_real),
+        }
+
+
+def score_stream(records, vectorizer, model, chunk_size=1000):
+    # Yield (ids, proba) per chunk; only one chunk is ever held in memory
+    for chunk in chunked(records, chunk_size):
+        ids = [doc_id for doc_id, _ in chunk]
+        texts = [text for _, text in chunk]
+        yield ids, score_texts(vectorizer, model, texts)
+
+
+def score_stream_parallel(records, scorer, chunk_size=1000):
+    # Same contract as score_stream, but chunks are scored on a ParallelScorer
+    # worker pool. Ids stay in this process and are matched back in order.
+    pending_ids = collections.deque()
+
+    def texts():
+        for chunk in chunked(records, chunk_size):
+            pending_ids.append([doc_id for doc_id, _ in chunk])
+            yield [text for _, text in chunk]
+
+    for proba in scorer.imap(texts()):
+        yield pending_ids.popleft(), proba
+
+
+def run(input_path, output_path, text_field="text", id_field=None, chunk_size=1000,
+        vectorizer_path=VECTORIZER_PATH, model_path=MODEL_PATH, input_format=None,
+        output_format=None, workers=1, bundle_path=None, log=sys.stderr):
+    records = read_records(input_path, text_field, id_field, input_format)
+    scorer = None
+    if workers > 1:
+        scorer = ParallelScorer(workers, vectorizer_path, model_path, bundle_path=bundle_path)
+        results = score_stream_parallel(records, scorer, chunk_size)
+    else:
+        vectorizer, model = load_artifacts(vectorizer_path, model_path, bundle_path=bundle_path)
+        results = score_stream(records, vectorizer, model, chunk_size)
+    writer = open_writer(output_path, output_format)
+
+    total = 0
+    start = time.perf_counter()
+    try:
+        for ids, proba in results:
+            writer.write_rows(list(result_rows(ids, proba)))
+            total += len(ids)
+            elapsed = time.perf_counter() - start
+            print(f"scored {total} docs, {total / elapsed:,.0f} docs/sec", file=log)
+    finally:
+        writer.close()
+        if scorer is not None:
+            scorer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"done: {total} docs in {elapsed:.2f}s ({rate:,.0f} docs/sec)", file=log)
+    return total, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a corpus of news articles in batches.")
+    parser.add_argument("input", help="Input corpus (.jsonl, .csv or .parquet)")
+    parser.add_argument("output", help="Output file (.jsonl, .csv or .parquet)")
+    parser.add_argument("--text-field", default="text", help="Field holding the article text")
+    parser.add_argument("--id-field", default=None, help="Field holding the document id (default: row number)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Documents per transform/predict call")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for tokenizing and scoring (default: 1, in-process)")
+    parser.add_argument("--input-format", choices=sorted(READERS), default=None)
+    parser.add_argument("--output-format", choices=sorted(WRITERS), default=None)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--bundle", default=None,
+                        help="Single-file serving artifact (e.g. model.hash.npz) used instead of --vectorizer/--model")
+    args = parser.parse_args(argv)
+
+    run(args.input, args.output, text_field=args.text_field, id_field=args.id_field,
+        chunk_size=args.chunk_size, vectorizer_path=args.vectorizer, model_path=args.model,
+        input_format=args.input_format, output_format=args.output_format, workers=args.workers,
+        bundle_path=args.bundle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Benchmark and regression check for the scoring path.
+
+    python bench.py                                   # synthetic corpora, default batch sizes
+    python bench.py --corpus articles.jsonl           # add a corpus sampled from real articles
+    python bench.py --output bench.json --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --threshold 0.25
+
+Each stage is timed on its own: artifact cold start (in a fresh interpreter),
+vectorizer.transform, model.predict_proba, calculate_reliability_score, the
+content statistics regexes and the combined analyze_text pass. Every
+measurement is repeated --trials times. For every corpus, stage and batch
+size the report holds the median p50 over the trials, the spread of the
+per-trial p50s (p50_noise_ms), p95/p99 latency per call, docs/sec and how
+much resident memory the stage added (rss_delta_mb). The process-wide peak
+RSS is reported once, since ru_maxrss never goes down and says nothing
+about an individual stage.
+
+With --baseline the run fails (exit code 1) when any p50 latency is more
+than --threshold slower than the stored baseline and the slowdown is larger
+than the trial-to-trial noise of both runs (and than --min-delta-ms).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from analysis import analyze_text, calculate_reliability_score, content_statistics
+from pipeline import MODEL_PATH, VECTORIZER_PATH, load_artifacts
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_LENGTHS = [50, 500, 2000]
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import psutil
+        return psutil.Process().memory_info().rss
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+def synthetic_corpus(vocabulary, n_docs, n_words, seed=0):
+    # Zipf-like word draws from the model vocabulary plus sentence
+    # punctuation and the occasional citation, so every stage does real work
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    docs = []
+    for _ in range(n_docs):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=n_words)
+        for i in range(rng.randint(8, 20), n_words, rng.randint(8, 20)):
+            words[i] += rng.choice([".", "!", "?", ". (2019)", " [3]."])
+        docs.append(" ".join(words))
+    return docs
+
+
+def sampled_corpus(path, n_docs, text_field="text", seed=0):
+    # Reservoir sample so arbitrarily large corpora are read once
+    from batch_score import read_records
+
+    rng = random.Random(seed)
+    sample = []
+    for i, (_, text) in enumerate(read_records(path, text_field)):
+        if len(sample) < n_docs:
+            sample.append(text)
+        else:
+            j = rng.randint(0, i)
+            if j < n_docs:
+                sample[j] = text
+    return sample
+
+
+def time_calls(fn, batches):
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(trials, batch_size=1):
+    # trials is one list of per-call latencies (seconds) per repetition. The
+    # reported p50 is the median of the per-trial p50s and p50_noise_ms their
+    # range, which compare_to_baseline uses as the noise floor.
+    p50s = [float(np.percentile(np.asarray(latencies) * 1000, 50)) for latencies in trials]
+    ms = np.concatenate(trials) * 1000
+    p50 = float(np.median(p50s))
+    return {
+        "calls": len(ms),
+        "p50_ms": p50,
+        "p50_noise_ms": max(p50s) - min(p50s),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "docs_per_sec": batch_size / (p50 / 1000) if p50 > 0 else float("inf"),
+    }
+
+
+def make_batches(docs, batch_size, max_docs):
+    # Enough calls for stable percentiles without timing more than max_docs
+    # documents per measurement (always at least 3 calls)
+    calls = max(3, min(100, max_docs // batch_size))
+    rng = random.Random(batch_size)
+    return [[docs[rng.randrange(len(docs))] for _ in range(batch_size)] for _ in range(calls)]
+
+
+def bench_stages(vectorizer, model, docs, batch_sizes, max_docs, trials=3):
+    stages = {
+        "transform": vectorizer.transform,
+        "predict_proba": None,  # timed on pre-transformed input below
+        "reliability_score": lambda batch: [calculate_reliability_score(text) for text in batch],
+        "content_statistics": lambda batch: [content_statistics(text) for text in batch],
+        "analyze_text": lambda batch: [analyze_text(text) for text in batch],
+    }
+    results = {}
+    for batch_size in batch_sizes:
+        batches = make_batches(docs, batch_size, max_docs)
+        for stage, fn in stages.items():
+            rss_before = current_rss_bytes()
+            if stage == "predict_proba":
+                matrices = [vectorizer.transform(batch) for batch in batches]
+                latencies = [time_calls(model.predict_proba, matrices) for _ in range(trials)]
+                del matrices
+            else:
+                latencies = [time_calls(fn, batches) for _ in range(trials)]
+            stats = summarize(latencies, batch_size)
+            stats["rss_delta_mb"] = (current_rss_bytes() - rss_before) / 2**20
+            results[f"{stage}/{batch_size}"] = stats
+    return results
+
+
+def bench_cold_start(vectorizer_path, model_path, repeats=3):
+    # Each run is a fresh interpreter, so imports and unpickling are included.
+    # The child runs from the repository root so `import pipeline` resolves no
+    # matter where bench.py was started; artifact paths are made absolute first.
+    code = (
+        "import time; start = time.perf_counter(); "
+        "from pipeline import load_artifacts; "
+        f"load_artifacts({os.path.abspath(vectorizer_path)!r}, {os.path.abspath(model_path)!r}); "
+        "print(time.perf_counter() - start)"
+    )
+    latencies = [float(subprocess.check_output([sys.executable, "-c", code], cwd=ROOT).decode())
+                 for _ in range(repeats)]
+    # Every run is its own trial of one call
+    stats = summarize([[latency] for latency in latencies])
+    del stats["docs_per_sec"]
+    return stats
+
+
+def compare_to_baseline(results, baseline, threshold, min_delta_ms=0.05):
+    # Returns a list of (key, baseline_p50, current_p50) for regressed entries.
+    # A slowdown only counts when it is beyond the relative threshold and
+    # larger than the trial-to-trial spread of both runs (baselines written
+    # before trials were recorded count as noiseless) and min_delta_ms.
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        noise = previous.get("p50_noise_ms", 0.0) + current.get("p50_noise_ms", 0.0)
+        if (current["p50_ms"] > previous["p50_ms"] * (1 + threshold)
+                and current["p50_ms"] - previous["p50_ms"] > max(noise, min_delta_ms)):
+            regressions.append((key, previous["p50_ms"], current["p50_ms"]))
+    return regressions
+
+
+def flatten(report):
+    flat = {"cold_start": report["cold_start"]}
+    for corpus, stages in report["corpora"].items():
+        for key, stats in stages.items():
+            flat[f"{corpus}/{key}"] = stats
+    return flat
+
+
+def print_table(report, out=sys.stdout):
+    cold = report["cold_start"]
+    print(f"cold start: p50 {cold['p50_ms']:.1f} ms, p95 {cold['p95_ms']:.1f} ms", file=out)
+    print(f"process peak RSS: {report['meta']['peak_rss_mb']:.1f} MB", file=out)
+    print(f"{'corpus/stage/batch':<42} {'p50 ms':>10} {'+/- ms':>8} {'p95 ms':>10} {'p99 ms':>10} "
+          f"{'docs/s':>12} {'+rss MB':>8}", file=out)
+    for corpus, stages in report["corpora"].items():
+        for key, s in stages.items():
+            print(f"{corpus + '/' + key:<42} {s['p50_ms']:>10.3f} {s['p50_noise_ms']:>8.3f} {s['p95_ms']:>10.3f} "
+                  f"{s['p99_ms']:>10.3f} {s['docs_per_sec']:>12,.0f} {s['rss_delta_mb']:>8.1f}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fake news scoring path.")
+    parser.add_argument("--batch-sizes", default=",".join(map(str, DEFAULT_BATCH_SIZES)))
+    parser.add_argument("--lengths", default=",".join(map(str, DEFAULT_LENGTHS)),
+                        help="Words per synthetic document, one corpus per value")
+    parser.add_argument("--corpus", help="JSONL/CSV/Parquet file to sample real articles from")
+    parser.add_argument("--corpus-size", type=int, default=2000, help="Distinct documents per corpus")
+    parser.add_argument("--max-docs", type=int, default=20000,
+                        help="Approximate number of documents timed per stage and batch size")
+    parser.add_argument("--trials", type=int, default=3,
+                        help="Repetitions of every measurement; the median p50 is reported")
+    parser.add_argument("--cold-start-runs", type=int, default=3)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--save-baseline", help="Also write this run as a new baseline file")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    vectorizer, model = load_artifacts(args.vectorizer, args.model)
+
+    if hasattr(vectorizer, "get_feature_names_out"):
+        vocabulary = list(vectorizer.get_feature_names_out())
+    else:
+        vocabulary = [vectorizer.vocabulary.term(i) for i in range(len(vectorizer.vocabulary))]
+    corpora = {}
+    for length in (int(n) for n in args.lengths.split(",")):
+        corpora[f"synthetic{length}"] = synthetic_corpus(vocabulary, args.corpus_size, length)
+    if args.corpus:
+        corpora["sampled"] = sampled_corpus(args.corpus, args.corpus_size)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": type(model).__name__,
+            "batch_sizes": batch_sizes,
+        },
+        "cold_start": bench_cold_start(args.vectorizer, args.model, args.cold_start_runs),
+        "corpora": {},
+    }
+    for name, docs in corpora.items():
+        print(f"benchmarking {name} ({len(docs)} docs)...", file=sys.stderr)
+        report["corpora"][name] = bench_stages(vectorizer, model, docs, batch_sizes, args.max_docs, args.trials)
+    report["meta"]["peak_rss_mb"] = peak_rss_bytes() / 2**20
+
+    print_table(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = flatten(json.load(f))
+        regressions = compare_to_baseline(flatten(report), baseline, args.threshold, args.min_delta_ms)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: p50 {before:.3f} ms -> {after:.3f} ms "
+                  f"(+{(after / before - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} of baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Prediction cache keyed on article content and model artifacts.
+
+Entries are keyed on a hash of the whitespace-normalized text together with
+a fingerprint of the artifact files, so replacing model.jb or vectorizer.jb
+never serves a verdict made by the old pair. Callers that already hold the
+serving model's fingerprint pass it to get/put, so a lookup always uses the
+same version as the request that makes it. Entries of different versions
+live side by side: a request still running on the previous version (or a
+rollback) does not throw away the current one's entries. Old versions age
+out of the bounded in-memory LRU tier, and fingerprints unused for
+`purge_after` seconds are purged from both tiers, including the optional
+SQLite tier that survives restarts. An entry can carry the explanation of
+its verdict, so a hit needs neither vectorizing nor explaining.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from explain import explanation_dict, explanation_from_dict
+from pipeline import MODEL_PATH, VECTORIZER_PATH, predict_with_proba
+
+CachedPrediction = namedtuple("CachedPrediction", "label proba explanation", defaults=(None,))
+
+
+def normalize_text(text):
+    # Whitespace changes do not affect tokenization or any of the content
+    # statistics, so collapse them before hashing
+    return " ".join(text.split())
+
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# (path, mtime_ns, size) signatures -> content fingerprint, so files are
+# only re-hashed when they actually change on disk
+_fingerprint_memo = {}
+
+
+def artifact_fingerprint(paths=(VECTORIZER_PATH, MODEL_PATH)):
+    signature = tuple((p, os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths)
+    if signature not in _fingerprint_memo:
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        _fingerprint_memo.clear()
+        _fingerprint_memo[signature] = digest.hexdigest()[:16]
+    return _fingerprint_memo[signature]
+
+
+class PredictionCache:
+    def __init__(self, capacity=10_000, path=None, fingerprint_fn=artifact_fingerprint, purge_after=3600.0):
+        self.capacity = capacity
+        self.fingerprint_fn = fingerprint_fn
+        self.purge_after = purge_after
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        # fingerprint -> time.monotonic() of its last get/put
+        self.last_used = {}
+        self.last_purge = time.monotonic()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0  # fingerprints purged
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT, label INTEGER, prob_fake REAL, prob_real REAL, "
+                "explanation TEXT)"
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(predictions)")]
+            if "explanation" not in columns:
+                self.db.execute("ALTER TABLE predictions ADD COLUMN explanation TEXT")
+            self.db.commit()
+            # Versions found on disk get a full purge_after to be used again
+            for (fingerprint,) in self.db.execute("SELECT DISTINCT fingerprint FROM predictions"):
+                self.last_used[fingerprint] = self.last_purge
+
+    def _check_fingerprint(self, fingerprint=None):
+        # Called with the lock held. Resolves the fingerprint, marks it as
+        # used and purges idle ones at most once per purge_after.
+        if fingerprint is None:
+            fingerprint = self.fingerprint_fn()
+        now = time.monotonic()
+        self.last_used[fingerprint] = now
+        if now - self.last_purge >= self.purge_after:
+            self._purge(now - self.purge_after)
+        return fingerprint
+
+    def _purge(self, cutoff):
+        # Called with the lock held. Drops every fingerprint last used before cutoff.
+        self.last_purge = time.monotonic()
+        stale = {fingerprint for fingerprint, used in self.last_used.items() if used < cutoff}
+        if not stale:
+            return
+        for key in [key for key in self.memory if key.rsplit(":", 1)[0] in stale]:
+            del self.memory[key]
+        if self.db is not None:
+            self.db.executemany("DELETE FROM predictions WHERE fingerprint = ?", [(f,) for f in stale])
+            self.db.commit()
+        for fingerprint in stale:
+            del self.last_used[fingerprint]
+        self.invalidations += len(stale)
+
+    def purge(self, max_idle=None):
+        # Drop the entries of every fingerprint not used in the last
+        # max_idle seconds (default purge_after) now
+        with self.lock:
+            self._purge(time.monotonic() - (self.purge_after if max_idle is None else max_idle))
+
+    def get(self, text, fingerprint=None):
+        # Returns a CachedPrediction (label, [prob_fake, prob_real],
+        # explanation or None) or None
+        with self.lock:
+            fingerprint = self._check_fingerprint(fingerprint)
+            key = fingerprint + ":" + text_key(text)
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT label, prob_fake, prob_real, explanation FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    explanation = explanation_from_dict(json.loads(row[3])) if row[3] else None
+                    entry = CachedPrediction(row[0], np.array(row[1:3]), explanation)
+                    self._remember(key, entry)
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, text, label, proba, fingerprint=None, explanation=None):
+        # `explanation` is the explain.Explanation of the verdict, if any
+        with self.lock:
+            fingerprint = self._check_fingerprint(fingerprint)
+            key = fingerprint + ":" + text_key(text)
+            entry = CachedPrediction(int(label), np.asarray(proba, dtype=np.float64), explanation)
+            self._remember(key, entry)
+            if self.db is not None:
+                stored = json.dumps(explanation_dict(explanation)) if explanation is not None else None
+                self.db.execute(
+                    "INSERT OR REPLACE INTO predictions "
+                    "(key, fingerprint, label, prob_fake, prob_real, explanation) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, fingerprint, entry.label, float(entry.proba[0]), float(entry.proba[1]), stored),
+                )
+                self.db.commit()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.last_used.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM predictions")
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.memory),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def score_with_cache(cache, vectorizer, model, texts, fingerprint=None):
+    # Look every text up first, then vectorize and score only the misses in
+    # a single batch. Returns (labels, proba) like predict_with_proba.
+    # `fingerprint` identifies vectorizer/model; by default the cache's
+    # fingerprint_fn is asked.
+    labels = np.zeros(len(texts), dtype=int)
+    proba = np.zeros((len(texts), 2))
+    missing = []
+    for i, text in enumerate(texts):
+        entry = cache.get(text, fingerprint)
+        if entry is None:
+            missing.append(i)
+        else:
+            labels[i], proba[i] = entry.label, entry.proba
+    if missing:
+        X = vectorizer.transform([texts[i] for i in missing])
+        miss_labels, miss_proba = predict_with_proba(model, X)
+        for i, label, row in zip(missing, miss_labels, miss_proba):
+            labels[i], proba[i] = label, row
+            cache.put(texts[i], label, row, fingerprint)
+    return labels, proba
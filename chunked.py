@@ -0,0 +1,174 @@
+"""Streaming scoring for long documents.
+
+Very long articles and transcripts are cut into overlapping word windows
+that are vectorized and scored a few at a time, and the per-window
+probabilities are folded into a document verdict as they arrive. Only the
+current window batch and the top-k segments are held in memory, so
+multi-megabyte inputs (or files read chunk by chunk) stay bounded.
+
+    python chunked.py transcript.txt --rule max-fake --window 400 --overlap 100
+
+Aggregation rules:
+    mean            average P(fake) over windows
+    max-fake        the most fake-looking window decides
+    length-weighted average P(fake) weighted by window word count
+"""
+import argparse
+import heapq
+import itertools
+from collections import deque, namedtuple
+
+from pipeline import LABELS, MODEL_PATH, VECTORIZER_PATH, load_artifacts, predict_with_proba
+
+AGGREGATION_RULES = ["mean", "max-fake", "length-weighted"]
+
+Window = namedtuple("Window", "start_word end_word text")
+ChunkedResult = namedtuple("ChunkedResult", "label prob_fake prob_real rule windows words fake_segments real_segments")
+
+
+def iter_text_chunks(text, chunk_chars=1 << 16):
+    # Slice a large string so it is never split into one giant word list
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+def iter_words(chunks, max_word_chars=1 << 16):
+    # Whitespace-separated words from a stream of text chunks; a word cut
+    # across a chunk boundary is carried over to the next chunk. A carry
+    # longer than max_word_chars (whitespace-free input such as base64) is
+    # flushed as a word so the buffer stays bounded.
+    carry = ""
+    for chunk in chunks:
+        buffer = carry + chunk
+        words = buffer.split()
+        carry = words.pop() if words and not buffer[-1].isspace() else ""
+        yield from words
+        if len(carry) > max_word_chars:
+            yield carry
+            carry = ""
+    if carry:
+        yield carry
+
+
+def iter_windows(words, window_words=400, overlap=100):
+    if not 0 <= overlap < window_words:
+        raise ValueError("overlap must be smaller than the window size")
+    stride = window_words - overlap
+    buffer = deque()
+    start = 0
+    pending = False  # words in buffer not yet covered by an emitted window
+    for word in words:
+        buffer.append(word)
+        pending = True
+        if len(buffer) == window_words:
+            yield Window(start, start + window_words, " ".join(buffer))
+            for _ in range(stride):
+                buffer.popleft()
+            start += stride
+            pending = False
+    if pending:
+        yield Window(start, start + len(buffer), " ".join(buffer))
+
+
+class Aggregator:
+    # Running document verdict under one aggregation rule
+    def __init__(self, rule="mean"):
+        if rule not in AGGREGATION_RULES:
+            raise ValueError(f"Unknown aggregation rule {rule!r}")
+        self.rule = rule
+        self.windows = 0
+        self.total = 0.0
+        self.weight = 0
+        self.max_fake = 0.0
+
+    def add(self, prob_fake, n_words):
+        self.windows += 1
+        self.max_fake = max(self.max_fake, prob_fake)
+        if self.rule == "length-weighted":
+            self.total += prob_fake * n_words
+            self.weight += n_words
+        else:
+            self.total += prob_fake
+            self.weight += 1
+
+    def prob_fake(self):
+        if self.rule == "max-fake":
+            return self.max_fake
+        return self.total / self.weight if self.weight else 0.0
+
+
+def score_long_document(vectorizer, model, chunks, rule="mean", window_words=400, overlap=100,
+                        batch_windows=32, top_k=3, preview_chars=300):
+    # `chunks` is a string or an iterable of text chunks (e.g. a file object)
+    if isinstance(chunks, str):
+        chunks = iter_text_chunks(chunks)
+    aggregator = Aggregator(rule)
+    fake_heap, real_heap = [], []
+    words = 0
+    windows = iter_windows(iter_words(chunks), window_words, overlap)
+    counter = itertools.count()  # tie-breaker so windows are never compared
+
+    while True:
+        batch = list(itertools.islice(windows, batch_windows))
+        if not batch:
+            break
+        _, proba = predict_with_proba(model, vectorizer.transform([w.text for w in batch]))
+        for window, (p_fake, p_real) in zip(batch, proba):
+            n_words = window.end_word - window.start_word
+            aggregator.add(float(p_fake), n_words)
+            words = window.end_word
+            segment = {
+                "start_word": window.start_word,
+                "end_word": window.end_word,
+                "prob_fake": float(p_fake),
+                "preview": window.text[:preview_chars],
+            }
+            # Keep only the top_k most fake-looking and most real-looking windows
+            for heap, key in ((fake_heap, p_fake), (real_heap, p_real)):
+                item = (float(key), next(counter), segment)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heappushpop(heap, item)
+
+    prob_fake = aggregator.prob_fake()
+    label = 0 if prob_fake > 0.5 else 1
+    return ChunkedResult(
+        label=label,
+        prob_fake=prob_fake,
+        prob_real=1.0 - prob_fake,
+        rule=rule,
+        windows=aggregator.windows,
+        words=words,
+        fake_segments=[s for _, _, s in sorted(fake_heap, reverse=True)],
+        real_segments=[s for _, _, s in sorted(real_heap, reverse=True)],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a long document in overlapping windows.")
+    parser.add_argument("path", help="Plain-text document, read in chunks")
+    parser.add_argument("--rule", choices=AGGREGATION_RULES, default="mean")
+    parser.add_argument("--window", type=int, default=400, help="Words per window")
+    parser.add_argument("--overlap", type=int, default=100, help="Words shared by consecutive windows")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    vectorizer, model = load_artifacts(args.vectorizer, args.model)
+    with open(args.path, encoding="utf-8") as f:
+        chunks = iter(lambda: f.read(1 << 16), "")
+        result = score_long_document(vectorizer, model, chunks, args.rule, args.window,
+                                     args.overlap, top_k=args.top_k)
+
+    print(f"{LABELS[result.label]}: P(fake)={result.prob_fake:.3f} ({result.rule}, "
+          f"{result.windows} windows, {result.words} words)")
+    segments = result.fake_segments if result.label == 0 else result.real_segments
+    for segment in segments:
+        print(f"  words {segment['start_word']}-{segment['end_word']}: P(fake)={segment['prob_fake']:.3f}  "
+              f"{segment['preview'][:100]!r}")
+
+
+if __name__ == "__main__":
+    main()
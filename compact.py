@@ -0,0 +1,246 @@
+"""Pruned and quantized single-file serving artifact.
+
+The pickled pair keeps a float64 idf and a float64 coefficient for every
+vocabulary term, although most coefficients are close to zero. This export
+drops the terms whose |coef_| is at or below --min-coef and folds idf * coef
+into one weight per kept term, stored as float32 or as int8 with a single
+scale. With l2 norm a row's decision is
+
+    sum(tf[i] * idf[i] * coef[i]) / ||tf * idf|| + intercept
+
+so the featurizer emits tf / ||tf * idf|| and the scorer's coefficients are
+the folded weights. idf is still needed for the row norm. It is kept in
+float16 for pruned exports and in float32 with --min-coef 0, where the
+artifact is meant to reproduce the pickled model: max P(real) drift is then
+below 1e-7, against up to about 1e-4 with float16 idf. Pruned terms still
+count toward the norm by default (they stay in the term table without a
+weight); dropping them too with --norm-terms kept gives the smallest
+artifact, but the changed norms account for most of the probability drift.
+Terms are looked up through the same hash table as vocab.py's, stored in
+the file, so loading builds no per-term dict or string list.
+`export --eval` and `evaluate` report agreement and drift against the
+pickled model.
+
+    python compact.py export model.compact.npz --min-coef 0.01 --quantize int8 --eval labeled.jsonl
+    python compact.py evaluate model.compact.npz corpus.jsonl --label-field ''
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from explain import feature_terms
+from hashing import compare, load_reference, print_report, read_labeled
+from pipeline import LinearScorer, MODEL_PATH, VECTORIZER_PATH
+from vocab import SUPPORTED_PARAMS, TermTable, tfidf_matrix
+
+QUANTIZATIONS = ("float32", "int8")
+
+
+class CompactTfidfVectorizer:
+    def __init__(self, terms, idf, token_pattern, lowercase=True, norm="l2", sublinear_tf=False, binary=False,
+                 n_weighted=None):
+        # `terms` is a vocab.TermTable (or a term list). The first n_weighted
+        # terms are features; any after them are pruned terms that only
+        # contribute to the row norm
+        self.terms = terms if isinstance(terms, TermTable) else TermTable.from_terms(terms)
+        self.n_weighted = len(terms) if n_weighted is None else n_weighted
+        # Only used for the row norm; the weights already carry idf
+        self.idf_ = np.asarray(idf, dtype=np.float64)
+        self.ones = np.ones(len(terms))
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    def tokenize(self, text):
+        return self.token_re.findall(text.lower() if self.lowercase else text)
+
+    def index(self, token):
+        return self.terms.index(token)
+
+    @property
+    def folded_idf(self):
+        # idf of the weighted features; transform output times this is tf-idf
+        return self.idf_[:self.n_weighted]
+
+    def get_feature_names_out(self):
+        return np.array([self.terms.term(i) for i in range(self.n_weighted)], dtype=object)
+
+    def transform(self, texts):
+        return self.transform_tokens(self.tokenize(text) for text in texts)
+
+    def transform_tokens(self, token_lists):
+        X = tfidf_matrix(token_lists, self.index, self.ones, None, self.sublinear_tf, self.binary)
+        n_rows = X.shape[0]
+        row_ids = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+        if self.norm:
+            # Row norms of tf * idf in one vectorized pass
+            weighted = X.data * self.idf_[X.indices]
+            if self.norm == "l2":
+                totals = np.sqrt(np.bincount(row_ids, weights=weighted * weighted, minlength=n_rows))
+            elif self.norm == "l1":
+                totals = np.bincount(row_ids, weights=np.abs(weighted), minlength=n_rows)
+            else:
+                raise ValueError(f"Unsupported norm {self.norm!r}")
+            totals[totals == 0] = 1.0
+            X.data /= totals[row_ids]
+        if self.n_weighted < len(self.terms):
+            # Drop the norm-only columns now that the norms are taken
+            keep = X.indices < self.n_weighted
+            indptr = np.zeros(n_rows + 1, dtype=X.indptr.dtype)
+            np.cumsum(np.bincount(row_ids[keep], minlength=n_rows), out=indptr[1:])
+            X = sp.csr_matrix((X.data[keep], X.indices[keep], indptr), shape=(n_rows, self.n_weighted))
+        return X
+
+
+def fold_weights(vectorizer, model, min_coef=0.0):
+    # (kept feature ids, idf * coef for them); ids stay in vocabulary order
+    coef = np.ravel(model.coef_)
+    keep = np.flatnonzero(np.abs(coef) > min_coef)
+    return keep, np.asarray(vectorizer.idf_)[keep] * coef[keep]
+
+
+def quantize_weights(weights, quantize="float32"):
+    # (stored array, scale); int8 uses one symmetric scale for all terms
+    if quantize == "float32":
+        return weights.astype(np.float32), 1.0
+    if quantize == "int8":
+        peak = float(np.max(np.abs(weights))) if len(weights) else 0.0
+        scale = peak / 127 if peak else 1.0
+        return np.clip(np.round(weights / scale), -127, 127).astype(np.int8), scale
+    raise ValueError(f"Unknown quantization {quantize!r}; expected one of {QUANTIZATIONS}")
+
+
+def export(vectorizer, model, path, min_coef=0.0, quantize="float32", norm_terms="all"):
+    params = vectorizer.get_params() if hasattr(vectorizer, "get_params") else None
+    if params is not None:
+        for name, expected in SUPPORTED_PARAMS.items():
+            if params[name] != expected:
+                raise ValueError(f"Unsupported vectorizer setting {name}={params[name]!r}")
+        settings = {name: params[name] for name in ("token_pattern", "lowercase", "norm", "sublinear_tf", "binary")}
+    else:
+        # Compact .vocab vectorizer (see vocab.py)
+        settings = {"token_pattern": vectorizer.token_re.pattern, "lowercase": vectorizer.lowercase,
+                    "norm": vectorizer.norm, "sublinear_tf": vectorizer.sublinear_tf, "binary": vectorizer.binary}
+
+    keep, weights = fold_weights(vectorizer, model, min_coef)
+    stored, scale = quantize_weights(weights, quantize)
+    rows = keep
+    if norm_terms == "all":
+        rows = np.concatenate([keep, np.setdiff1d(np.arange(len(vectorizer.idf_)), keep)])
+    elif norm_terms != "kept":
+        raise ValueError(f"norm_terms must be 'all' or 'kept', not {norm_terms!r}")
+    names = feature_terms(vectorizer)
+    table = TermTable.from_terms([names[i] for i in rows])
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            terms=np.frombuffer(table.data, dtype=np.uint8),
+            offsets=np.asarray(table.offsets, dtype="<u8"),
+            slots=np.asarray(table.slots, dtype="<u4"),
+            idf=np.asarray(vectorizer.idf_)[rows].astype(np.float32 if min_coef == 0 else np.float16),
+            weights=stored,
+            scale=np.float64(scale),
+            intercept=np.float64(np.ravel(model.intercept_)[0]),
+            classes=np.asarray(model.classes_),
+            token_pattern=np.str_(settings["token_pattern"]),
+            lowercase=np.bool_(settings["lowercase"]),
+            norm=np.str_(settings["norm"] or ""),
+            sublinear_tf=np.bool_(settings["sublinear_tf"]),
+            binary=np.bool_(settings["binary"]),
+        )
+    return len(keep), len(np.ravel(model.coef_))
+
+
+def load_compact_model(path):
+    # Returns (featurizer, scorer), the same pair load_artifacts returns
+    with np.load(path) as data:
+        blob = data["terms"].tobytes()
+        if "slots" in data:
+            terms = TermTable(blob, memoryview(data["offsets"].astype(np.uint64)).cast("B").cast("Q"),
+                              memoryview(data["slots"].astype(np.uint32)).cast("B").cast("I"))
+        else:
+            # Older exports: newline-joined terms (\w tokens) and no table
+            terms = blob.decode("utf-8").split("\n") if blob else []
+        featurizer = CompactTfidfVectorizer(
+            terms,
+            data["idf"],
+            token_pattern=str(data["token_pattern"]),
+            lowercase=bool(data["lowercase"]),
+            norm=str(data["norm"]) or None,
+            sublinear_tf=bool(data["sublinear_tf"]),
+            binary=bool(data["binary"]),
+            n_weighted=len(data["weights"]),
+        )
+        scorer = LinearScorer(data["weights"].astype(np.float64) * float(data["scale"]), data["intercept"],
+                              data["classes"])
+    return featurizer, scorer
+
+
+def footprint_report(vectorizer_path, model_path, compact_path):
+    # Artifact sizes and cold load times, reference pair vs compact file
+    start = time.perf_counter()
+    load_reference(vectorizer_path, model_path)
+    reference_load = time.perf_counter() - start
+    start = time.perf_counter()
+    load_compact_model(compact_path)
+    compact_load = time.perf_counter() - start
+    return {
+        "reference_bytes": os.path.getsize(vectorizer_path) + os.path.getsize(model_path),
+        "compact_bytes": os.path.getsize(compact_path),
+        "reference_load_ms": reference_load * 1000,
+        "compact_load_ms": compact_load * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and evaluate pruned, quantized serving artifacts.")
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label", help="Use '' for unlabeled corpora")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Write a .compact.npz from the pickled artifacts")
+    exp.add_argument("output")
+    exp.add_argument("--min-coef", type=float, default=0.01,
+                     help="Drop terms whose |coef_| is at or below this (default: 0.01)")
+    exp.add_argument("--quantize", choices=QUANTIZATIONS, default="float32")
+    exp.add_argument("--norm-terms", choices=("all", "kept"), default="all",
+                     help="Keep pruned terms for the row norm (all, default) or drop them entirely (kept)")
+    exp.add_argument("--eval", help="Validation corpus to compare the export on")
+    exp.add_argument("--limit", type=int, default=None)
+
+    ev = sub.add_parser("evaluate", help="Compare a compact artifact with the pickled artifacts")
+    ev.add_argument("compact_model")
+    ev.add_argument("corpus")
+    ev.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "export" and not args.output.endswith(".compact.npz"):
+        parser.error("the output name must end in .compact.npz so load_artifacts recognizes it")
+    reference = load_reference(args.vectorizer, args.model)
+    label_field = args.label_field or None
+
+    if args.command == "export":
+        kept, total = export(reference[0], reference[1], args.output, args.min_coef, args.quantize, args.norm_terms)
+        print(f"wrote {args.output} ({kept}/{total} terms weighted, {args.quantize} weights, "
+              f"{args.norm_terms} terms in the norm)")
+        compact_path, corpus = args.output, args.eval
+    else:
+        compact_path, corpus = args.compact_model, args.corpus
+
+    report = footprint_report(args.vectorizer, args.model, compact_path)
+    if corpus:
+        texts, labels = read_labeled(corpus, args.text_field, label_field, args.limit)
+        report.update(compare(texts, labels, reference, load_compact_model(compact_path)))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
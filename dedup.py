@@ -0,0 +1,365 @@
+"""Near-duplicate index over already-scored articles.
+
+Re-posted stories are usually light edits of one another, so their exact
+hashes differ while their word shingles barely change. Each scored article
+is summarized by a MinHash signature over 5-word shingles, and signatures
+are bucketed with LSH banding: a new article is only compared against the
+few articles sharing at least one band with it. A match whose estimated
+Jaccard similarity clears the threshold reuses the stored verdict, so
+vectorizer.transform and predict_proba are skipped entirely.
+
+Signatures and verdicts live in one fixed-capacity record array that can be
+memory-mapped from disk (<path>.npy plus a <path>.json header); the band
+buckets are rebuilt from it on load. When the index is full the least
+recently matched article is evicted, found through a min-heap of
+(stamp, slot) pairs rather than a scan of every stamp.
+
+Like PredictionCache, every verdict belongs to the artifact fingerprint
+that produced it (query/add take the caller's fingerprint when it has one)
+and only matches queries made with that fingerprint. Records keep a small
+id into the header's list of fingerprints. Versions share the capacity:
+old ones are evicted as they stop matching, and fingerprints unused for
+`purge_after` seconds are purged outright.
+"""
+import atexit
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from analysis import TOKEN_RE
+from cache import artifact_fingerprint
+
+logger = logging.getLogger("fakenews.dedup")
+
+NearDuplicate = namedtuple("NearDuplicate", "label proba similarity slot")
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def shingles(tokens, size=5):
+    # CRC32 of each run of `size` tokens; deterministic across processes,
+    # unlike hash(). Texts shorter than one shingle use the whole text.
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) <= size:
+        grams = [" ".join(tokens)]
+    else:
+        grams = (" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, seed=1):
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2**64) >> 32
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes):
+        if len(shingle_hashes) == 0:
+            return None
+        with np.errstate(over="ignore"):
+            hashed = (np.multiply.outer(self.a, shingle_hashes) + self.b[:, None]) & _MASK64
+        return (hashed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def record_dtype(num_perm):
+    return np.dtype([
+        ("used", "u1"),
+        ("label", "i1"),
+        ("version", "<u2"),  # index into NearDuplicateIndex.fingerprints
+        ("proba", "<f4", (2,)),
+        ("stamp", "<u8"),
+        ("signature", "<u4", (num_perm,)),
+    ])
+
+
+class NearDuplicateIndex:
+    def __init__(self, capacity=50_000, path=None, threshold=0.8, num_perm=128, bands=16,
+                 shingle_size=5, fingerprint_fn=artifact_fingerprint, purge_after=3600.0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.capacity = capacity
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.fingerprint_fn = fingerprint_fn
+        self.purge_after = purge_after
+        # Record version id -> fingerprint (None for a free id), and the
+        # time.monotonic() each fingerprint was last queried or added with
+        self.fingerprints = []
+        self.last_used = {}
+        self.last_purge = time.monotonic()
+        self.lock = threading.Lock()
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        # (stamp, slot) for every insert or match; entries whose stamp no
+        # longer matches the record are stale and skipped on eviction
+        self.lru_heap = []
+        self.clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self.records = self._open_memmap(path, num_perm)
+        else:
+            self.records = np.zeros(capacity, dtype=record_dtype(num_perm))
+        self.free = [int(i) for i in np.flatnonzero(self.records["used"] == 0)[::-1]]
+        for slot in np.flatnonzero(self.records["used"]):
+            self._add_to_buckets(int(slot), self.records["signature"][slot])
+        self._rebuild_heap()
+        if len(self.records):
+            self.clock = int(self.records["stamp"].max())
+        # Versions found on disk get a full purge_after to be used again
+        for fingerprint in self.fingerprints:
+            if fingerprint is not None:
+                self.last_used[fingerprint] = self.last_purge
+
+    def _open_memmap(self, path, num_perm):
+        # Reuse the file when its layout matches, otherwise start a new one
+        header_path, data_path = path + ".json", path + ".npy"
+        header = {}
+        if os.path.exists(header_path) and os.path.exists(data_path):
+            with open(header_path) as f:
+                header = json.load(f)
+        if (header.get("num_perm") == num_perm and header.get("capacity") == self.capacity
+                and header.get("shingle_size") == self.shingle_size and "fingerprints" in header):
+            records = np.lib.format.open_memmap(data_path, mode="r+")
+            if records.dtype == record_dtype(num_perm):
+                self.fingerprints = header["fingerprints"]
+                return records
+            del records
+        records = np.lib.format.open_memmap(data_path, mode="w+", dtype=record_dtype(num_perm),
+                                            shape=(self.capacity,))
+        self._write_header()
+        return records
+
+    def _write_header(self):
+        with open(self.path + ".json", "w") as f:
+            json.dump({
+                "capacity": self.capacity,
+                "num_perm": self.hasher.num_perm,
+                "shingle_size": self.shingle_size,
+                "fingerprints": self.fingerprints,
+            }, f)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _add_to_buckets(self, slot, signature):
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            band[key].add(slot)
+
+    def _remove_from_buckets(self, slot, signature):
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            members = band.get(key)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    del band[key]
+
+    def _rebuild_heap(self):
+        used = np.flatnonzero(self.records["used"])
+        self.lru_heap = list(zip(self.records["stamp"][used].tolist(), used.tolist()))
+        heapq.heapify(self.lru_heap)
+
+    def _touch(self, slot):
+        # Called with the lock held
+        self.clock += 1
+        self.records["stamp"][slot] = self.clock
+        heapq.heappush(self.lru_heap, (self.clock, slot))
+        if len(self.lru_heap) > 4 * self.capacity:
+            # Matches leave stale entries behind; drop them once they pile up
+            self._rebuild_heap()
+
+    def _pop_oldest(self):
+        # Called with the lock held; the least recently inserted or matched slot
+        stamps = self.records["stamp"]
+        while True:
+            stamp, slot = heapq.heappop(self.lru_heap)
+            if stamps[slot] == stamp:
+                return slot
+
+    def _check_fingerprint(self, fingerprint=None):
+        # Called with the lock held. Resolves the fingerprint, marks it as
+        # used and purges idle ones at most once per purge_after. Returns
+        # (fingerprint, record version id), the id None if it has no records.
+        if fingerprint is None:
+            fingerprint = self.fingerprint_fn()
+        now = time.monotonic()
+        self.last_used[fingerprint] = now
+        if now - self.last_purge >= self.purge_after:
+            self._purge(now - self.purge_after)
+        if fingerprint in self.fingerprints:
+            return fingerprint, self.fingerprints.index(fingerprint)
+        return fingerprint, None
+
+    def _version_id(self, fingerprint):
+        # Called with the lock held; the id add() stores for a new fingerprint
+        version = self.fingerprints.index(None) if None in self.fingerprints else len(self.fingerprints)
+        if version > np.iinfo("<u2").max:
+            raise RuntimeError("Too many model versions in the near-duplicate index")
+        if version == len(self.fingerprints):
+            self.fingerprints.append(fingerprint)
+        else:
+            self.fingerprints[version] = fingerprint
+        if self.path:
+            self._write_header()
+        return version
+
+    def _purge(self, cutoff):
+        # Called with the lock held. Frees the records of every fingerprint
+        # last used before cutoff.
+        self.last_purge = time.monotonic()
+        stale = {fingerprint for fingerprint, used in self.last_used.items() if used < cutoff}
+        if not stale:
+            return
+        for fingerprint in stale:
+            del self.last_used[fingerprint]
+        versions = [version for version, fingerprint in enumerate(self.fingerprints) if fingerprint in stale]
+        if not versions:
+            return
+        slots = np.flatnonzero(self.records["used"].astype(bool) & np.isin(self.records["version"], versions))
+        for slot in slots.tolist():
+            self._remove_from_buckets(slot, self.records["signature"][slot])
+            self.free.append(slot)
+        self.records["used"][slots] = 0
+        self.records["stamp"][slots] = 0  # leaves their heap entries stale
+        for version in versions:
+            self.fingerprints[version] = None
+        if self.path:
+            self._write_header()
+
+    def purge(self, max_idle=None):
+        # Drop the records of every fingerprint not used in the last
+        # max_idle seconds (default purge_after) now
+        with self.lock:
+            self._purge(time.monotonic() - (self.purge_after if max_idle is None else max_idle))
+
+    def signature(self, text=None, tokens=None):
+        # Pass `tokens` (analysis.TextStats.tokens) to skip re-tokenizing
+        if tokens is None:
+            tokens = TOKEN_RE.findall(text.lower())
+        return self.hasher.signature(shingles(tokens, self.shingle_size))
+
+    def query(self, text=None, tokens=None, signature=None, fingerprint=None):
+        # Returns the most similar stored article above the threshold as a
+        # NearDuplicate, or None
+        if signature is None:
+            signature = self.signature(text, tokens)
+        with self.lock:
+            _, version = self._check_fingerprint(fingerprint)
+            if signature is None or version is None:
+                self.misses += 1
+                return None
+            candidates = set()
+            for band, key in zip(self.buckets, self._band_keys(signature)):
+                candidates.update(band.get(key, ()))
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            # Only verdicts made by the caller's version count
+            slots = slots[self.records["version"][slots] == version]
+            if not len(slots):
+                self.misses += 1
+                return None
+            similarity = (self.records["signature"][slots] == signature).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] < self.threshold:
+                self.misses += 1
+                return None
+            slot = int(slots[best])
+            record = self.records[slot]
+            self._touch(slot)
+            self.hits += 1
+            return NearDuplicate(int(record["label"]), record["proba"].astype(np.float64),
+                                 float(similarity[best]), slot)
+
+    def add(self, label, proba, text=None, tokens=None, signature=None, fingerprint=None):
+        if signature is None:
+            signature = self.signature(text, tokens)
+        if signature is None:
+            return None
+        with self.lock:
+            fingerprint, version = self._check_fingerprint(fingerprint)
+            if version is None:
+                version = self._version_id(fingerprint)
+            if self.free:
+                slot = self.free.pop()
+            else:
+                # Evict the least recently inserted or matched article
+                slot = self._pop_oldest()
+                self._remove_from_buckets(slot, self.records["signature"][slot])
+                self.evictions += 1
+            record = self.records[slot]
+            record["used"] = 1
+            record["label"] = int(label)
+            record["version"] = version
+            record["proba"] = np.asarray(proba, dtype=np.float32)
+            record["signature"] = signature
+            self._touch(slot)
+            self._add_to_buckets(slot, signature)
+            return slot
+
+    def _clear(self):
+        self.records["used"] = 0
+        self.records["stamp"] = 0
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.lru_heap = []
+        self.clock = 0
+        self.fingerprints = []
+        self.last_used = {}
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def flush(self):
+        if self.path:
+            with self.lock:
+                self.records.flush()
+                self._write_header()
+
+    def start_flusher(self, interval=30.0):
+        # Memory-mapped writes only reach the file when flushed: flush every
+        # `interval` seconds on a daemon thread and once more at exit
+        if not self.path:
+            return None
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except OSError:
+                    logger.exception("Could not flush the near-duplicate index to %s", self.path)
+
+        atexit.register(self.flush)
+        thread = threading.Thread(target=run, name="dedup-flush", daemon=True)
+        thread.start()
+        return thread
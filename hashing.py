@@ -0,0 +1,243 @@
+"""Vocabulary-free serving mode based on the hashing trick.
+
+Tokens are mapped straight to one of n_features buckets with CRC32, so
+serving needs no vocabulary at all: the artifact is two fixed-size float32
+arrays (per-bucket idf and per-bucket coefficient) plus the intercept, and
+memory use does not depend on the vocabulary size. Buckets that no training
+term hashed into carry idf 0, which drops unseen tokens the same way the
+fitted vocabulary does.
+
+    # Derive a hashing model from the current vectorizer.jb/model.jb
+    python hashing.py convert model.hash.npz --eval labeled.jsonl
+
+    # Retrain from scratch on a labeled corpus (text + label fields)
+    python hashing.py train labeled.jsonl model.hash.npz
+
+    # Compare against the current model on any corpus
+    python hashing.py evaluate model.hash.npz labeled.jsonl
+"""
+import argparse
+import re
+import zlib
+
+import numpy as np
+
+from analysis import TOKEN_PATTERN
+from pipeline import LinearScorer, MODEL_PATH, VECTORIZER_PATH
+from vocab import SUPPORTED_PARAMS, normalize_rows, tfidf_matrix
+
+DEFAULT_N_FEATURES = 2**20
+
+
+def bucket_of(token, n_features):
+    return zlib.crc32(token.encode("utf-8")) % n_features
+
+
+class HashingTfidfVectorizer:
+    def __init__(self, idf, token_pattern=TOKEN_PATTERN, lowercase=True, norm="l2"):
+        self.idf_ = idf
+        self.n_features = len(idf)
+        self.token_re = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+
+    def tokenize(self, text):
+        return self.token_re.findall(text.lower() if self.lowercase else text)
+
+    def index(self, token):
+        bucket = bucket_of(token, self.n_features)
+        return bucket if self.idf_[bucket] else -1
+
+    def transform(self, texts):
+        return self.transform_tokens(self.tokenize(text) for text in texts)
+
+    def transform_tokens(self, token_lists):
+        return tfidf_matrix(token_lists, self.index, self.idf_, self.norm)
+
+
+def save_hashing_model(path, idf, coef, intercept, token_pattern=TOKEN_PATTERN,
+                       lowercase=True, norm="l2"):
+    np.savez(
+        path,
+        idf=np.asarray(idf, dtype=np.float32),
+        coef=np.asarray(coef, dtype=np.float32),
+        intercept=np.float64(intercept),
+        token_pattern=np.str_(token_pattern),
+        lowercase=np.bool_(lowercase),
+        norm=np.str_(norm or ""),
+    )
+
+
+def load_hashing_model(path):
+    # Returns (featurizer, scorer), the same pair load_artifacts returns
+    with np.load(path) as data:
+        featurizer = HashingTfidfVectorizer(
+            data["idf"],
+            token_pattern=str(data["token_pattern"]),
+            lowercase=bool(data["lowercase"]),
+            norm=str(data["norm"]) or None,
+        )
+        scorer = LinearScorer(data["coef"], data["intercept"])
+    return featurizer, scorer
+
+
+def convert(vectorizer, model, n_features=DEFAULT_N_FEATURES):
+    # Fold every vocabulary term into its bucket. Colliding terms share one
+    # bucket, whose idf is their mean and whose coefficient reproduces the
+    # mean of their idf * coef products. The hashing featurizer only does
+    # lowercased, l2-normalized raw-count TF-IDF with the default token
+    # pattern, so other settings are rejected.
+    params = vectorizer.get_params()
+    expected_params = dict(SUPPORTED_PARAMS, sublinear_tf=False, binary=False, norm="l2", lowercase=True,
+                           token_pattern=TOKEN_PATTERN)
+    for name, expected in expected_params.items():
+        if params[name] != expected:
+            raise ValueError(f"Unsupported vectorizer setting {name}={params[name]!r}")
+    coef = np.ravel(model.coef_)
+    terms = vectorizer.vocabulary_
+    buckets = np.empty(len(terms), dtype=np.int64)
+    for term, index in terms.items():
+        buckets[index] = bucket_of(term, n_features)
+
+    hits = np.bincount(buckets, minlength=n_features)
+    idf_sum = np.bincount(buckets, weights=vectorizer.idf_, minlength=n_features)
+    weight_sum = np.bincount(buckets, weights=vectorizer.idf_ * coef, minlength=n_features)
+    occupied = hits > 0
+    idf = np.zeros(n_features)
+    bucket_coef = np.zeros(n_features)
+    idf[occupied] = idf_sum[occupied] / hits[occupied]
+    bucket_coef[occupied] = weight_sum[occupied] / hits[occupied] / idf[occupied]
+    collisions = int(len(terms) - occupied.sum())
+    return idf, bucket_coef, float(np.ravel(model.intercept_)[0]), collisions
+
+
+def train(texts, labels, n_features=DEFAULT_N_FEATURES, **model_params):
+    # Fit bucket idf (smoothed, as TfidfTransformer does) and a logistic
+    # regression on the hashed TF-IDF features
+    from sklearn.linear_model import LogisticRegression
+
+    counter = HashingTfidfVectorizer(np.ones(n_features), norm=None)
+    X = counter.transform(texts)
+    df = np.bincount(X.indices, minlength=n_features)
+    idf = np.zeros(n_features)
+    seen = df > 0
+    idf[seen] = np.log((1 + X.shape[0]) / (1 + df[seen])) + 1
+
+    X.data *= idf[X.indices]
+    normalize_rows(X.data, X.indptr, "l2")
+    model = LogisticRegression(**model_params).fit(X, labels)
+    return idf, model.coef_.ravel(), float(model.intercept_[0])
+
+
+def parse_label(value):
+    # Accept 0/1 as well as the app's Fake/Real wording
+    text = str(value).strip().lower()
+    if text in ("1", "real", "true"):
+        return 1
+    if text in ("0", "fake", "false"):
+        return 0
+    raise ValueError(f"Unrecognized label {value!r}")
+
+
+def read_labeled(path, text_field="text", label_field="label", limit=None):
+    from batch_score import read_records
+
+    texts, labels = [], []
+    # Without a label field the corpus is unlabeled and labels are all None
+    for record in read_records(path, text_field, label_field=label_field):
+        if limit is not None and len(texts) >= limit:
+            break
+        texts.append(record[1])
+        labels.append(parse_label(record[2]) if label_field else None)
+    return texts, labels
+
+
+def compare(texts, labels, reference, candidate):
+    # Side-by-side report of two (featurizer, scorer) pairs on one corpus
+    ref_labels, ref_proba = reference[1].predict_with_proba(reference[0].transform(texts))
+    new_labels, new_proba = candidate[1].predict_with_proba(candidate[0].transform(texts))
+    report = {
+        "documents": len(texts),
+        "agreement": float(np.mean(ref_labels == new_labels)),
+        "mean_abs_prob_drift": float(np.mean(np.abs(ref_proba[:, 1] - new_proba[:, 1]))),
+        "max_abs_prob_drift": float(np.max(np.abs(ref_proba[:, 1] - new_proba[:, 1]))),
+    }
+    if labels and labels[0] is not None:
+        y = np.asarray(labels)
+        report["reference_accuracy"] = float(np.mean(ref_labels == y))
+        report["candidate_accuracy"] = float(np.mean(new_labels == y))
+    return report
+
+
+def print_report(report):
+    # Four significant digits, so small probability drifts do not print as 0
+    for key, value in report.items():
+        print(f"{key:>22}: {value:.4g}" if isinstance(value, float) else f"{key:>22}: {value}")
+
+
+def load_reference(vectorizer_path, model_path):
+    from pipeline import load_artifacts
+
+    vectorizer, model = load_artifacts(vectorizer_path, model_path)
+    if not isinstance(model, LinearScorer):
+        model = LinearScorer.from_model(model)
+    return vectorizer, model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and evaluate hashing-trick serving models.")
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label", help="Use '' for unlabeled corpora")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    conv = sub.add_parser("convert", help="Derive a hashing model from the pickled artifacts")
+    conv.add_argument("output")
+    conv.add_argument("--eval", help="Corpus to compare the converted model on")
+
+    fit = sub.add_parser("train", help="Retrain a hashing model on a labeled corpus")
+    fit.add_argument("corpus")
+    fit.add_argument("output")
+    fit.add_argument("--test-size", type=float, default=0.2)
+    fit.add_argument("--seed", type=int, default=0)
+
+    ev = sub.add_parser("evaluate", help="Compare a hashing model with the pickled artifacts")
+    ev.add_argument("hashing_model")
+    ev.add_argument("corpus")
+    ev.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    reference = load_reference(args.vectorizer, args.model)
+    label_field = args.label_field or None
+
+    if args.command == "convert":
+        idf, coef, intercept, collisions = convert(reference[0], reference[1], args.n_features)
+        save_hashing_model(args.output, idf, coef, intercept)
+        print(f"wrote {args.output} ({args.n_features} buckets, {collisions} colliding terms)")
+        if args.eval:
+            texts, labels = read_labeled(args.eval, args.text_field, label_field)
+            print_report(compare(texts, labels, reference, load_hashing_model(args.output)))
+
+    elif args.command == "train":
+        texts, labels = read_labeled(args.corpus, args.text_field, label_field)
+        order = np.random.default_rng(args.seed).permutation(len(texts))
+        n_test = int(len(texts) * args.test_size)
+        test, fit_rows = order[:n_test], order[n_test:]
+        idf, coef, intercept = train([texts[i] for i in fit_rows], [labels[i] for i in fit_rows],
+                                     args.n_features)
+        save_hashing_model(args.output, idf, coef, intercept)
+        print(f"wrote {args.output} (trained on {len(fit_rows)} documents)")
+        if n_test:
+            print(f"held-out evaluation on {n_test} documents:")
+            print_report(compare([texts[i] for i in test], [labels[i] for i in test],
+                                 reference, load_hashing_model(args.output)))
+
+    else:
+        texts, labels = read_labeled(args.corpus, args.text_field, label_field, args.limit)
+        print_report(compare(texts, labels, reference, load_hashing_model(args.hashing_model)))
+
+
+if __name__ == "__main__":
+    main()
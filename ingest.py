@@ -0,0 +1,296 @@
+"""Concurrent URL ingestion and article extraction.
+
+Fetches articles with a pooled asynchronous HTTP client (tornado, already a
+Streamlit dependency), bounded both globally and per host, with timeouts
+and retries on transient failures. Response bodies are fed chunk by chunk
+into a streaming HTML parser that keeps the article paragraphs and drops
+scripts, navigation and other boilerplate. Results are cached by URL and
+revalidated with ETag / Last-Modified, so an unchanged page costs one 304.
+
+    python ingest.py urls.txt articles.jsonl
+    python batch_score.py articles.jsonl scores.csv --id-field url
+"""
+import argparse
+import asyncio
+import codecs
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+Article = namedtuple("Article", "url status title text error from_cache")
+
+# Elements whose text is never article content
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button"}
+# Elements that hold one paragraph of body text each
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "li", "blockquote", "pre"}
+RETRY_STATUSES = {429, 500, 502, 503, 504, 599}
+
+
+class ArticleExtractor(HTMLParser):
+    """Streaming article-body extractor; call feed() with decoded chunks.
+
+    Paragraphs inside <article> elements win when a page has any, otherwise
+    all body paragraphs outside boilerplate elements are kept.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.article_depth = 0
+        self.in_title = False
+        self.title_parts = []
+        self.current = None
+        self.current_in_article = False
+        self.paragraphs = []
+        self.article_paragraphs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "article":
+            self.article_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag in BLOCK_TAGS:
+            # <p> may be left unclosed, so a new block ends the previous one
+            self._flush()
+            self.current = []
+            self.current_in_article = self.article_depth > 0
+        elif tag == "br" and self.current is not None:
+            self.current.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "article":
+            self._flush()
+            self.article_depth = max(0, self.article_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title_parts.append(data)
+        elif self.skip_depth == 0 and self.current is not None:
+            self.current.append(data)
+
+    def _flush(self):
+        if self.current:
+            text = " ".join("".join(self.current).split())
+            if text:
+                target = self.article_paragraphs if self.current_in_article else self.paragraphs
+                target.append(text)
+        self.current = None
+
+    def result(self):
+        self.close()
+        self._flush()
+        title = " ".join("".join(self.title_parts).split())
+        return title, "\n\n".join(self.article_paragraphs or self.paragraphs)
+
+
+def extract_article(html):
+    extractor = ArticleExtractor()
+    extractor.feed(html)
+    return extractor.result()
+
+
+class UrlCache:
+    # Bounded LRU of url -> (etag, last_modified, Article)
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+            return entry
+
+    def put(self, url, etag, last_modified, article):
+        with self.lock:
+            self.entries[url] = (etag, last_modified, article)
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+
+def _charset(content_type):
+    match = re.search(r"charset=([\w.-]+)", content_type or "", re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class ArticleFetcher:
+    def __init__(self, max_concurrency=20, per_host=4, connect_timeout=5.0, request_timeout=15.0,
+                 retries=2, backoff=0.5, max_bytes=5 * 1024 * 1024, cache=None,
+                 user_agent="FakeNewsDetector/1.0"):
+        from tornado.httpclient import AsyncHTTPClient
+
+        # A private client instance so the connection pool and its limit are ours
+        # Pages over max_bytes are reported as errors (see _fetch_once); the
+        # client's own limit is a hard cap on how much of one is downloaded
+        self.client = AsyncHTTPClient(force_instance=True, max_clients=max_concurrency,
+                                      max_body_size=2 * max_bytes)
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.host_limits = {}
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.user_agent = user_agent
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc.lower()
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    async def fetch(self, url):
+        url = url.strip()
+        if urlsplit(url).scheme not in ("http", "https"):
+            return Article(url, None, "", "", "Only http(s) URLs are supported", False)
+
+        async with self._host_limit(url):
+            for attempt in range(self.retries + 1):
+                article, retry = await self._fetch_once(url)
+                if not retry or attempt == self.retries:
+                    return article
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _fetch_once(self, url):
+        # Returns (Article, should_retry)
+        from tornado.httpclient import HTTPRequest
+
+        headers = {"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml"}
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        extractor = ArticleExtractor()
+        state = {"decoder": None, "received": 0, "too_large": False}
+
+        def on_header(line):
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            if line.startswith("HTTP/"):
+                # Status line of a new response (e.g. after a redirect)
+                state.update(received=0, too_large=False)
+            elif name == "content-type":
+                state["decoder"] = codecs.getincrementaldecoder(_charset(line))(errors="replace")
+            elif name == "content-length" and value.strip().isdigit() and int(value) > self.max_bytes:
+                state["too_large"] = True
+
+        def on_chunk(chunk):
+            state["received"] += len(chunk)
+            if state["received"] > self.max_bytes:
+                state["too_large"] = True
+            if state["too_large"]:
+                return
+            if state["decoder"] is None:
+                state["decoder"] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            extractor.feed(state["decoder"].decode(chunk))
+
+        request = HTTPRequest(
+            url, headers=headers, connect_timeout=self.connect_timeout,
+            request_timeout=self.request_timeout, header_callback=on_header,
+            streaming_callback=on_chunk, follow_redirects=True, max_redirects=5,
+        )
+        try:
+            response = await self.client.fetch(request, raise_error=False)
+        except Exception as e:
+            # Timeouts, DNS failures and refused connections are raised, not
+            # returned; so is a body over the client's hard cap
+            if state["too_large"]:
+                return self._too_large(url, None), False
+            return Article(url, 599, "", "", str(e) or type(e).__name__, False), True
+
+        if state["too_large"]:
+            # An oversized page will not shrink on retry
+            return self._too_large(url, response.code), False
+        if response.code == 304 and cached is not None:
+            return cached[2]._replace(from_cache=True), False
+        if response.code in RETRY_STATUSES:
+            return Article(url, response.code, "", "", str(response.error or response.reason), False), True
+        if response.code >= 400:
+            return Article(url, response.code, "", "", f"HTTP {response.code} {response.reason}", False), False
+
+        if state["decoder"] is not None:
+            extractor.feed(state["decoder"].decode(b"", final=True))
+        title, text = extractor.result()
+        article = Article(response.effective_url or url, response.code, title, text, None, False)
+        if self.cache is not None:
+            self.cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), article)
+        return article, False
+
+    def _too_large(self, url, status):
+        return Article(url, status, "", "", f"Page is larger than {self.max_bytes:,} bytes", False)
+
+    async def fetch_many(self, urls):
+        # Results come back in input order; failures are reported per URL
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def close(self):
+        self.client.close()
+
+
+def fetch_articles(urls, cache=None, **fetcher_args):
+    # Blocking entry point for callers without an event loop (the Streamlit
+    # script thread, CLIs)
+    async def run():
+        fetcher = ArticleFetcher(cache=cache, **fetcher_args)
+        try:
+            return await fetcher.fetch_many(urls)
+        finally:
+            fetcher.close()
+
+    return asyncio.run(run())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch article text for a list of URLs.")
+    parser.add_argument("urls", help="Text file with one URL per line ('-' for stdin)")
+    parser.add_argument("output", help="JSONL output with url, title, text, status and error fields")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--retries", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.urls == "-" else open(args.urls, encoding="utf-8")
+    with source:
+        urls = [line.strip() for line in source if line.strip() and not line.startswith("#")]
+
+    articles = fetch_articles(urls, max_concurrency=args.concurrency, per_host=args.per_host,
+                              request_timeout=args.timeout, retries=args.retries)
+    failed = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for article in articles:
+            failed += article.error is not None
+            f.write(json.dumps({
+                "url": article.url, "title": article.title, "text": article.text,
+                "status": article.status, "error": article.error,
+            }) + "\n")
+    print(f"fetched {len(articles) - failed}/{len(articles)} URLs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Background bulk-scoring jobs for the app.
+
+An uploaded corpus is saved to disk and handed to a JobManager, which runs
+it through the batch_score streaming path on a job thread, outside the
+Streamlit script run. Chunks are scored on a ParallelScorer worker pool
+(or in-thread on single-core hosts), and result rows are appended to the
+output file as each chunk finishes. The manager lives for the whole process
+(the app keeps it in st.cache_resource), so jobs keep running across reruns
+and reconnects, and any session can watch progress, cancel, or download.
+
+Cancellation is checked between chunks; a cancelled job keeps the rows it
+has already written. Job status only changes with the manager's lock held,
+so cancel, remove and pruning never act on a status that is being changed.
+"""
+import csv
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_score import detect_format, open_writer, read_records, result_rows, score_stream, score_stream_parallel
+from metrics import REGISTRY
+from parallel import ParallelScorer
+
+logger = logging.getLogger("fakenews.jobs")
+
+JOBS_SCORED = REGISTRY.counter("fakenews_bulk_documents_total", "Documents scored by bulk jobs.")
+
+QUEUED, COUNTING, RUNNING, DONE, CANCELLED, FAILED = "queued", "counting", "running", "done", "cancelled", "failed"
+FINISHED = (DONE, CANCELLED, FAILED)
+
+
+def count_records(path, fmt=None):
+    # Total documents, for the progress bar. Parquet keeps it in the footer;
+    # CSV has to be parsed since quoted fields may span lines.
+    fmt = fmt or detect_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+        return sum(1 for line in f if line.strip())
+
+
+class Job:
+    def __init__(self, name, input_path, output_path, text_field, id_field, input_format, output_format):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.input_path = input_path
+        self.output_path = output_path
+        self.text_field = text_field
+        self.id_field = id_field
+        self.input_format = input_format
+        self.output_format = output_format
+        self.status = QUEUED
+        self.total = None
+        self.processed = 0
+        self.model_version = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def fraction_done(self):
+        if self.status == DONE:
+            return 1.0
+        return min(self.processed / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def eta(self):
+        # Seconds left at the current rate, or None while unknown
+        rate = self.rate
+        if self.status != RUNNING or not self.total or not rate:
+            return None
+        return max(self.total - self.processed, 0) / rate
+
+    @property
+    def download_name(self):
+        return f"{os.path.splitext(self.name)[0]}-scores.{self.output_format}"
+
+
+class JobManager:
+    def __init__(self, model_manager, workdir=None, workers=None, max_running=1, chunk_size=1000, keep_jobs=20):
+        # workers: scoring processes per job (default: one per core; 1 scores
+        # in the job thread). max_running jobs run at once, the rest queue.
+        self.model_manager = model_manager
+        self.workdir = workdir or tempfile.mkdtemp(prefix="fakenews-jobs-")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.keep_jobs = keep_jobs
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="bulk-job")
+        os.makedirs(self.workdir, exist_ok=True)
+
+    def submit(self, name, source, text_field="text", id_field=None, output_format="csv"):
+        # `source` is a readable binary file object (e.g. a Streamlit upload);
+        # it is copied to disk so the job does not depend on the session
+        input_format = detect_format(name)
+        job_dir = tempfile.mkdtemp(dir=self.workdir, prefix="job-")
+        input_path = os.path.join(job_dir, "input." + input_format)
+        with open(input_path, "wb") as f:
+            shutil.copyfileobj(source, f)
+        job = Job(os.path.basename(name), input_path, os.path.join(job_dir, "scores." + output_format),
+                  text_field, id_field or None, input_format, output_format)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self.executor.submit(self._run, job)
+        return job
+
+    def list_jobs(self):
+        # Newest first
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.submitted, reverse=True)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status not in FINISHED:
+                job.cancel_event.set()
+                if job.status == QUEUED:
+                    # Never started; _run sees the status and skips it
+                    job.status, job.finished = CANCELLED, time.time()
+        return job
+
+    def remove(self, job_id):
+        # Forget a finished job and delete its files
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in FINISHED:
+                return False
+            del self.jobs[job_id]
+        shutil.rmtree(os.path.dirname(job.input_path), ignore_errors=True)
+        return True
+
+    def _prune(self):
+        # Called with the lock held; drops the oldest finished jobs
+        finished = sorted((job for job in self.jobs.values() if job.status in FINISHED), key=lambda job: job.submitted)
+        for job in finished[:max(len(self.jobs) - self.keep_jobs, 0)]:
+            del self.jobs[job.id]
+            shutil.rmtree(os.path.dirname(job.input_path), ignore_errors=True)
+
+    def _set_status(self, job, status):
+        with self.lock:
+            job.status = status
+            if status in FINISHED:
+                job.finished = time.time()
+
+    def _run(self, job):
+        with self.lock:
+            if job.status != QUEUED:
+                return
+            job.status, job.started = COUNTING, time.time()
+        try:
+            job.total = count_records(job.input_path, job.input_format)
+            self._set_status(job, RUNNING)
+            self._score(job)
+            self._set_status(job, CANCELLED if job.cancel_event.is_set() else DONE)
+        except Exception as e:
+            logger.exception("Bulk job %s (%s) failed", job.id, job.name)
+            job.error = f"{type(e).__name__}: {e}"
+            self._set_status(job, FAILED)
+        logger.info("Bulk job %s %s: %d documents in %.1fs", job.id, job.status, job.processed, job.elapsed)
+
+    def _score(self, job):
+        # One model version for the whole job, read once like a request does
+        serving = self.model_manager.active
+        job.model_version = serving.version
+        records = read_records(job.input_path, job.text_field, job.id_field, job.input_format)
+        # Stop reading input as soon as cancellation is requested
+        records = itertools.takewhile(lambda _: not job.cancel_event.is_set(), records)
+
+        scorer = None
+        version, fingerprint, _, vectorizer_path, model_path = self.model_manager.target()
+        if self.workers > 1 and (version, fingerprint) == (serving.version, serving.fingerprint):
+            # Worker processes load the artifacts from disk, which only match
+            # the serving model when it is not in-memory (e.g. online) weights
+            scorer = ParallelScorer(self.workers, vectorizer_path, model_path)
+            results = score_stream_parallel(records, scorer, self.chunk_size)
+        else:
+            results = score_stream(records, serving.vectorizer, serving.model, self.chunk_size)
+
+        writer = open_writer(job.output_path, job.output_format)
+        try:
+            for ids, proba in results:
+                writer.write_rows(list(result_rows(ids, proba)))
+                job.processed += len(ids)
+                JOBS_SCORED.inc(len(ids))
+                if job.cancel_event.is_set():
+                    break
+        finally:
+            writer.close()
+            if scorer is not None:
+                scorer.close(cancel=job.cancel_event.is_set())
+
+    def collect_metrics(self):
+        # Collector for metrics.Registry: jobs by status
+        counts = {}
+        for job in self.list_jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        for status in (QUEUED, COUNTING, RUNNING, DONE, CANCELLED, FAILED):
+            yield ("fakenews_bulk_jobs", "gauge", "Bulk scoring jobs by status.", {"status": status},
+                   counts.get(status, 0))
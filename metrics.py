@@ -0,0 +1,269 @@
+"""Prometheus-style metrics for the inference path.
+
+A small dependency-free registry of counters, gauges and histograms that
+renders the Prometheus text exposition format. server.py serves it at
+/metrics. The Streamlit app can expose it on its own port
+(FAKENEWS_METRICS_PORT) or rewrite a textfile for node_exporter's textfile
+collector (FAKENEWS_METRICS_FILE).
+
+Values that already live elsewhere (cache statistics, process memory) are
+read at scrape time through collectors instead of being mirrored on every
+request.
+"""
+import bisect
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("fakenews.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-millisecond cache hits up to slow long-document scoring
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Characters per submitted article
+LENGTH_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 20000, 50000, 100000, 500000)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self.values.items())
+        lines = self.header()
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collect):
+        # collect() is called on every scrape and returns an iterable of
+        # (name, kind, documentation, {labels} or None, value)
+        with self.lock:
+            self.collectors.append(collect)
+
+    def unregister_collector(self, collect):
+        with self.lock:
+            if collect in self.collectors:
+                self.collectors.remove(collect)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        seen = set()
+        for collect in collectors:
+            for name, kind, documentation, labels, value in collect():
+                if name not in seen:
+                    seen.add(name)
+                    lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                labels = labels or {}
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def process_rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        # Linux without psutil: resident pages from /proc
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _process_metrics():
+    yield ("process_resident_memory_bytes", "gauge", "Resident memory size in bytes.", None, process_rss_bytes())
+    yield ("process_threads", "gauge", "Number of Python threads.", None, threading.active_count())
+
+
+REGISTRY.register_collector(_process_metrics)
+
+# Inference path metrics shared by the app, the server and the CLIs
+REQUESTS = REGISTRY.counter("fakenews_requests_total", "Scoring requests handled.", ["source", "outcome"])
+STAGE_SECONDS = REGISTRY.histogram("fakenews_stage_seconds", "Latency of each inference stage.", ["source", "stage"])
+REQUEST_SECONDS = REGISTRY.histogram("fakenews_request_seconds", "End-to-end latency per request.", ["source"])
+INPUT_CHARS = REGISTRY.histogram("fakenews_input_chars", "Characters per scored article.", ["source"],
+                                 buckets=LENGTH_BUCKETS)
+MODEL_LOAD_SECONDS = REGISTRY.histogram("fakenews_model_load_seconds", "Time to load and warm a model version.")
+MODEL_SWAPS = REGISTRY.counter("fakenews_model_swaps_total", "Model versions swapped into service.")
+
+
+def observe_stages(source, timings):
+    # timings: {stage: seconds}, e.g. StageTimer.timings
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, source=source, stage=stage)
+
+
+def cache_collector(name, stats_fn):
+    # Expose a PredictionCache / NearDuplicateIndex style stats() dict
+    def collect():
+        stats = stats_fn()
+        yield (f"fakenews_{name}_hits_total", "counter", f"{name} lookups that hit.", None, stats["hits"])
+        yield (f"fakenews_{name}_misses_total", "counter", f"{name} lookups that missed.", None, stats["misses"])
+        yield (f"fakenews_{name}_evictions_total", "counter", f"{name} entries evicted.", None, stats["evictions"])
+        yield (f"fakenews_{name}_entries", "gauge", f"{name} entries held.", None, stats["size"])
+        yield (f"fakenews_{name}_hit_ratio", "gauge", f"{name} hit ratio since start.", None, stats["hit_rate"])
+    return collect
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    # Serve /metrics from a daemon thread; returns the server
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_textfile(path, registry=REGISTRY):
+    # Atomic rewrite, so a collector never reads half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+def start_textfile_writer(path, interval=15.0, registry=REGISTRY):
+    def run():
+        while True:
+            try:
+                write_textfile(path, registry)
+            except OSError:
+                logger.exception("Could not write metrics to %s", path)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+    thread.start()
+    return thread
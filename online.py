@@ -0,0 +1,332 @@
+"""Incremental learning from reviewer feedback.
+
+Reviewers submit corrected labels, which are appended to a feedback log and
+buffered by an OnlineLearner. Every --batch-size corrections the learner
+takes a few gradient steps on the logistic loss over that mini-batch. It
+keeps the fixed TF-IDF vocabulary of the served vectorizer, so features stay
+compatible, and starts from the served coefficients, with an L2 pull back
+toward them so a handful of corrections cannot drag the model far.
+
+Each update is checked against a held-out labeled set before it is kept.
+An update that drops held-out accuracy more than --max-accuracy-drop below
+the starting model is rejected. Accepted weights are checkpointed every few
+updates, can be published to the model registry, and in the app are served
+in place (see ModelManager.publish).
+
+A learner belongs to one serving period of its base model: the artifact
+fingerprint plus the registry's promotion id (its lineage). Corrections
+are logged with that lineage, and a learner created for the same lineage
+(a restart) resumes from the newest checkpoint and replays the corrections
+logged after it, including a partly filled batch. A rollback starts a new
+promotion, so the learner for it begins again from the registered weights.
+
+    python online.py replay feedback.jsonl --holdout heldout.jsonl --checkpoint-dir checkpoints
+    python online.py publish checkpoints/online-3a9c48f2-5d1e0c7a9b24-000040.npz --promote
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+import numpy as np
+from scipy.special import expit
+
+from hashing import read_labeled
+from pipeline import LinearScorer
+
+logger = logging.getLogger("fakenews.online")
+
+Update = namedtuple("Update", "step accepted documents seconds holdout")
+
+
+class FeedbackLog:
+    # Append-only JSONL of reviewer corrections; the durable record that a
+    # learner can be replayed from after a restart
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def append(self, text, label, predicted=None, model_version=None, lineage=None):
+        record = {
+            "text": text,
+            "label": int(label),
+            "predicted": None if predicted is None else int(predicted),
+            "model_version": model_version,
+            "lineage": lineage,
+            "submitted": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+        }
+        with self.lock:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            self.count += 1
+        return record
+
+    def records(self, lineage):
+        # The corrections logged for one learner lineage, oldest first
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with self.lock, open(self.path, encoding="utf-8") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            return [record for record in records if record.get("lineage") == lineage]
+
+
+def holdout_metrics(X, y, coef, intercept):
+    decision = X @ coef + intercept
+    return {
+        "accuracy": float(np.mean((decision > 0) == y)),
+        "log_loss": float(np.mean(np.logaddexp(0, decision) - y * decision)),
+    }
+
+
+def sgd_step(coef, intercept, anchor, X, y, learning_rate, alpha, epochs):
+    # Mini-batch gradient descent on the logistic loss with an L2 pull toward
+    # the starting weights. X is sparse, so each step is O(nnz) plus one
+    # dense vector update.
+    coef = coef.copy()
+    n = X.shape[0]
+    for _ in range(epochs):
+        residual = expit(X @ coef + intercept) - y
+        coef -= learning_rate * (X.T @ residual / n + alpha * (coef - anchor))
+        intercept -= learning_rate * float(residual.mean())
+    return coef, intercept
+
+
+class OnlineLearner:
+    def __init__(self, vectorizer, model, holdout=None, base_version="local", base_fingerprint="",
+                 base_promotion=None, learning_rate=0.5, alpha=1e-3, epochs=5, batch_size=16,
+                 max_accuracy_drop=0.01, checkpoint_dir=None, checkpoint_every=10, keep_checkpoints=5,
+                 feedback_log=None, on_update=None):
+        if holdout is None:
+            raise ValueError("Online updates need a held-out labeled set as a guardrail")
+        base = model if isinstance(model, LinearScorer) else LinearScorer.from_model(model)
+        self.vectorizer = vectorizer
+        self.classes = base.classes_
+        self.anchor = base.coef.copy()
+        self.scorer = base
+        self.base_version = base_version
+        self.base_fingerprint = base_fingerprint
+        self.lineage = f"{base_fingerprint[:8]}-{base_promotion or 'local'}"
+        self.learning_rate = learning_rate
+        self.alpha = alpha
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.max_accuracy_drop = max_accuracy_drop
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.keep_checkpoints = keep_checkpoints
+        self.feedback_log = feedback_log
+        self.on_update = None  # set once resumed, so catching up publishes nothing
+        self.lock = threading.Lock()
+        self.pending = []
+        self.step = 0
+        self.consumed = 0  # corrections taken into a mini-batch, accepted or not
+        self.rejected = 0
+        self.last_update = None
+
+        # The held-out set is vectorized once; evaluating a candidate is then
+        # a single sparse matrix-vector product
+        texts, labels = holdout
+        self.X_holdout = vectorizer.transform(texts)
+        self.y_holdout = (np.asarray(labels) == self.classes[1]).astype(np.float64)
+        self.baseline = holdout_metrics(self.X_holdout, self.y_holdout, base.coef, base.intercept)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            self.resume()
+        if feedback_log is not None:
+            self.replay()
+        self.on_update = on_update
+
+    @property
+    def version(self):
+        return f"{self.base_version}+online.{self.step}" if self.step else self.base_version
+
+    def submit(self, text, label):
+        # Buffer one correction; returns an Update when it completed a mini-batch
+        with self.lock:
+            return self._submit(text, label)
+
+    def record(self, text, label, predicted=None, model_version=None):
+        # Log a reviewer correction under this learner's lineage, then submit
+        # it. Both happen under the lock, so batches follow the log order.
+        with self.lock:
+            if self.feedback_log is not None:
+                self.feedback_log.append(text, label, predicted, model_version, lineage=self.lineage)
+            return self._submit(text, label)
+
+    def _submit(self, text, label):
+        # Called with the lock held
+        self.pending.append((text, int(label)))
+        if len(self.pending) < self.batch_size:
+            return None
+        batch, self.pending = self.pending, []
+        return self._update(batch)
+
+    def replay(self):
+        # Re-submit the logged corrections of this lineage that the current
+        # weights do not include yet; returns how many were replayed
+        with self.lock:
+            records = self.feedback_log.records(self.lineage)[self.consumed + len(self.pending):]
+            for record in records:
+                self._submit(record["text"], record["label"])
+        if records:
+            logger.info("Replayed %d logged corrections; online learning at step %d", len(records), self.step)
+        return len(records)
+
+    def flush(self):
+        # Apply whatever is buffered, even if it is less than a full batch
+        with self.lock:
+            batch, self.pending = self.pending, []
+            return self._update(batch) if batch else None
+
+    def _update(self, batch):
+        # Called with the lock held
+        start = time.perf_counter()
+        self.consumed += len(batch)
+        X = self.vectorizer.transform([text for text, _ in batch])
+        y = (np.array([label for _, label in batch]) == self.classes[1]).astype(np.float64)
+        coef, intercept = sgd_step(self.scorer.coef, self.scorer.intercept, self.anchor, X, y,
+                                   self.learning_rate, self.alpha, self.epochs)
+        metrics = holdout_metrics(self.X_holdout, self.y_holdout, coef, intercept)
+        accepted = metrics["accuracy"] >= self.baseline["accuracy"] - self.max_accuracy_drop
+        if accepted:
+            # A new scorer object, so requests holding the old one are unaffected
+            self.scorer = LinearScorer(coef, intercept, self.classes)
+            self.step += 1
+            if self.checkpoint_dir and self.step % self.checkpoint_every == 0:
+                self.checkpoint(metrics)
+            if self.on_update is not None:
+                self.on_update(self)
+        else:
+            self.rejected += 1
+            logger.warning("Rejected online update of %d documents: held-out accuracy %.4f vs baseline %.4f",
+                           len(batch), metrics["accuracy"], self.baseline["accuracy"])
+        self.last_update = Update(self.step, accepted, len(batch), time.perf_counter() - start, metrics)
+        return self.last_update
+
+    def _checkpoint_paths(self):
+        pattern = os.path.join(self.checkpoint_dir, f"online-{self.lineage}-*.npz")
+        return sorted(glob.glob(pattern))
+
+    def checkpoint(self, metrics=None):
+        if metrics is None:
+            metrics = holdout_metrics(self.X_holdout, self.y_holdout, self.scorer.coef, self.scorer.intercept)
+        path = os.path.join(self.checkpoint_dir, f"online-{self.lineage}-{self.step:06d}.npz")
+        np.savez(path, coef=self.scorer.coef, intercept=self.scorer.intercept, classes=self.classes,
+                 step=self.step, consumed=self.consumed, base_version=self.base_version,
+                 base_fingerprint=self.base_fingerprint, lineage=self.lineage, holdout=json.dumps(metrics))
+        for old in self._checkpoint_paths()[:-self.keep_checkpoints]:
+            os.remove(old)
+        return path
+
+    def resume(self):
+        # Continue from the newest checkpoint of the same lineage
+        paths = self._checkpoint_paths()
+        if not paths:
+            return 0
+        scorer, meta = load_checkpoint(paths[-1])
+        self.scorer, self.step, self.consumed = scorer, meta["step"], meta["consumed"]
+        logger.info("Resumed online learning at step %d from %s", self.step, paths[-1])
+        return self.step
+
+    def stats(self):
+        with self.lock:
+            return {
+                "version": self.version,
+                "step": self.step,
+                "consumed": self.consumed,
+                "rejected": self.rejected,
+                "pending": len(self.pending),
+                "batch_size": self.batch_size,
+                "baseline": self.baseline,
+                "last_update": self.last_update._asdict() if self.last_update else None,
+            }
+
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        scorer = LinearScorer(data["coef"], data["intercept"], data["classes"])
+        meta = {
+            "step": int(data["step"]),
+            # Checkpoints from before feedback replay have neither field
+            "consumed": int(data["consumed"]) if "consumed" in data.files else 0,
+            "base_version": str(data["base_version"]),
+            "base_fingerprint": str(data["base_fingerprint"]),
+            "lineage": str(data["lineage"]) if "lineage" in data.files else None,
+            "holdout": json.loads(str(data["holdout"])),
+        }
+    return scorer, meta
+
+
+def publish_checkpoint(path, registry, vectorizer_path, promote=False):
+    # Register checkpointed weights as a regular registry version; the
+    # LinearScorer pickle loads through load_artifacts like model.jb does
+    scorer, meta = load_checkpoint(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.jb")
+        joblib.dump(scorer, model_path)
+        manifest = registry.register(
+            vectorizer_path, model_path,
+            notes=f"online step {meta['step']} on {meta['base_version']} (held-out {meta['holdout']})")
+    if promote:
+        registry.promote(manifest["version"])
+    return manifest
+
+
+def main(argv=None):
+    from registry import ModelManager, ModelRegistry, REGISTRY_DIR
+
+    parser = argparse.ArgumentParser(description="Online learning from reviewer feedback.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="Apply a feedback log to the serving model")
+    replay.add_argument("feedback", help="Labeled JSONL/CSV/Parquet file (text + label fields)")
+    replay.add_argument("--holdout", required=True, help="Held-out labeled file used as the guardrail")
+    replay.add_argument("--checkpoint-dir")
+    replay.add_argument("--checkpoint-every", type=int, default=10)
+    replay.add_argument("--batch-size", type=int, default=16)
+    replay.add_argument("--learning-rate", type=float, default=0.5)
+    replay.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    publish = commands.add_parser("publish", help="Register a checkpoint as a new model version")
+    publish.add_argument("checkpoint")
+    publish.add_argument("--promote", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    registry = ModelRegistry(args.registry)
+    manager = ModelManager(registry)
+    serving = manager.active
+    version, fingerprint, promotion, vectorizer_path, _ = manager.target()
+
+    if args.command == "publish":
+        manifest = publish_checkpoint(args.checkpoint, registry, vectorizer_path, args.promote)
+        print(f"registered {manifest['version']}" + (" and promoted it" if args.promote else ""))
+        return
+
+    learner = OnlineLearner(
+        serving.vectorizer, serving.model, holdout=read_labeled(args.holdout),
+        base_version=version, base_fingerprint=fingerprint, base_promotion=promotion,
+        learning_rate=args.learning_rate, batch_size=args.batch_size, max_accuracy_drop=args.max_accuracy_drop,
+        checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every,
+    )
+    texts, labels = read_labeled(args.feedback)
+    print(f"baseline held-out accuracy {learner.baseline['accuracy']:.4f}, "
+          f"log loss {learner.baseline['log_loss']:.4f}")
+    updates = [learner.submit(text, label) for text, label in zip(texts, labels)] + [learner.flush()]
+    for update in filter(None, updates):
+        print(f"step {update.step:>4} {'accepted' if update.accepted else 'REJECTED'} "
+              f"{update.documents} docs in {update.seconds*1000:.1f} ms, "
+              f"held-out accuracy {update.holdout['accuracy']:.4f}, log loss {update.holdout['log_loss']:.4f}")
+    if args.checkpoint_dir and learner.step:
+        print(f"checkpoint {learner.checkpoint()}")
+
+
+if __name__ == "__main__":
+    main()
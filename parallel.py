@@ -0,0 +1,87 @@
+"""Multi-core scoring engine.
+
+TF-IDF tokenizing runs in pure Python on a single core, so throughput is
+bought with processes: each worker loads the artifacts once, transforms and
+scores its own shard of documents, and ships back only the probability rows.
+Workers are started with forkserver (spawn where that is unavailable), never
+fork: the app and the server fork from processes with live threads, and a
+forked child can inherit locks those threads held.
+
+    with ParallelScorer(workers=8) as scorer:
+        proba = scorer.score(texts)           # (n, 2) array, input order kept
+        for proba in scorer.imap(chunks):     # streaming, one result per chunk
+            ...
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pipeline import MODEL_PATH, VECTORIZER_PATH, chunked, load_artifacts, score_texts
+
+# Per-process artifacts, populated once by _init_worker
+_worker_vectorizer = None
+_worker_model = None
+
+
+def _init_worker(vectorizer_path, model_path, bundle_path):
+    global _worker_vectorizer, _worker_model
+    _worker_vectorizer, _worker_model = load_artifacts(vectorizer_path, model_path, bundle_path=bundle_path)
+
+
+def _score_shard(texts):
+    return score_texts(_worker_vectorizer, _worker_model, texts)
+
+
+def default_mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ParallelScorer:
+    def __init__(self, workers=None, vectorizer_path=VECTORIZER_PATH, model_path=MODEL_PATH,
+                 shard_size=256, bundle_path=None, mp_context=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp_context or default_mp_context(),
+            initializer=_init_worker,
+            initargs=(vectorizer_path, model_path, bundle_path),
+        )
+
+    def score(self, texts):
+        # Score a list of documents; rows come back in input order
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 2))
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        return np.vstack(list(self.executor.map(_score_shard, shards)))
+
+    def imap(self, chunks, prefetch=None):
+        # Score an iterable of document lists lazily, yielding one (n, 2)
+        # array per chunk in order. At most `prefetch` chunks are in flight,
+        # which keeps memory bounded on unbounded inputs.
+        prefetch = prefetch or 2 * self.workers
+        pending = []
+        for chunk in chunks:
+            pending.append(self.executor.submit(_score_shard, list(chunk)))
+            if len(pending) >= prefetch:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    def imap_texts(self, texts):
+        # Convenience wrapper: shard a flat document stream and yield
+        # per-shard probability arrays in order
+        return self.imap(chunked(texts, self.shard_size))
+
+    def close(self, cancel=False):
+        self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(cancel=exc[0] is not None)
@@ -0,0 +1,179 @@
+import os
+
+import joblib
+import numpy as np
+from scipy.special import expit
+
+from analysis import TOKEN_PATTERN
+
+# Default artifact locations, relative to the app directory
+VECTORIZER_PATH = "vectorizer.jb"
+MODEL_PATH = "model.jb"
+# Memory-mappable export of vectorizer.jb (see vocab.py)
+COMPACT_VECTORIZER_PATH = "vectorizer.vocab"
+
+# Model class index -> human readable label
+LABELS = {0: "Fake", 1: "Real"}
+
+
+# Short documents used to check the fused scorer against sklearn at load time
+CANARY_TEXTS = [
+    "The president said on Monday that officials will review the report (2019).",
+    "SHOCKING!!! You won't believe what they are hiding from you",
+    "Markets closed higher as investors weighed new economic data [1].",
+    "",
+]
+
+
+class LinearScorer:
+    """Fused scorer for a binary linear model.
+
+    LogisticRegression.predict and predict_proba each recompute the decision
+    function. This pulls coef_/intercept_ out once and derives the label and
+    the probabilities from a single CSR-times-vector product, using the same
+    operations sklearn does so the output is bit-for-bit identical.
+    """
+
+    def __init__(self, coef, intercept, classes=(0, 1)):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(np.ravel(intercept)[0])
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_model(cls, model):
+        coef = np.asarray(model.coef_)
+        if coef.shape[0] != 1 or len(model.classes_) != 2:
+            raise ValueError("LinearScorer only supports binary linear models")
+        return cls(coef, model.intercept_, model.classes_)
+
+    # sklearn-shaped views, so code written against LogisticRegression works
+    @property
+    def coef_(self):
+        return self.coef.reshape(1, -1)
+
+    @property
+    def intercept_(self):
+        return np.array([self.intercept])
+
+    def decision_function(self, X):
+        return X @ self.coef + self.intercept
+
+    def predict_with_proba(self, X):
+        # Labels and [P(class 0), P(class 1)] rows from one pass over X
+        decision = self.decision_function(X)
+        labels = self.classes_[(decision > 0).astype(int)]
+        prob = expit(decision)
+        return labels, np.vstack([1 - prob, prob]).T
+
+    def predict_proba(self, X):
+        return self.predict_with_proba(X)[1]
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def matches(self, model, X):
+        # Exact comparison against the sklearn model on the rows of X
+        labels, proba = self.predict_with_proba(X)
+        return np.array_equal(labels, model.predict(X)) and np.array_equal(proba, model.predict_proba(X))
+
+
+def fused_scorer(vectorizer, model):
+    # Swap in a LinearScorer when the model supports it and it reproduces
+    # sklearn exactly on the canary batch; otherwise keep the model itself
+    try:
+        scorer = LinearScorer.from_model(model)
+    except (AttributeError, ValueError):
+        return model
+    if not scorer.matches(model, vectorizer.transform(CANARY_TEXTS)):
+        return model
+    return scorer
+
+
+def default_vectorizer_path():
+    # The compact export is opt-in: set FAKENEWS_COMPACT_VOCAB=1 to serve
+    # vectorizer.vocab when one has been generated next to the pickle
+    if os.environ.get("FAKENEWS_COMPACT_VOCAB") == "1" and os.path.exists(COMPACT_VECTORIZER_PATH):
+        return COMPACT_VECTORIZER_PATH
+    return VECTORIZER_PATH
+
+
+def load_vectorizer(path):
+    if path.endswith(".vocab"):
+        from vocab import load_vectorizer as load_compact_vectorizer
+        return load_compact_vectorizer(path)
+    return joblib.load(path)
+
+
+def load_bundle(path):
+    # Single-file serving artifacts that carry both featurizer and weights
+    if path.endswith(".hash.npz"):
+        from hashing import load_hashing_model
+        return load_hashing_model(path)
+    if path.endswith(".compact.npz"):
+        from compact import load_compact_model
+        return load_compact_model(path)
+    raise ValueError(f"Unrecognized serving bundle: {path}")
+
+
+def load_artifacts(vectorizer_path=VECTORIZER_PATH, model_path=MODEL_PATH, fused=True, bundle_path=None):
+    if bundle_path:
+        return load_bundle(bundle_path)
+    vectorizer = load_vectorizer(vectorizer_path)
+    model = joblib.load(model_path)
+    if fused:
+        model = fused_scorer(vectorizer, model)
+    return vectorizer, model
+
+
+def predict_with_proba(model, X):
+    # Works for both LinearScorer and plain sklearn classifiers
+    if isinstance(model, LinearScorer):
+        return model.predict_with_proba(X)
+    return model.predict(X), model.predict_proba(X)
+
+
+def supports_token_input(vectorizer):
+    # True when vectorizer output can be rebuilt from analysis.TOKEN_RE tokens
+    if hasattr(vectorizer, "transform_tokens"):
+        return getattr(vectorizer, "lowercase", True) and vectorizer.token_re.pattern == TOKEN_PATTERN
+    from vocab import SUPPORTED_PARAMS
+    params = vectorizer.get_params()
+    return (all(params.get(name) == value for name, value in SUPPORTED_PARAMS.items())
+            and params.get("lowercase") and params.get("token_pattern") == TOKEN_PATTERN)
+
+
+def transform_tokens(vectorizer, token_lists):
+    # Vectorize pre-tokenized documents (see analysis.analyze_text). For the
+    # pickled TfidfVectorizer this reproduces transform() exactly from the
+    # fitted vocabulary_ and idf_.
+    if hasattr(vectorizer, "transform_tokens"):
+        return vectorizer.transform_tokens(token_lists)
+    from vocab import tfidf_matrix
+    vocabulary = vectorizer.vocabulary_
+    return tfidf_matrix(token_lists, lambda token: vocabulary.get(token, -1), vectorizer.idf_,
+                        vectorizer.norm, vectorizer.sublinear_tf, vectorizer.binary)
+
+
+def vectorize_analyzed(vectorizer, texts, stats):
+    # Reuse the analysis token streams when the vectorizer allows it
+    if supports_token_input(vectorizer):
+        return transform_tokens(vectorizer, [s.tokens for s in stats])
+    return vectorizer.transform(texts)
+
+
+def score_texts(vectorizer, model, texts):
+    # One transform and one predict_proba call for the whole batch.
+    # Returns an (n, 2) array of [P(fake), P(real)] rows.
+    return model.predict_proba(vectorizer.transform(texts))
+
+
+def chunked(iterable, size):
+    # Yield lists of at most `size` items without materializing the input
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
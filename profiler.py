@@ -0,0 +1,113 @@
+"""Opt-in sampling profiler for slow requests.
+
+While a profiled block runs, a helper thread samples the calling thread's
+Python stack every --interval milliseconds. If the block turns out slower
+than the threshold, the samples are written in the collapsed-stack format
+("outer;inner;leaf count" per line), which flamegraph.pl, speedscope and
+inferno read directly. Fast requests discard their samples.
+
+    with SlowRequestProfiler(threshold_ms=250, output_dir="profiles").profile("analysis"):
+        ...
+
+    flamegraph.pl profiles/analysis-*.folded > slow.svg
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("fakenews.profiler")
+
+
+def collapse_stack(frame):
+    # Root-first "file:function" frames joined with ';'
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    # Samples one thread until stop(); see SlowRequestProfiler.start
+    def __init__(self, profiler, name, thread_id):
+        self.profiler = profiler
+        self.name = name
+        self.samples = Counter()
+        self.done = threading.Event()
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self._sample, args=(thread_id,), name="profiler-sampler", daemon=True)
+        self.sampler.start()
+
+    def _sample(self, thread_id):
+        # Gives up after max_seconds in case stop() is never reached
+        while not self.done.wait(self.profiler.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None or time.perf_counter() - self.started > self.profiler.max_seconds:
+                break
+            self.samples[collapse_stack(frame)] += 1
+
+    def stop(self):
+        # Returns the elapsed seconds; slow sessions are written out
+        self.done.set()
+        self.sampler.join()
+        elapsed = time.perf_counter() - self.started
+        if elapsed >= self.profiler.threshold and self.samples:
+            self.profiler.dump(self.name, elapsed, self.samples)
+        return elapsed
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms=500.0, interval_ms=5.0, output_dir="profiles", max_files=200, max_seconds=60.0):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.max_seconds = max_seconds
+        self.lock = threading.Lock()
+        self.dumped = 0
+
+    def start(self, name="request"):
+        # Profile the calling thread until the returned session is stopped
+        return ProfileSession(self, name, threading.get_ident())
+
+    @contextmanager
+    def profile(self, name="request"):
+        session = self.start(name)
+        try:
+            yield session
+        finally:
+            session.stop()
+
+    def dump(self, name, elapsed, samples):
+        with self.lock:
+            if self.dumped >= self.max_files:
+                return None
+            index = self.dumped
+            self.dumped += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.output_dir, f"{name}-{stamp}-{elapsed * 1000:.0f}ms-{os.getpid()}-{index}.folded")
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.warning("Slow %s took %.0f ms; %d stack samples written to %s",
+                       name, elapsed * 1000, sum(samples.values()), path)
+        return path
+
+
+def profiler_from_env(prefix="FAKENEWS_PROFILE"):
+    # FAKENEWS_PROFILE_SLOW_MS turns profiling on; FAKENEWS_PROFILE_DIR and
+    # FAKENEWS_PROFILE_INTERVAL_MS tune it
+    threshold = os.environ.get(f"{prefix}_SLOW_MS")
+    if not threshold:
+        return None
+    return SlowRequestProfiler(
+        threshold_ms=float(threshold),
+        interval_ms=float(os.environ.get(f"{prefix}_INTERVAL_MS", "5")),
+        output_dir=os.environ.get(f"{prefix}_DIR", "profiles"),
+    )
@@ -0,0 +1,344 @@
+"""Versioned model registry and zero-downtime hot reload.
+
+    models/
+        v1/manifest.json  vectorizer.jb  model.jb
+        v2/...
+        CURRENT           version being served and its promotion id
+        history.json      promoted versions, oldest first (for rollback)
+
+    python registry.py register vectorizer.jb model.jb --notes "retrained on May data"
+    python registry.py promote v2
+    python registry.py rollback
+    python registry.py list
+
+ModelManager serves the promoted version. A watcher thread polls CURRENT;
+when it changes, the new pair is checksum-verified, loaded in a side slot
+and warmed with the canary batch while requests keep using the old one, and
+then swapped in with a single reference assignment. Callers read
+`manager.active` once per request, so the vectorizer, model and version they
+use always belong together. Without a registry the manager serves the
+artifacts next to the app and reloads them when the files change.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import numpy as np
+
+from cache import artifact_fingerprint
+from metrics import MODEL_LOAD_SECONDS, MODEL_SWAPS
+from pipeline import CANARY_TEXTS, MODEL_PATH, VECTORIZER_PATH, load_artifacts, predict_with_proba
+
+REGISTRY_DIR = "models"
+
+logger = logging.getLogger("fakenews.registry")
+
+# vectorizer_fingerprint hashes the vectorizer file alone; online updates
+# share it with the version they start from
+LoadedModel = namedtuple("LoadedModel", "version fingerprint vectorizer model vectorizer_fingerprint",
+                         defaults=(None,))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, content):
+    # Readers see either the old file or the new one, never a partial write
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def versions(self):
+        # Registered versions, oldest first
+        if not os.path.isdir(self.root):
+            return []
+        names = [n for n in os.listdir(self.root) if os.path.exists(self._path(n, "manifest.json"))]
+        return sorted(names, key=lambda n: (self.manifest(n)["created"], n))
+
+    def manifest(self, version):
+        with open(self._path(version, "manifest.json")) as f:
+            return json.load(f)
+
+    def register(self, vectorizer_path, model_path, version=None, notes=""):
+        os.makedirs(self.root, exist_ok=True)
+        existing = set(self.versions())
+        if version is None:
+            n = len(existing) + 1
+            while f"v{n}" in existing:
+                n += 1
+            version = f"v{n}"
+        elif version in existing or version in ("CURRENT", "history.json"):
+            raise ValueError(f"Version {version!r} already exists")
+
+        # Copy into a staging directory and rename it into place, so a
+        # half-copied version is never visible
+        staging = tempfile.mkdtemp(dir=self.root, prefix=".staging-")
+        files = {}
+        for role, source in (("vectorizer", vectorizer_path), ("model", model_path)):
+            # The extension is kept since load_vectorizer dispatches on it
+            name = role + os.path.splitext(source)[1]
+            shutil.copyfile(source, os.path.join(staging, name))
+            files[role] = {"name": name, "sha256": file_sha256(source), "size": os.path.getsize(source)}
+        manifest = {
+            "version": version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+            "notes": notes,
+            "files": files,
+        }
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, self._path(version))
+        return manifest
+
+    def artifact_paths(self, version):
+        files = self.manifest(version)["files"]
+        return self._path(version, files["vectorizer"]["name"]), self._path(version, files["model"]["name"])
+
+    def fingerprint(self, version):
+        # Content hash of the pair, the same value cache.artifact_fingerprint
+        # gives for the files, so caches survive registering unchanged files
+        return artifact_fingerprint(self.artifact_paths(version))
+
+    def verify(self, version):
+        # Names of the files whose contents no longer match the manifest
+        mismatched = []
+        for info in self.manifest(version)["files"].values():
+            path = self._path(version, info["name"])
+            if not os.path.exists(path) or file_sha256(path) != info["sha256"]:
+                mismatched.append(info["name"])
+        return mismatched
+
+    def current(self):
+        return self.current_promotion()[0]
+
+    def current_promotion(self):
+        # (version, promotion id) read together. Every promote of a new
+        # version and every rollback gets a fresh id, so state derived from a
+        # serving period (online updates) can tell a rollback from a restart.
+        try:
+            with open(self._path("CURRENT")) as f:
+                lines = f.read().split()
+        except FileNotFoundError:
+            return None, None
+        version = lines[0] if lines else None
+        promotion = lines[1] if len(lines) > 1 else None
+        return version, promotion
+
+    def _set_current(self, version):
+        _atomic_write(self._path("CURRENT"), f"{version}\n{uuid.uuid4().hex[:12]}\n")
+
+    def history(self):
+        try:
+            with open(self._path("history.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def promote(self, version):
+        if version not in self.versions():
+            raise ValueError(f"Unknown version {version!r}")
+        mismatched = self.verify(version)
+        if mismatched:
+            raise ValueError(f"Checksum mismatch in {version}: {', '.join(mismatched)}")
+        history = self.history()
+        if not history or history[-1] != version:
+            history.append(version)
+        _atomic_write(self._path("history.json"), json.dumps(history))
+        if self.current() != version:
+            self._set_current(version)
+
+    def rollback(self):
+        # Re-promote the version that was serving before the current one
+        history = self.history()
+        if len(history) < 2:
+            raise ValueError("No earlier version to roll back to")
+        history.pop()
+        _atomic_write(self._path("history.json"), json.dumps(history))
+        self._set_current(history[-1])
+        return history[-1]
+
+
+class ModelManager:
+    def __init__(self, registry=None, fallback_paths=(VECTORIZER_PATH, MODEL_PATH), poll_interval=2.0):
+        self.registry = registry or ModelRegistry()
+        self.fallback_paths = tuple(fallback_paths)
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()  # serializes loads and swaps; readers never take it
+        self.active = None
+        self.previous = None
+        # (version, fingerprint, promotion id) of the artifacts behind `active`
+        self.base_key = None
+        self.failed = set()  # base keys that failed to load, not retried
+        self.swaps = 0
+        self._stop = threading.Event()
+        self._thread = None
+        # The first load is synchronous so there is always something to serve
+        self.refresh()
+
+    def target(self):
+        # (version, fingerprint, promotion, vectorizer_path, model_path) that
+        # should be serving; the local artifacts have no promotion id
+        version, promotion = self.registry.current_promotion()
+        if version:
+            return (version, self.registry.fingerprint(version), promotion) + self.registry.artifact_paths(version)
+        fingerprint = artifact_fingerprint(self.fallback_paths)
+        return (f"local-{fingerprint[:8]}", fingerprint, None) + self.fallback_paths
+
+    def _load(self, version, fingerprint, vectorizer_path, model_path):
+        started = time.perf_counter()
+        if version in self.registry.versions():
+            mismatched = self.registry.verify(version)
+            if mismatched:
+                raise ValueError(f"Checksum mismatch in {version}: {', '.join(mismatched)}")
+        vectorizer, model = load_artifacts(vectorizer_path, model_path)
+        # Warm up and sanity-check on the canary batch before taking traffic
+        _, proba = predict_with_proba(model, vectorizer.transform(CANARY_TEXTS))
+        if proba.shape != (len(CANARY_TEXTS), 2) or not np.all(np.isfinite(proba)):
+            raise ValueError(f"Version {version} produced invalid canary probabilities")
+        MODEL_LOAD_SECONDS.observe(time.perf_counter() - started)
+        return LoadedModel(version, fingerprint, vectorizer, model, file_sha256(vectorizer_path)[:16])
+
+    def refresh(self):
+        # Swap in the target version if it is not already serving. Returns
+        # True when a swap happened.
+        with self.lock:
+            version, fingerprint, promotion, vectorizer_path, model_path = self.target()
+            key = (version, fingerprint, promotion)
+            if self.base_key == key:
+                return False
+            if key in self.failed:
+                return False
+            if self.previous is not None and self.previous[:2] == key[:2]:
+                # Rolling back to the pair that is still in memory
+                loaded = self.previous
+            else:
+                try:
+                    loaded = self._load(version, fingerprint, vectorizer_path, model_path)
+                except Exception:
+                    if self.active is None:
+                        raise
+                    logger.exception("Loading model version %s failed; still serving %s",
+                                     version, self.active.version)
+                    self.failed.add(key)
+                    return False
+            self.previous, self.active = self.active, loaded
+            self.base_key = key
+            self.swaps += 1
+            MODEL_SWAPS.inc()
+            logger.info("Now serving model version %s", loaded.version)
+            return True
+
+    def publish(self, version, fingerprint, model, base_key):
+        # Serve in-memory weights derived from the active artifacts (e.g.
+        # online updates, see online.py). Refused when another version was
+        # swapped in since `base_key` was read, including a rollback to the
+        # same version; a newly promoted version still replaces published
+        # weights.
+        with self.lock:
+            if base_key != self.base_key:
+                return False
+            loaded = LoadedModel(version, fingerprint, self.active.vectorizer, model,
+                                 self.active.vectorizer_fingerprint)
+            self.previous, self.active = self.active, loaded
+            self.swaps += 1
+            MODEL_SWAPS.inc()
+            logger.info("Now serving model version %s", version)
+            return True
+
+    def rollback(self):
+        version = self.registry.rollback()
+        self.refresh()
+        return version
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Model watcher check failed")
+
+    def stop(self):
+        self._stop.set()
+
+    def collect_metrics(self):
+        # Collector for metrics.Registry: which version is serving
+        yield ("fakenews_model_info", "gauge", "Model version currently serving.",
+               {"version": self.active.version, "fingerprint": self.active.fingerprint}, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts.")
+    parser.add_argument("--root", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show registered versions")
+    register = commands.add_parser("register", help="Copy an artifact pair in as a new version")
+    register.add_argument("vectorizer")
+    register.add_argument("model")
+    register.add_argument("--version")
+    register.add_argument("--notes", default="")
+    register.add_argument("--promote", action="store_true", help="Serve the new version right away")
+    promote = commands.add_parser("promote", help="Serve a registered version")
+    promote.add_argument("version")
+    commands.add_parser("rollback", help="Serve the previously promoted version again")
+    verify = commands.add_parser("verify", help="Check artifact checksums")
+    verify.add_argument("version", nargs="?")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        current = registry.current()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version:<12} {manifest['created']}  {registry.fingerprint(version)}  {manifest['notes']}")
+    elif args.command == "register":
+        manifest = registry.register(args.vectorizer, args.model, args.version, args.notes)
+        print(f"registered {manifest['version']}")
+        if args.promote:
+            registry.promote(manifest["version"])
+            print(f"promoted {manifest['version']}")
+    elif args.command == "promote":
+        registry.promote(args.version)
+        print(f"promoted {args.version}")
+    elif args.command == "rollback":
+        print(f"rolled back to {registry.rollback()}")
+    elif args.command == "verify":
+        failed = False
+        for version in [args.version] if args.version else registry.versions():
+            mismatched = registry.verify(version)
+            failed |= bool(mismatched)
+            print(f"{version}: {'mismatch in ' + ', '.join(mismatched) if mismatched else 'ok'}")
+        if failed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Standalone HTTP scoring service with dynamic micro-batching.
+
+    python server.py --port 8000 --max-batch-size 64 --max-wait-ms 5
+
+Endpoints:
+    POST /v1/predict        {"text": "..."}            -> one prediction
+    POST /v1/predict/batch  {"texts": ["...", ...]}     -> {"predictions": [...]}
+    GET  /healthz           process is up
+    GET  /readyz            models are loaded and the batcher is running
+    GET  /metrics           Prometheus metrics (see metrics.py)
+
+Every prediction carries the model version that produced it. With
+--registry the service follows the promoted version in a model registry
+(see registry.py) and hot-swaps new versions without dropping requests.
+
+Concurrent requests are queued and scored together: a batch is closed when
+it reaches --max-batch-size documents or when its oldest document has waited
+--max-wait-ms, and each batch is vectorized and scored with one call. When
+more than --max-queue documents are waiting, new requests get 503 with a
+Retry-After header instead of growing the queue.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+from metrics import CONTENT_TYPE, INPUT_CHARS, REGISTRY, REQUEST_SECONDS, REQUESTS, STAGE_SECONDS
+from pipeline import LABELS, MODEL_PATH, VECTORIZER_PATH, load_artifacts, predict_with_proba
+from profiler import SlowRequestProfiler
+from registry import LoadedModel, ModelManager, ModelRegistry
+
+logger = logging.getLogger("fakenews.server")
+
+BATCH_SIZE = REGISTRY.histogram("fakenews_batch_documents", "Documents per scored micro-batch.",
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=5.0, max_queue=1024):
+        # score_fn(texts) -> (labels, proba, model_version) and runs off the event loop
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+        self.task = None
+        self.batches = 0
+        self.documents = 0
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.executor.shutdown(wait=False)
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    async def submit(self, texts):
+        # Queue every text or none of them, then wait for all results
+        if self.queue.qsize() + len(texts) > self.queue.maxsize:
+            raise Overloaded()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                labels, proba, version = await loop.run_in_executor(self.executor, self.score_fn, texts)
+            except Exception as e:
+                logger.exception("Scoring a batch of %d documents failed", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), label, row in zip(batch, labels, proba):
+                if not future.done():
+                    future.set_result(prediction_dict(label, row, version))
+            self.batches += 1
+            self.documents += len(batch)
+            BATCH_SIZE.observe(len(batch))
+
+
+def prediction_dict(label, proba_row, model_version):
+    return {
+        "label": LABELS[int(label)],
+        "prob_fake": float(proba_row[0]),
+        "prob_real": float(proba_row[1]),
+        "model_version": model_version,
+    }
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload))
+
+    def read_json(self):
+        try:
+            payload = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Request body is not valid JSON")
+        if not isinstance(payload, dict):
+            raise tornado.web.HTTPError(400, reason="Request body must be a JSON object")
+        return payload
+
+    def write_error(self, status_code, **kwargs):
+        # send_error() clears headers, so backpressure hints are added here
+        if status_code == 503:
+            self.set_header("Retry-After", "1")
+        self.write_json({"error": self._reason}, status=status_code)
+
+    async def predict(self, texts):
+        if not self.service.ready:
+            REQUESTS.inc(source="server", outcome="not_ready")
+            raise tornado.web.HTTPError(503, reason="Models are still loading")
+        started = time.perf_counter()
+        try:
+            results = await self.service.batcher.submit(texts)
+        except Overloaded:
+            REQUESTS.inc(source="server", outcome="overloaded")
+            raise tornado.web.HTTPError(503, reason="Scoring queue is full")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, source="server")
+        REQUESTS.inc(source="server", outcome="ok")
+        for text in texts:
+            INPUT_CHARS.observe(len(text), source="server")
+        return results
+
+
+class PredictHandler(BaseHandler):
+    async def post(self):
+        text = self.read_json().get("text")
+        if not isinstance(text, str):
+            raise tornado.web.HTTPError(400, reason="Expected a 'text' string")
+        (result,) = await self.predict([text])
+        self.write_json(result)
+
+
+class BatchPredictHandler(BaseHandler):
+    async def post(self):
+        texts = self.read_json().get("texts")
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise tornado.web.HTTPError(400, reason="Expected a 'texts' list of strings")
+        if len(texts) > self.service.max_request_docs:
+            raise tornado.web.HTTPError(
+                413, reason=f"At most {self.service.max_request_docs} texts per request")
+        results = await self.predict(texts) if texts else []
+        self.write_json({"predictions": results})
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok", "uptime_s": time.monotonic() - self.service.started})
+
+
+class ReadyHandler(BaseHandler):
+    def get(self):
+        batcher = self.service.batcher
+        serving = self.service.serving
+        self.write_json({
+            "ready": self.service.ready,
+            "model_version": serving.version if serving is not None else None,
+            "queue_depth": batcher.queue.qsize(),
+            "batches": batcher.batches,
+            "documents": batcher.documents,
+        }, status=200 if self.service.ready else 503)
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.finish(REGISTRY.render())
+
+
+class ScoringService:
+    def __init__(self, vectorizer_path=VECTORIZER_PATH, model_path=MODEL_PATH, bundle_path=None,
+                 max_batch_size=64, max_wait_ms=5.0, max_queue=1024, max_request_docs=1000,
+                 registry_root=None, profiler=None):
+        self.paths = (vectorizer_path, model_path, bundle_path)
+        self.registry_root = registry_root
+        self.manager = None
+        self.static = None
+        self.profiler = profiler
+        self.max_request_docs = max_request_docs
+        self.batcher = MicroBatcher(self.score, max_batch_size, max_wait_ms, max_queue)
+        self.started = time.monotonic()
+        # Unregistered by close(), so services created one after another
+        # (tests, reloads) do not repeat the queue gauge on /metrics
+        REGISTRY.register_collector(self.collect_metrics)
+
+    def close(self):
+        REGISTRY.unregister_collector(self.collect_metrics)
+        self.batcher.stop()
+        if self.manager is not None:
+            self.manager.stop()
+
+    def collect_metrics(self):
+        yield ("fakenews_queue_documents", "gauge", "Documents waiting in the batching queue.", None,
+               self.batcher.queue.qsize())
+        if self.manager is not None:
+            yield from self.manager.collect_metrics()
+
+    @property
+    def serving(self):
+        return self.manager.active if self.manager is not None else self.static
+
+    @property
+    def ready(self):
+        return self.serving is not None and self.batcher.running
+
+    def load(self):
+        vectorizer_path, model_path, bundle_path = self.paths
+        if self.registry_root:
+            registry = ModelRegistry(self.registry_root)
+            self.manager = ModelManager(registry, fallback_paths=(vectorizer_path, model_path)).start()
+            return
+        vectorizer, model = load_artifacts(vectorizer_path, model_path, bundle_path=bundle_path)
+        version = os.path.basename(bundle_path) if bundle_path else os.path.basename(model_path)
+        self.static = LoadedModel(version, None, vectorizer, model)
+
+    def score(self, texts):
+        # One read of the serving slot per batch, so a hot swap never splits a batch
+        serving = self.serving
+        session = self.profiler.start("batch") if self.profiler is not None else None
+        try:
+            started = time.perf_counter()
+            X = serving.vectorizer.transform(texts)
+            vectorized = time.perf_counter()
+            labels, proba = predict_with_proba(serving.model, X)
+            STAGE_SECONDS.observe(vectorized - started, source="server", stage="vectorize")
+            STAGE_SECONDS.observe(time.perf_counter() - vectorized, source="server", stage="score")
+        finally:
+            # A failing batch must not leave its sampler thread running
+            if session is not None:
+                session.stop()
+        return labels, proba, serving.version
+
+    def make_app(self):
+        args = {"service": self}
+        return tornado.web.Application([
+            (r"/v1/predict", PredictHandler, args),
+            (r"/v1/predict/batch", BatchPredictHandler, args),
+            (r"/healthz", HealthHandler, args),
+            (r"/readyz", ReadyHandler, args),
+            (r"/metrics", MetricsHandler, args),
+        ])
+
+    async def start(self, host="127.0.0.1", port=8000):
+        # Serve health checks right away and load the models in the
+        # background; /readyz flips to 200 once scoring is possible
+        server = self.make_app().listen(port, address=host)
+        self.batcher.start()
+        await asyncio.get_running_loop().run_in_executor(self.batcher.executor, self.load)
+        logger.info("Models loaded, serving on http://%s:%d", host, port)
+        return server
+
+
+async def serve(service, host, port):
+    try:
+        await service.start(host, port)
+        await asyncio.Event().wait()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fake news scoring HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=1024, help="Queued documents before returning 503")
+    parser.add_argument("--max-request-docs", type=int, default=1000, help="Texts allowed per bulk request")
+    parser.add_argument("--vectorizer", default=VECTORIZER_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--bundle", default=None, help="Single-file serving artifact (e.g. model.hash.npz)")
+    parser.add_argument("--registry", default=None,
+                        help="Model registry directory to serve from, with hot reload (see registry.py)")
+    parser.add_argument("--profile-slow-ms", type=float, default=None,
+                        help="Sample stacks of batches slower than this and write flamegraph input to --profile-dir")
+    parser.add_argument("--profile-dir", default="profiles")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    profiler = None
+    if args.profile_slow_ms is not None:
+        profiler = SlowRequestProfiler(threshold_ms=args.profile_slow_ms, output_dir=args.profile_dir)
+    service = ScoringService(args.vectorizer, args.model, args.bundle, args.max_batch_size,
+                             args.max_wait_ms, args.max_queue, args.max_request_docs, args.registry, profiler)
+    asyncio.run(serve(service, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import csv
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import batch_score
+from batch_score import open_writer, read_records, result_rows
+from conftest import ROOT
+
+RECORDS = [
+    {"id": "a1", "text": "Officials said the report was released on Monday."},
+    {"text": "Shocking truth they are hiding from you."},
+    {"id": "a3", "text": ""},
+]
+
+
+def write_corpus(path, records=RECORDS):
+    fmt = batch_score.detect_format(path)
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n\n" for record in records)
+    elif fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(key for record in records for key in record)))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        pq.write_table(pa.Table.from_pylist([dict(record, id=record.get("id")) for record in records]), path)
+
+
+@pytest.mark.parametrize("name", ["corpus.jsonl", "corpus.csv", "corpus.parquet"])
+def test_readers_stream_ids_and_texts(tmp_path, name):
+    path = str(tmp_path / name)
+    write_corpus(path)
+    assert [text for _, text in read_records(path)] == [record["text"] for record in RECORDS]
+    assert [doc_id for doc_id, _ in read_records(path)] == [0, 1, 2]
+    ids = [doc_id for doc_id, _ in read_records(path, id_field="id")]
+    assert ids[0] == "a1" and ids[2] == "a3"
+
+
+def test_require_id_rejects_records_without_one(tmp_path):
+    path = str(tmp_path / "corpus.jsonl")
+    write_corpus(path)
+    with pytest.raises(ValueError, match="Record 1 has no 'id' field"):
+        list(read_records(path, id_field="id", require_id=True))
+
+
+@pytest.mark.parametrize("name", ["corpus.jsonl", "corpus.csv", "corpus.parquet"])
+def test_label_field_yields_labels_and_rejects_unlabeled_records(tmp_path, name):
+    path = str(tmp_path / name)
+    labeled = [dict(record, label=label) for record, label in zip(RECORDS, ["real", "fake", "1"])]
+    write_corpus(path, labeled)
+    assert [(text, label) for _, text, label in read_records(path, label_field="label")] == [
+        (record["text"], record["label"]) for record in labeled]
+    write_corpus(path, labeled[:1] + [dict(labeled[1], label="")] + labeled[2:])
+    with pytest.raises(ValueError, match="Record 1 has no label in .label."):
+        list(read_records(path, label_field="label"))
+
+
+def test_unknown_extension_is_rejected():
+    with pytest.raises(ValueError):
+        batch_score.detect_format("corpus.txt")
+
+
+@pytest.mark.parametrize("name", ["scores.jsonl", "scores.csv", "scores.parquet"])
+def test_writers_append_chunks(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = open_writer(path)
+    # Row-number ids in one chunk and string ids in the next
+    writer.write_rows(list(result_rows([0, 1], [[0.9, 0.1], [0.2, 0.8]])))
+    writer.write_rows(list(result_rows(["doc-7"], [[0.4, 0.6]])))
+    writer.close()
+    if name.endswith(".parquet"):
+        rows = pq.read_table(path).to_pylist()
+    elif name.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+    assert [str(row["id"]) for row in rows] == ["0", "1", "doc-7"]
+    assert [row["label"] for row in rows] == ["Fake", "Real", "Real"]
+    assert float(rows[1]["prob_real"]) == 0.8
+
+
+def test_empty_parquet_output_has_the_schema(tmp_path):
+    path = str(tmp_path / "scores.parquet")
+    open_writer(path).close()
+    table = pq.read_table(path)
+    assert table.num_rows == 0 and table.column_names == batch_score.OUTPUT_FIELDS
+
+
+def test_cli_scores_a_corpus(tmp_path):
+    vectorizer_path, model_path = os.path.join(ROOT, "vectorizer.jb"), os.path.join(ROOT, "model.jb")
+    if not (os.path.exists(vectorizer_path) and os.path.exists(model_path)):
+        pytest.skip("model artifacts not present")
+    source, output = str(tmp_path / "corpus.jsonl"), str(tmp_path / "scores.csv")
+    write_corpus(source, RECORDS * 5)
+    batch_score.main([source, output, "--id-field", "id", "--chunk-size", "4",
+                      "--vectorizer", vectorizer_path, "--model", model_path])
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 15
+    assert [row["id"] for row in rows[:3]] == ["a1", "1", "a3"]
+    assert {row["label"] for row in rows} <= {"Fake", "Real"}
+    assert all(abs(float(row["prob_fake"]) + float(row["prob_real"]) - 1) < 1e-9 for row in rows)
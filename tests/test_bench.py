@@ -0,0 +1,83 @@
+import json
+
+import joblib
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import bench
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+] * 5
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    vectorizer = TfidfVectorizer().fit(DOCS)
+    model = LogisticRegression().fit(vectorizer.transform(DOCS), [1, 0] * 5)
+    joblib.dump(vectorizer, tmp_path / "vectorizer.jb")
+    joblib.dump(model, tmp_path / "model.jb")
+    return str(tmp_path / "vectorizer.jb"), str(tmp_path / "model.jb")
+
+
+def stats(p50_ms, noise_ms=0.0):
+    return {"p50_ms": p50_ms, "p50_noise_ms": noise_ms}
+
+
+def test_summarize_reports_the_median_trial_and_its_spread():
+    trials = [[0.001, 0.002, 0.003], [0.002, 0.004, 0.006], [0.001, 0.001, 0.001]]
+    result = bench.summarize(trials, batch_size=10)
+    assert result["calls"] == 9
+    assert result["p50_ms"] == pytest.approx(2.0)
+    assert result["p50_noise_ms"] == pytest.approx(3.0)
+    assert result["docs_per_sec"] == pytest.approx(5000)
+
+
+def test_compare_ignores_slowdowns_within_trial_noise():
+    baseline = {"a": stats(0.341, 0.06), "b": stats(10.0, 0.5), "c": stats(10.0)}
+    results = {"a": stats(0.446, 0.07), "b": stats(14.0, 0.5), "c": stats(11.0), "new": stats(1.0)}
+    assert bench.compare_to_baseline(results, baseline, threshold=0.25) == [("b", 10.0, 14.0)]
+
+
+def test_compare_accepts_baselines_without_noise():
+    baseline = {"a": {"p50_ms": 1.0}}
+    assert bench.compare_to_baseline({"a": stats(2.0)}, baseline, threshold=0.25) == [("a", 1.0, 2.0)]
+    assert bench.compare_to_baseline({"a": stats(1.04)}, baseline, threshold=0.01, min_delta_ms=0.05) == []
+
+
+def test_make_batches_bounds_the_timed_documents():
+    assert len(bench.make_batches(DOCS, 1000, 2000)) == 3
+    batches = bench.make_batches(DOCS, 10, 200)
+    assert len(batches) == 20 and all(len(batch) == 10 for batch in batches)
+
+
+def test_cold_start_runs_from_any_directory(artifacts, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = bench.bench_cold_start("vectorizer.jb", "model.jb", repeats=1)
+    assert result["calls"] == 1 and result["p50_ms"] > 0
+
+
+def test_main_writes_report_and_fails_on_regression(artifacts, tmp_path):
+    output = str(tmp_path / "bench.json")
+    common = ["--vectorizer", artifacts[0], "--model", artifacts[1], "--batch-sizes", "1,5",
+              "--lengths", "20", "--corpus-size", "20", "--max-docs", "20", "--trials", "2",
+              "--cold-start-runs", "1", "--output", output]
+    bench.main(common)
+    with open(output) as f:
+        report = json.load(f)
+    assert report["meta"]["peak_rss_mb"] > 0
+    entry = report["corpora"]["synthetic20"]["transform/5"]
+    assert entry["calls"] == 8 and "rss_delta_mb" in entry and "p50_noise_ms" in entry
+
+    # A baseline 1000x faster than anything measurable must be flagged
+    for stages in report["corpora"].values():
+        for entry in stages.values():
+            entry.update(p50_ms=entry["p50_ms"] / 1000, p50_noise_ms=0.0)
+    baseline = str(tmp_path / "baseline.json")
+    with open(baseline, "w") as f:
+        json.dump(report, f)
+    with pytest.raises(SystemExit) as exc:
+        bench.main(common + ["--baseline", baseline, "--min-delta-ms", "0"])
+    assert exc.value.code == 1
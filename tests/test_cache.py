@@ -0,0 +1,83 @@
+import numpy as np
+
+import cache as cache_module
+from cache import PredictionCache, score_with_cache
+from explain import Explanation, TermContribution
+
+
+class CountingVectorizer:
+    def __init__(self):
+        self.seen = []
+
+    def transform(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(text)] for text in texts], dtype=float)
+
+
+class LengthModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        fake = np.clip(X[:, 0] / 100, 0, 1)
+        return np.column_stack([fake, 1 - fake])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def test_entries_are_scoped_to_the_callers_fingerprint(tmp_path):
+    cache = PredictionCache(capacity=10, path=str(tmp_path / "cache.db"), fingerprint_fn=None)
+    cache.put("some  story", 1, [0.2, 0.8], fingerprint="v1")
+    label, proba, explanation = cache.get("some story", fingerprint="v1")
+    assert label == 1 and np.allclose(proba, [0.2, 0.8]) and explanation is None
+    assert cache.get("some story", fingerprint="v2") is None
+    # A v2 request (or a v1 request still in flight) leaves the other version alone
+    cache.put("some story", 0, [0.9, 0.1], fingerprint="v2")
+    assert cache.get("some story", fingerprint="v1")[0] == 1
+    assert cache.get("some story", fingerprint="v2")[0] == 0
+    assert cache.stats()["invalidations"] == 0
+
+    cache.memory.clear()
+    assert cache.get("some story", fingerprint="v1")[0] == 1
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_explanations_are_served_from_both_tiers(tmp_path):
+    explanation = Explanation([TermContribution("reuters", 1.5, 0.4)], [TermContribution("shocking", -0.7, 0.2)],
+                              1.5, -0.7, 0.1, 0.9)
+    cache = PredictionCache(capacity=10, path=str(tmp_path / "cache.db"), fingerprint_fn=None)
+    cache.put("some story", 1, [0.3, 0.7], fingerprint="v1", explanation=explanation)
+    assert cache.get("some story", fingerprint="v1").explanation is explanation
+    cache.memory.clear()
+    assert cache.get("some story", fingerprint="v1").explanation == explanation
+
+
+def test_idle_fingerprints_are_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache(capacity=10, path=path, fingerprint_fn=None, purge_after=60)
+    cache.put("old story", 1, [0.2, 0.8], fingerprint="v1")
+    now[0] += 30
+    cache.put("new story", 0, [0.9, 0.1], fingerprint="v2")
+    now[0] += 45  # v1 idle for 75s, v2 for 45s
+    assert cache.get("new story", fingerprint="v2") is not None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.get("old story", fingerprint="v1") is None
+    cache.close()
+
+    # Only v2 is left on disk
+    reopened = PredictionCache(capacity=10, path=path, fingerprint_fn=None)
+    assert set(reopened.last_used) == {"v2"}
+    reopened.purge(max_idle=-1)
+    assert reopened.get("new story", fingerprint="v2") is None
+
+
+def test_score_with_cache_only_vectorizes_misses():
+    cache = PredictionCache(capacity=10, fingerprint_fn=lambda: "fp")
+    vectorizer, model = CountingVectorizer(), LengthModel()
+    first = score_with_cache(cache, vectorizer, model, ["a" * 30, "b" * 70])
+    second = score_with_cache(cache, vectorizer, model, ["b" * 70, "c" * 10], fingerprint="fp")
+    assert vectorizer.seen == ["a" * 30, "b" * 70, "c" * 10]
+    assert list(first[0]) == [1, 0] and list(second[0]) == [0, 1]
+    assert np.allclose(second[1][0], first[1][1])
@@ -0,0 +1,33 @@
+import random
+
+from chunked import iter_text_chunks, iter_windows, iter_words
+
+
+def test_words_cut_across_chunks_are_joined():
+    assert list(iter_words(["alpha be", "ta gam", "ma ", "delta"])) == ["alpha", "beta", "gamma", "delta"]
+
+
+def test_carry_is_flushed_past_max_word_chars():
+    chunks = iter_text_chunks("x" * 10_000 + " tail", chunk_chars=1000)
+    words = list(iter_words(chunks, max_word_chars=2500))
+    assert words[-1] == "tail"
+    assert "".join(words[:-1]) == "x" * 10_000
+    assert max(len(word) for word in words) <= 2500 + 1000
+
+
+def test_windows_overlap_and_cover_the_tail():
+    windows = list(iter_windows((str(i) for i in range(10)), window_words=4, overlap=1))
+    assert [(w.start_word, w.end_word) for w in windows] == [(0, 4), (3, 7), (6, 10)]
+    assert windows[-1].text == "6 7 8 9"
+
+
+def test_streamed_statistics_match_analyze_text():
+    from analysis import analyze_text, analyze_words
+
+    rng = random.Random(4)
+    pieces = ["word", "Claims", "end.", "really?!", "...", "[12]", "(2019)", "wait", "!", "x"]
+    for _ in range(50):
+        text = "".join(rng.choice(pieces) + rng.choice([" ", "  ", "\n", ""]) for _ in range(rng.randint(0, 400)))
+        expected = analyze_text(text, tokenize=False)
+        chunks = iter_text_chunks(text, chunk_chars=rng.randint(1, 50))
+        assert analyze_words(iter_words(chunks), batch_words=rng.randint(1, 30)) == expected
@@ -0,0 +1,80 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import compact
+from explain import feature_terms
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+    "the central bank said markets were calm after the data release",
+    "you will not believe what the government is hiding about the vaccine",
+] * 5
+LABELS = [1, 0, 1, 0] * 5
+
+
+def export(tmp_path, **options):
+    vectorizer = TfidfVectorizer().fit(DOCS)
+    model = LogisticRegression(C=10).fit(vectorizer.transform(DOCS), LABELS)
+    path = str(tmp_path / "model.compact.npz")
+    compact.export(vectorizer, model, path, **options)
+    return vectorizer, model, path
+
+
+def test_unpruned_export_reproduces_the_model(tmp_path):
+    vectorizer, model, path = export(tmp_path, min_coef=0.0)
+    with np.load(path) as data:
+        assert data["idf"].dtype == np.float32
+    featurizer, scorer = compact.load_compact_model(path)
+    texts = DOCS[:4] + ["reuters said the vaccine data was released", ""]
+    expected = model.predict_proba(vectorizer.transform(texts))
+    assert np.abs(scorer.predict_proba(featurizer.transform(texts)) - expected).max() < 1e-6
+
+
+def test_pruned_export_keeps_float16_idf_and_shares_terms(tmp_path):
+    _, _, path = export(tmp_path, min_coef=0.5, quantize="int8")
+    with np.load(path) as data:
+        assert data["idf"].dtype == np.float16
+    featurizer, _ = compact.load_compact_model(path)
+    assert featurizer.n_weighted < len(featurizer.terms)
+    assert feature_terms(featurizer) is featurizer.terms
+
+
+def test_round_trip_keeps_kept_terms_first_in_the_term_table(tmp_path):
+    vectorizer, model, path = export(tmp_path, min_coef=0.5)
+    featurizer, scorer = compact.load_compact_model(path)
+    keep, weights = compact.fold_weights(vectorizer, model, 0.5)
+    names = vectorizer.get_feature_names_out()
+    assert list(featurizer.get_feature_names_out()) == list(names[keep])
+    assert np.allclose(scorer.coef, weights.astype(np.float32))
+    assert len(featurizer.terms) == len(names)
+    for term in names:
+        assert featurizer.terms[featurizer.index(term)] == term
+    assert featurizer.index("not-a-term") == -1
+
+    # Exports from before the term table stored newline-joined terms only
+    with np.load(path) as data:
+        legacy = {name: data[name] for name in data.files if name not in ("offsets", "slots")}
+    legacy["terms"] = np.frombuffer("\n".join(featurizer.terms[i] for i in range(len(names))).encode(), np.uint8)
+    legacy_path = str(tmp_path / "legacy.compact.npz")
+    np.savez_compressed(legacy_path, **legacy)
+    texts = DOCS[:4] + ["reuters said the vaccine data was released"]
+    old, _ = compact.load_compact_model(legacy_path)
+    assert (old.transform(texts) != featurizer.transform(texts)).nnz == 0
+
+
+def test_int8_export_agrees_with_the_model(tmp_path):
+    vectorizer, model, path = export(tmp_path, min_coef=0.0, quantize="int8")
+    with np.load(path) as data:
+        assert data["weights"].dtype == np.int8
+        scale = float(data["scale"])
+    featurizer, scorer = compact.load_compact_model(path)
+    _, weights = compact.fold_weights(vectorizer, model)
+    # Symmetric rounding errs by at most half a step per weight
+    assert np.abs(scorer.coef - weights).max() <= scale / 2 + 1e-12
+    texts = DOCS[:4] + ["reuters said the vaccine data was released", "they are hiding the truth", ""]
+    expected = model.predict_proba(vectorizer.transform(texts))
+    actual = scorer.predict_proba(featurizer.transform(texts))
+    assert np.array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+    assert np.abs(actual - expected).max() < 0.01
@@ -0,0 +1,82 @@
+import numpy as np
+
+import dedup
+from dedup import NearDuplicateIndex
+
+
+def make_index(**options):
+    return NearDuplicateIndex(fingerprint_fn=lambda: "fp", **options)
+
+
+def article(i):
+    return " ".join(f"story{i} word{j} token{i * j}" for j in range(20))
+
+
+def test_matches_light_edits():
+    index = make_index(capacity=10)
+    index.add(0, [0.9, 0.1], text=article(1))
+    match = index.query(text=article(1) + " Updated.")
+    assert match is not None and match.label == 0 and match.similarity >= 0.8
+    assert index.query(text=article(2)) is None
+
+
+def test_evicts_least_recently_used_like_a_full_scan():
+    rng = np.random.default_rng(0)
+    index = make_index(capacity=8)
+    for step in range(200):
+        i = int(rng.integers(30))
+        if rng.random() < 0.5 and index.query(text=article(i)) is not None:
+            continue
+        used = np.flatnonzero(index.records["used"])
+        expected = int(used[index.records["stamp"][used].argmin()]) if len(index.free) == 0 else None
+        slot = index.add(1, [0.2, 0.8], text=article(i))
+        if expected is not None:
+            assert slot == expected
+    assert len(index) == 8
+    assert len(index.lru_heap) <= 4 * index.capacity + 1
+
+
+def test_flush_persists_to_disk(tmp_path):
+    path = str(tmp_path / "dedup")
+    index = make_index(capacity=4, path=path)
+    index.add(0, [0.7, 0.3], text=article(3))
+    index.flush()
+    reopened = make_index(capacity=4, path=path)
+    assert len(reopened) == 1
+    assert reopened.query(text=article(3)).label == 0
+
+
+def test_explicit_fingerprint_overrides_fingerprint_fn():
+    index = NearDuplicateIndex(capacity=4, fingerprint_fn=None)
+    index.add(0, [0.6, 0.4], text=article(7), fingerprint="v1")
+    assert index.query(text=article(7), fingerprint="v1") is not None
+    assert index.query(text=article(7), fingerprint="v2") is None
+    # Versions keep separate verdicts for the same story and never wipe each other
+    index.add(1, [0.3, 0.7], text=article(7), fingerprint="v2")
+    assert len(index) == 2
+    assert index.query(text=article(7), fingerprint="v1").label == 0
+    assert index.query(text=article(7), fingerprint="v2").label == 1
+
+
+def test_idle_fingerprints_are_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: now[0])
+    path = str(tmp_path / "dedup")
+    index = NearDuplicateIndex(capacity=4, path=path, fingerprint_fn=None, purge_after=60)
+    index.add(0, [0.6, 0.4], text=article(1), fingerprint="v1")
+    index.add(0, [0.6, 0.4], text=article(2), fingerprint="v1")
+    now[0] += 30
+    index.add(1, [0.3, 0.7], text=article(3), fingerprint="v2")
+    now[0] += 45  # v1 idle for 75s, v2 for 45s
+    assert index.query(text=article(3), fingerprint="v2") is not None
+    assert len(index) == 1 and index.fingerprints == [None, "v2"]
+    assert index.query(text=article(1), fingerprint="v1") is None
+    # The freed id and slots are reused
+    index.add(0, [0.6, 0.4], text=article(4), fingerprint="v3")
+    assert index.fingerprints == ["v3", "v2"]
+    index.flush()
+
+    reopened = NearDuplicateIndex(capacity=4, path=path, fingerprint_fn=None)
+    assert len(reopened) == 2
+    assert reopened.query(text=article(4), fingerprint="v3").label == 0
+    assert reopened.query(text=article(4), fingerprint="v2") is None
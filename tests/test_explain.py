@@ -0,0 +1,74 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import compact
+from explain import Explainer
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+    "the central bank said markets were calm after the data release",
+    "you will not believe what the government is hiding about the vaccine",
+    "reuters reported that officials will investigate the claims",
+    "breaking shocking claims spread online without any sources",
+] * 5
+LABELS = [1, 0, 1, 0, 1, 0] * 5
+
+
+def fitted():
+    vectorizer = TfidfVectorizer().fit(DOCS)
+    model = LogisticRegression(C=10).fit(vectorizer.transform(DOCS), LABELS)
+    return vectorizer, model
+
+
+def brute_force(explainer, X, row, top_k):
+    # Reference: sort the row's contributions and take both tails
+    start, end = X.indptr[row], X.indptr[row + 1]
+    entries = [(float(c), explainer.terms[i]) for i, c in
+               zip(X.indices[start:end], X.data[start:end] * explainer.coef[X.indices[start:end]])]
+    real = sorted((e for e in entries if e[0] > 0), reverse=True)[:top_k]
+    fake = sorted(e for e in entries if e[0] < 0)[:top_k]
+    return real, fake
+
+
+def test_batch_top_k_matches_per_row_sort():
+    rng = np.random.default_rng(3)
+    X = sp.random(300, 200, density=0.1, format="lil", random_state=4)
+    X.rows[7], X.data[7] = [], []  # an empty row
+    X = X.tocsr()
+    model = LogisticRegression().fit(X, rng.integers(0, 2, 300))
+    explainer = Explainer(None, model, terms=np.array([f"t{i}" for i in range(200)], dtype=object))
+    explanations = explainer.explain(X, top_k=4)
+    decision = model.decision_function(X)
+    for row, explanation in enumerate(explanations):
+        real, fake = brute_force(explainer, X, row, 4)
+        assert [(t.contribution, t.term) for t in explanation.real_terms] == real
+        assert [(t.contribution, t.term) for t in explanation.fake_terms] == fake
+        assert np.isclose(explanation.decision, decision[row])
+    assert explanations[7] == explainer.explain(X[7])[0]
+    assert explanations[7].real_terms == [] and explanations[7].decision == explainer.intercept
+
+
+def test_values_are_python_floats():
+    vectorizer, model = fitted()
+    explanation = Explainer(vectorizer, model).explain_texts([DOCS[1]])[0]
+    terms = explanation.real_terms + explanation.fake_terms
+    assert terms
+    assert all(type(t.contribution) is float and type(t.tfidf) is float for t in terms)
+    assert type(explanation.real_total) is float and type(explanation.fake_total) is float
+
+
+def test_compact_bundle_reports_real_tfidf(tmp_path):
+    vectorizer, model = fitted()
+    path = str(tmp_path / "model.compact.npz")
+    compact.export(vectorizer, model, path, min_coef=0.0)
+    featurizer, scorer = compact.load_compact_model(path)
+    reference = Explainer(vectorizer, model).explain_texts(DOCS[:6])
+    explained = Explainer(featurizer, scorer).explain_texts(DOCS[:6])
+    for expected, actual in zip(reference, explained):
+        assert [t.term for t in actual.fake_terms] == [t.term for t in expected.fake_terms]
+        assert np.allclose([t.tfidf for t in actual.fake_terms], [t.tfidf for t in expected.fake_terms], rtol=1e-3)
+        assert np.allclose([t.contribution for t in actual.real_terms],
+                           [t.contribution for t in expected.real_terms], rtol=1e-3)
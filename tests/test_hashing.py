@@ -0,0 +1,102 @@
+import json
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+import hashing
+from pipeline import LinearScorer
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+    "the central bank said markets were calm after the data release",
+    "you will not believe what the government is hiding about the vaccine",
+] * 5
+LABELS = [1, 0, 1, 0] * 5
+
+
+def fitted(**options):
+    vectorizer = TfidfVectorizer(**options).fit(DOCS)
+    return vectorizer, LogisticRegression(C=10).fit(vectorizer.transform(DOCS), LABELS)
+
+
+def write_corpus(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"text": text, "label": ["fake", "real"][label]}) + "\n"
+                     for text, label in zip(DOCS, LABELS))
+
+
+def test_convert_without_collisions_reproduces_the_model(tmp_path):
+    vectorizer, model = fitted()
+    idf, coef, intercept, collisions = hashing.convert(vectorizer, model)
+    assert collisions == 0
+    path = str(tmp_path / "model.hash.npz")
+    hashing.save_hashing_model(path, idf, coef, intercept)
+    featurizer, scorer = hashing.load_hashing_model(path)
+    texts = DOCS[:4] + ["reuters said the vaccine data was released", "", "unseen words only"]
+    expected = model.predict_proba(vectorizer.transform(texts))
+    assert np.abs(scorer.predict_proba(featurizer.transform(texts)) - expected).max() < 1e-5
+
+
+def test_convert_folds_colliding_terms():
+    vectorizer, model = fitted()
+    idf, coef, _, collisions = hashing.convert(vectorizer, model, n_features=8)
+    assert collisions == len(vectorizer.vocabulary_) - np.count_nonzero(idf)
+    # Each bucket keeps the mean idf * coef of the terms folded into it
+    buckets = {term: hashing.bucket_of(term, 8) for term in vectorizer.vocabulary_}
+    bucket = buckets["reuters"]
+    members = [vectorizer.vocabulary_[term] for term, b in buckets.items() if b == bucket]
+    weights = vectorizer.idf_[members] * model.coef_.ravel()[members]
+    assert idf[bucket] * coef[bucket] == pytest.approx(weights.mean())
+
+
+def test_convert_rejects_unsupported_settings():
+    with pytest.raises(ValueError, match="sublinear_tf"):
+        hashing.convert(*fitted(sublinear_tf=True))
+
+
+def test_train_separates_the_labels():
+    idf, coef, intercept = hashing.train(DOCS, LABELS, n_features=2**12, C=10)
+    featurizer = hashing.HashingTfidfVectorizer(idf)
+    labels, _ = LinearScorer(coef, intercept).predict_with_proba(featurizer.transform(DOCS))
+    assert list(labels) == LABELS
+    assert idf[featurizer.index("reuters")] > 1
+
+
+def test_read_labeled_parses_labels_and_allows_unlabeled_corpora(tmp_path):
+    path = str(tmp_path / "labeled.jsonl")
+    write_corpus(path)
+    texts, labels = hashing.read_labeled(path, limit=6)
+    assert texts == DOCS[:6] and labels == LABELS[:6]
+    assert hashing.read_labeled(path, label_field=None)[1] == [None] * len(DOCS)
+    with pytest.raises(ValueError, match="Unrecognized label"):
+        hashing.parse_label("maybe")
+
+
+def test_compare_reports_agreement_and_accuracy():
+    vectorizer, model = fitted()
+    reference = (vectorizer, LinearScorer.from_model(model))
+    report = hashing.compare(DOCS, LABELS, reference, reference)
+    assert report["agreement"] == 1.0 and report["max_abs_prob_drift"] == 0.0
+    assert report["reference_accuracy"] == report["candidate_accuracy"] == 1.0
+    assert "reference_accuracy" not in hashing.compare(DOCS, [None] * len(DOCS), reference, reference)
+
+
+def test_cli_convert_train_and_evaluate(tmp_path, capsys):
+    vectorizer, model = fitted()
+    joblib.dump(vectorizer, tmp_path / "vectorizer.jb")
+    joblib.dump(model, tmp_path / "model.jb")
+    corpus = str(tmp_path / "labeled.jsonl")
+    write_corpus(corpus)
+    common = ["--vectorizer", str(tmp_path / "vectorizer.jb"), "--model", str(tmp_path / "model.jb"),
+              "--n-features", "4096"]
+
+    hashing.main(common + ["convert", str(tmp_path / "converted.npz"), "--eval", corpus])
+    assert "agreement: 1" in capsys.readouterr().out
+    hashing.main(common + ["train", corpus, str(tmp_path / "trained.npz"), "--test-size", "0.25"])
+    assert "held-out evaluation on 5 documents" in capsys.readouterr().out
+    hashing.main(common + ["evaluate", str(tmp_path / "trained.npz"), corpus, "--limit", "8"])
+    assert "documents: 8" in capsys.readouterr().out
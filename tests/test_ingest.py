@@ -0,0 +1,143 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingest import UrlCache, extract_article, fetch_articles
+
+ARTICLE_PAGE = b"""<html><head><title>Council  approves budget</title></head><body>
+<nav><p>Home | World | Sports</p></nav>
+<p>Sign up for our newsletter</p>
+<article><h1>Council approves budget</h1><p>The council voted 7-2 on Monday.</p>
+<script>track()</script><p>The plan takes effect in <b>January</b>.</p></article>
+<footer><p>Copyright</p></footer></body></html>"""
+
+MAX_BYTES = 4096
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = Counter()
+
+    def send_body(self, body, status=200, content_type="text/html; charset=utf-8", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == "/article":
+            self.send_body(ARTICLE_PAGE)
+        elif self.path == "/latin1":
+            self.send_body("<p>Café au lait coûte 2€</p>".encode("cp1252"),
+                           content_type="text/html; charset=windows-1252")
+        elif self.path == "/flaky":
+            if self.hits[self.path] == 1:
+                self.send_body(b"busy", status=503)
+            else:
+                self.send_body(b"<p>Back up.</p>")
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_body(b"<p>Versioned story.</p>", headers=[("ETag", '"v1"')])
+        elif self.path == "/huge":
+            self.send_body(b"<p>" + b"x" * (3 * MAX_BYTES) + b"</p>")
+        elif self.path == "/huge-chunked":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(12):
+                chunk = b"<p>" + b"y" * 1000 + b"</p>"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_body(b"not found", status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(urls, **options):
+    options.setdefault("backoff", 0)
+    options.setdefault("max_bytes", MAX_BYTES)
+    return fetch_articles(urls, **options)
+
+
+def test_prefers_article_paragraphs_over_boilerplate(stub_server):
+    (article,) = fetch([stub_server + "/article"])
+    assert article.error is None and article.status == 200
+    assert article.title == "Council approves budget"
+    assert article.text == ("Council approves budget\n\nThe council voted 7-2 on Monday.\n\n"
+                            "The plan takes effect in January.")
+
+
+def test_extract_article_without_article_element():
+    title, text = extract_article("<title>T</title><nav><p>menu</p></nav><p>One<br>two</p><p>Three")
+    assert (title, text) == ("T", "One two\n\nThree")
+
+
+def test_decodes_declared_charset(stub_server):
+    (article,) = fetch([stub_server + "/latin1"])
+    assert article.text == "Café au lait coûte 2€"
+
+
+def test_retries_transient_errors(stub_server):
+    StubHandler.hits.clear()
+    (article,) = fetch([stub_server + "/flaky"], retries=2)
+    assert article.error is None and article.text == "Back up."
+    assert StubHandler.hits["/flaky"] == 2
+
+
+def test_does_not_retry_not_found(stub_server):
+    StubHandler.hits.clear()
+    (article,) = fetch([stub_server + "/missing"], retries=2)
+    assert article.status == 404 and article.error == "HTTP 404 Not Found"
+    assert StubHandler.hits["/missing"] == 1
+
+
+def test_revalidates_cached_pages_with_etag(stub_server):
+    cache = UrlCache()
+    (first,) = fetch([stub_server + "/etag"], cache=cache)
+    (second,) = fetch([stub_server + "/etag"], cache=cache)
+    assert not first.from_cache and second.from_cache
+    assert second.text == first.text == "Versioned story."
+
+
+@pytest.mark.parametrize("path", ["/huge", "/huge-chunked"])
+def test_oversized_pages_fail_without_retry(stub_server, path):
+    StubHandler.hits.clear()
+    (article,) = fetch([stub_server + path], retries=2)
+    assert article.error == f"Page is larger than {MAX_BYTES:,} bytes"
+    assert article.text == ""
+    assert StubHandler.hits[path] == 1
+
+
+@pytest.mark.parametrize("url", ["ftp://example.com/story", "file:///etc/passwd", "example.com/story"])
+def test_rejects_non_http_urls(url):
+    (article,) = fetch([url])
+    assert article.error == "Only http(s) URLs are supported"
+
+
+def test_results_keep_input_order(stub_server):
+    urls = [stub_server + path for path in ("/missing", "/article", "/latin1")]
+    assert [article.url for article in fetch(urls)] == urls
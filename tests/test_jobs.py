@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import threading
+import time
+
+import numpy as np
+
+from jobs import CANCELLED, DONE, FINISHED, JobManager
+from registry import LoadedModel
+
+
+class LengthVectorizer:
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    def transform(self, texts):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return np.array([[len(text)] for text in texts], dtype=float)
+
+
+class LengthModel:
+    def predict_proba(self, X):
+        real = (X[:, 0] > 10).astype(float) * 0.8 + 0.1
+        return np.column_stack([1 - real, real])
+
+
+class StubManager:
+    def __init__(self, vectorizer):
+        self.active = LoadedModel("stub-1", "fp", vectorizer, LengthModel())
+
+    def target(self):
+        return "stub-1", "fp", None, "vectorizer.jb", "model.jb"
+
+
+def corpus(n):
+    lines = [json.dumps({"id": f"d{i}", "text": "x" * i}) for i in range(n)]
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_job_scores_every_record(tmp_path):
+    manager = JobManager(StubManager(LengthVectorizer()), workdir=str(tmp_path), workers=1, chunk_size=7)
+    job = manager.submit("articles.jsonl", corpus(20), id_field="id")
+    wait_until(lambda: job.status in FINISHED)
+    assert job.status == DONE and job.total == job.processed == 20
+    assert job.model_version == "stub-1" and job.finished >= job.started
+    with open(job.output_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == [f"d{i}" for i in range(20)]
+    assert {row["label"] for row in rows[11:]} == {"Real"}
+    assert manager.remove(job.id) and manager.get(job.id) is None
+
+
+def test_cancelling_queued_and_running_jobs(tmp_path):
+    gate = threading.Event()
+    manager = JobManager(StubManager(LengthVectorizer(gate)), workdir=str(tmp_path), workers=1, chunk_size=5)
+    running = manager.submit("first.jsonl", corpus(50))
+    queued = manager.submit("second.jsonl", corpus(50))
+    wait_until(lambda: running.started is not None)
+
+    manager.cancel(queued.id)
+    assert queued.status == CANCELLED and queued.finished is not None
+    assert not manager.remove(running.id)  # still running
+
+    manager.cancel(running.id)
+    gate.set()
+    wait_until(lambda: running.status in FINISHED)
+    assert running.status == CANCELLED and running.processed < 50
+    manager.executor.shutdown(wait=True)
+    assert queued.started is None and queued.processed == 0
@@ -0,0 +1,126 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from online import FeedbackLog, OnlineLearner, load_checkpoint, publish_checkpoint
+from pipeline import load_artifacts
+from registry import ModelRegistry
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+    "the central bank said markets were calm after the data release",
+    "you will not believe what the government is hiding about the vaccine",
+]
+LABELS = [1, 0, 1, 0]
+CORRECTIONS = [
+    ("reuters said the bank report was released", 1),
+    ("they are hiding the shocking truth", 0),
+    ("officials said markets were calm", 1),
+    ("share this before it is deleted", 0),
+] * 3
+
+
+@pytest.fixture(scope="module")
+def pair():
+    vectorizer = TfidfVectorizer().fit(DOCS)
+    return vectorizer, LogisticRegression(C=10).fit(vectorizer.transform(DOCS), LABELS)
+
+
+def make_learner(pair, **options):
+    options.setdefault("batch_size", 4)
+    return OnlineLearner(*pair, holdout=(DOCS, LABELS), base_version="v1", base_fingerprint="f" * 16, **options)
+
+
+def test_needs_a_holdout(pair):
+    with pytest.raises(ValueError, match="held-out"):
+        OnlineLearner(*pair)
+
+
+def test_full_batch_updates_and_publishes(pair):
+    published = []
+    learner = make_learner(pair, on_update=published.append)
+    start = learner.scorer
+    assert [learner.submit(*c) for c in CORRECTIONS[:3]] == [None] * 3
+    update = learner.submit(*CORRECTIONS[3])
+    assert update.accepted and update.step == 1 and update.documents == 4
+    assert learner.version == "v1+online.1" and published == [learner]
+    assert learner.scorer is not start and not np.array_equal(learner.scorer.coef, start.coef)
+    learner.submit(*CORRECTIONS[4])
+    assert learner.flush().documents == 1 and learner.stats()["consumed"] == 5
+
+
+def test_guardrail_rejects_updates_that_hurt_the_holdout(pair):
+    published = []
+    learner = make_learner(pair, learning_rate=50, epochs=50, max_accuracy_drop=0.0, on_update=published.append)
+    start = learner.scorer
+    flipped = [(text, 1 - label) for text, label in CORRECTIONS[:4]]
+    update = [learner.submit(*c) for c in flipped][-1]
+    assert not update.accepted and update.holdout["accuracy"] < learner.baseline["accuracy"]
+    assert learner.scorer is start and learner.step == 0 and learner.rejected == 1
+    assert published == []
+
+
+def test_checkpoints_round_trip_per_lineage(pair, tmp_path):
+    checkpoints = str(tmp_path / "checkpoints")
+    learner = make_learner(pair, checkpoint_dir=checkpoints, checkpoint_every=1, keep_checkpoints=2)
+    for correction in CORRECTIONS:
+        learner.submit(*correction)
+    assert learner.step == 3 and len(os.listdir(checkpoints)) == 2
+
+    scorer, meta = load_checkpoint(learner._checkpoint_paths()[-1])
+    assert meta["step"] == 3 and meta["consumed"] == 12 and meta["lineage"] == learner.lineage
+    assert np.array_equal(scorer.coef, learner.scorer.coef) and scorer.intercept == learner.scorer.intercept
+
+    resumed = make_learner(pair, checkpoint_dir=checkpoints)
+    assert resumed.step == 3 and np.array_equal(resumed.scorer.coef, learner.scorer.coef)
+    # A rollback is a new promotion of the base: it starts from the registered weights
+    fresh = make_learner(pair, checkpoint_dir=checkpoints, base_promotion="after-rollback")
+    assert fresh.step == 0 and np.array_equal(fresh.scorer.coef, learner.anchor)
+
+
+@pytest.mark.parametrize("checkpoint", [True, False])
+def test_restart_replays_logged_corrections(pair, tmp_path, checkpoint):
+    checkpoints = str(tmp_path / "checkpoints") if checkpoint else None
+    log = FeedbackLog(str(tmp_path / "feedback.jsonl"))
+    learner = make_learner(pair, feedback_log=log, checkpoint_dir=checkpoints, checkpoint_every=1)
+    for text, label in CORRECTIONS[:6]:
+        learner.record(text, label, predicted=1 - label, model_version=learner.version)
+    assert learner.step == 1 and learner.stats()["pending"] == 2
+
+    # After a restart the partly filled batch is pending again and the next
+    # corrections continue exactly where the first process stopped
+    published = []
+    restarted = make_learner(pair, feedback_log=log, checkpoint_dir=checkpoints, on_update=published.append)
+    assert restarted.step == 1 and restarted.stats()["pending"] == 2 and published == []
+    for text, label in CORRECTIONS[6:8]:
+        restarted.record(text, label)
+    uninterrupted = make_learner(pair)
+    for correction in CORRECTIONS[:8]:
+        uninterrupted.submit(*correction)
+    assert restarted.step == 2 and published == [restarted]
+    assert np.allclose(restarted.scorer.coef, uninterrupted.scorer.coef)
+
+    other = make_learner(pair, feedback_log=log, base_promotion="after-rollback")
+    assert other.step == 0 and other.stats()["pending"] == 0
+    assert len(log.records(learner.lineage)) == 8
+
+
+def test_publish_checkpoint_registers_a_loadable_version(pair, tmp_path):
+    learner = make_learner(pair, checkpoint_dir=str(tmp_path / "checkpoints"))
+    for correction in CORRECTIONS[:4]:
+        learner.submit(*correction)
+    path = learner.checkpoint()
+    vectorizer_path = str(tmp_path / "vectorizer.jb")
+    joblib.dump(pair[0], vectorizer_path)
+    registry = ModelRegistry(str(tmp_path / "models"))
+
+    manifest = publish_checkpoint(path, registry, vectorizer_path, promote=True)
+    assert registry.current() == manifest["version"] and "online step 1 on v1" in manifest["notes"]
+    vectorizer, model = load_artifacts(*registry.artifact_paths(manifest["version"]))
+    X = vectorizer.transform(DOCS)
+    assert np.allclose(model.predict_proba(X), learner.scorer.predict_proba(X))
@@ -0,0 +1,59 @@
+import os
+import time
+import numpy as np
+import pytest
+
+from batch_score import score_stream, score_stream_parallel
+from conftest import ROOT
+from parallel import ParallelScorer, _score_shard
+from pipeline import load_artifacts
+
+VECTORIZER_PATH, MODEL_PATH = os.path.join(ROOT, "vectorizer.jb"), os.path.join(ROOT, "model.jb")
+
+pytestmark = pytest.mark.skipif(not (os.path.exists(VECTORIZER_PATH) and os.path.exists(MODEL_PATH)),
+                                reason="model artifacts not present")
+
+WORDS = ["officials", "said", "report", "shocking", "truth", "hiding", "reuters", "government", "vaccine", "the"]
+
+
+def records(n):
+    rng = np.random.default_rng(5)
+    return [(f"doc-{i}", " ".join(rng.choice(WORDS, rng.integers(0, 60)))) for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    with ParallelScorer(2, VECTORIZER_PATH, MODEL_PATH, shard_size=16) as scorer:
+        yield scorer
+
+
+def test_parallel_stream_matches_in_process_stream(scorer):
+    corpus = records(230)
+    vectorizer, model = load_artifacts(VECTORIZER_PATH, MODEL_PATH)
+    expected = list(score_stream(iter(corpus), vectorizer, model, chunk_size=50))
+    actual = list(score_stream_parallel(iter(corpus), scorer, chunk_size=50))
+    assert [ids for ids, _ in actual] == [ids for ids, _ in expected]
+    assert [doc_id for ids, _ in actual for doc_id in ids] == [doc_id for doc_id, _ in corpus]
+    for (_, got), (_, want) in zip(actual, expected):
+        assert np.array_equal(got, want)
+
+
+def test_score_keeps_input_order(scorer):
+    texts = [text for _, text in records(100)]
+    vectorizer, model = load_artifacts(VECTORIZER_PATH, MODEL_PATH)
+    assert np.array_equal(scorer.score(texts), model.predict_proba(vectorizer.transform(texts)))
+    assert scorer.score([]).shape == (0, 2)
+
+
+def test_close_with_cancel_drops_pending_work():
+    scorer = ParallelScorer(1, VECTORIZER_PATH, MODEL_PATH)
+    texts = [text for _, text in records(200)]
+    assert scorer.score(texts[:5]).shape == (5, 2)  # worker is up
+    futures = [scorer.executor.submit(_score_shard, texts) for _ in range(40)]
+    scorer.close(cancel=True)
+    deadline = time.monotonic() + 60
+    while not all(future.done() for future in futures) and time.monotonic() < deadline:
+        time.sleep(0.05)  # cancellation happens on the executor's manager thread
+    assert sum(future.cancelled() for future in futures) > 30
+    with pytest.raises(RuntimeError):
+        scorer.score(["after close"])
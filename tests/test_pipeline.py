@@ -0,0 +1,45 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.linear_model import LogisticRegression
+
+from conftest import ROOT
+from pipeline import LinearScorer, fused_scorer
+
+WORDS = ["the", "president", "said", "report", "shocking", "officials", "markets", "hiding", "truth", "data",
+         "breaking", "reuters", "sources", "claims", "investigate", "government", "economy", "vaccine"]
+
+
+def random_documents(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, rng.integers(0, 300))) for _ in range(n)]
+
+
+def assert_identical(scorer, model, X):
+    assert np.array_equal(scorer.decision_function(X), model.decision_function(X))
+    assert np.array_equal(scorer.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(scorer.predict(X), model.predict(X))
+    labels, proba = scorer.predict_with_proba(X)
+    assert np.array_equal(labels, model.predict(X))
+    assert np.array_equal(proba, model.predict_proba(X))
+
+
+def test_linear_scorer_matches_fitted_logistic_regression():
+    rng = np.random.default_rng(1)
+    X = sp.random(2000, 500, density=0.02, format="csr", random_state=2)
+    y = rng.integers(0, 2, 2000)
+    model = LogisticRegression(max_iter=200).fit(X, y)
+    assert_identical(LinearScorer.from_model(model), model, X)
+
+
+def test_linear_scorer_matches_shipped_model():
+    vectorizer_path, model_path = os.path.join(ROOT, "vectorizer.jb"), os.path.join(ROOT, "model.jb")
+    if not (os.path.exists(vectorizer_path) and os.path.exists(model_path)):
+        pytest.skip("model artifacts not present")
+    vectorizer, model = joblib.load(vectorizer_path), joblib.load(model_path)
+    X = vectorizer.transform(random_documents(2000) + [""])
+    assert_identical(LinearScorer.from_model(model), model, X)
+    assert isinstance(fused_scorer(vectorizer, model), LinearScorer)
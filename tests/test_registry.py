@@ -0,0 +1,132 @@
+import threading
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from registry import ModelManager, ModelRegistry
+
+DOCS = [
+    "officials said the report was released by reuters on monday",
+    "shocking truth they are hiding from you share before it is deleted",
+    "the central bank said markets were calm after the data release",
+    "you will not believe what the government is hiding about the vaccine",
+]
+TEXTS = ["reuters said the bank report was released", "the truth they are hiding"]
+
+
+def write_pair(directory, name, labels):
+    # Each pair gets its own vocabulary, so mixing one version's vectorizer
+    # with another's model fails loudly
+    vectorizer = TfidfVectorizer().fit(DOCS if labels[0] else DOCS[::-1] + ["extra words here"])
+    model = LogisticRegression(C=10).fit(vectorizer.transform(DOCS), labels)
+    paths = str(directory / f"{name}.vectorizer.jb"), str(directory / f"{name}.model.jb")
+    joblib.dump(vectorizer, paths[0])
+    joblib.dump(model, paths[1])
+    return paths, model.predict_proba(vectorizer.transform(TEXTS))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    expected = {}
+    for version, labels in (("v1", [1, 0, 1, 0]), ("v2", [0, 1, 0, 1])):
+        paths, expected[version] = write_pair(tmp_path, version, labels)
+        registry.register(*paths, version=version)
+    registry.promote("v1")
+    registry.expected = expected
+    return registry
+
+
+def test_swap_and_rollback_keep_version_and_artifacts_together(registry):
+    manager = ModelManager(registry)
+    first, first_key = manager.active, manager.base_key
+    assert first.version == "v1" and not manager.refresh()
+    registry.promote("v1")  # promoting the serving version again changes nothing
+    assert manager.base_key == first_key and not manager.refresh()
+
+    registry.promote("v2")
+    assert manager.refresh()
+    assert manager.active.version == "v2" and manager.previous is first
+    proba = manager.active.model.predict_proba(manager.active.vectorizer.transform(TEXTS))
+    assert np.allclose(proba, registry.expected["v2"])
+
+    assert manager.rollback() == "v1"
+    assert manager.active is first  # reused from memory, not reloaded
+    assert manager.swaps == 3
+    # Same version and artifacts, but a new serving period
+    assert manager.base_key[:2] == first[:2] and manager.base_key[2] != first_key[2]
+
+
+def test_failed_load_keeps_serving_and_is_not_retried(registry, tmp_path, monkeypatch):
+    manager = ModelManager(registry)
+    # Corrupt artifacts whose manifest matches, so only loading can catch them
+    broken = tmp_path / "broken.model.jb"
+    broken.write_bytes(b"not a pickle")
+    registry.register(str(tmp_path / "v2.vectorizer.jb"), str(broken), version="v3")
+    registry.promote("v3")
+    assert not manager.refresh()
+    assert manager.active.version == "v1"
+    assert manager.failed == {("v3", registry.fingerprint("v3"), registry.current_promotion()[1])}
+
+    loads = []
+    monkeypatch.setattr(manager, "_load", lambda *args: loads.append(args))
+    assert not manager.refresh() and loads == []
+
+
+def test_checksum_mismatch_is_refused(registry):
+    manager = ModelManager(registry)
+    vectorizer_path, _ = registry.artifact_paths("v2")
+    with open(vectorizer_path, "ab") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        registry.promote("v2")
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        manager._load("v2", registry.fingerprint("v2"), *registry.artifact_paths("v2"))
+    assert registry.verify("v2") == ["vectorizer.jb"]
+
+
+def test_publish_is_refused_after_a_swap(registry):
+    manager = ModelManager(registry)
+    base_key = manager.base_key
+    vectorizer_fingerprint = manager.active.vectorizer_fingerprint
+    assert manager.publish("v1+1", base_key[1] + "+1", manager.active.model, base_key)
+    assert manager.active.version == "v1+1" and manager.base_key == base_key
+    assert manager.active.vectorizer_fingerprint == vectorizer_fingerprint
+
+    registry.promote("v2")
+    assert manager.refresh()
+    assert not manager.publish("v1+2", base_key[1] + "+2", manager.previous.model, base_key)
+    assert manager.active.version == "v2" and manager.active.vectorizer_fingerprint != vectorizer_fingerprint
+
+
+def test_readers_never_see_a_mixed_pair_during_swaps(registry):
+    manager = ModelManager(registry)
+    stop = threading.Event()
+    errors, reads = [], [0]
+
+    def read():
+        while not stop.is_set():
+            serving = manager.active  # read once, as request handlers do
+            try:
+                proba = serving.model.predict_proba(serving.vectorizer.transform(TEXTS))
+                assert np.allclose(proba, registry.expected[serving.version])
+            except Exception as exc:
+                errors.append(exc)
+            reads[0] += 1
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    try:
+        for i in range(30):
+            registry.promote(["v2", "v1"][i % 2])
+            manager.refresh()
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+    assert manager.swaps == 31
+    assert reads[0] > 0 and errors == []
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+import tornado.gen
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+from metrics import REGISTRY
+from registry import LoadedModel
+from server import ScoringService
+
+
+class StubVectorizer:
+    def transform(self, texts):
+        return np.array([[len(text)] for text in texts], dtype=float)
+
+
+class StubModel:
+    # "Real" for texts longer than 10 characters
+    def predict(self, X):
+        return (X[:, 0] > 10).astype(int)
+
+    def predict_proba(self, X):
+        real = (X[:, 0] > 10).astype(float) * 0.8 + 0.1
+        return np.column_stack([1 - real, real])
+
+
+class ServerTestCase(AsyncHTTPTestCase):
+    service_options = {}
+
+    def get_app(self):
+        options = dict(max_batch_size=64, max_wait_ms=50, max_queue=1024, max_request_docs=1000)
+        options.update(self.service_options)
+        self.service = ScoringService(**options)
+        self.service.static = LoadedModel("stub-1", None, StubVectorizer(), StubModel())
+        return self.service.make_app()
+
+    def setUp(self):
+        super().setUp()
+        self.io_loop.run_sync(self._start_batcher)
+
+    async def _start_batcher(self):
+        self.service.batcher.start()
+
+    def tearDown(self):
+        self.io_loop.run_sync(self._close_service)
+        super().tearDown()
+
+    async def _close_service(self):
+        self.service.close()
+        await asyncio.sleep(0)
+
+    def post(self, path, payload):
+        body = payload if isinstance(payload, (bytes, str)) else json.dumps(payload)
+        return self.fetch(path, method="POST", body=body, raise_error=False)
+
+
+class TestPredict(ServerTestCase):
+    def test_single_prediction_carries_model_version(self):
+        response = self.post("/v1/predict", {"text": "a fairly long article text"})
+        assert response.code == 200
+        result = json.loads(response.body)
+        assert result["label"] == "Real"
+        assert result["model_version"] == "stub-1"
+        assert abs(result["prob_fake"] + result["prob_real"] - 1) < 1e-12
+
+    def test_batch_endpoint_keeps_order(self):
+        response = self.post("/v1/predict/batch", {"texts": ["short", "a fairly long article text", ""]})
+        assert response.code == 200
+        labels = [p["label"] for p in json.loads(response.body)["predictions"]]
+        assert labels == ["Fake", "Real", "Fake"]
+
+    @gen_test
+    async def test_concurrent_requests_share_batches(self):
+        requests = [
+            self.http_client.fetch(self.get_url("/v1/predict"), method="POST",
+                                   body=json.dumps({"text": f"article number {i}"}))
+            for i in range(16)
+        ]
+        responses = await tornado.gen.multi(requests)
+        assert all(response.code == 200 for response in responses)
+        assert self.service.batcher.documents == 16
+        assert self.service.batcher.batches < 16
+
+    def test_rejects_bodies_that_are_not_json_objects(self):
+        for body in ("[1, 2]", '"text"', "null", "{not json"):
+            response = self.post("/v1/predict", body)
+            assert response.code == 400, body
+            assert "error" in json.loads(response.body)
+
+    def test_rejects_missing_text(self):
+        assert self.post("/v1/predict", {"texts": ["x"]}).code == 400
+        assert self.post("/v1/predict/batch", {"texts": ["x", 1]}).code == 400
+
+    def test_ready_reports_model_version(self):
+        response = self.fetch("/readyz")
+        assert response.code == 200
+        assert json.loads(response.body)["model_version"] == "stub-1"
+
+
+class TestLimits(ServerTestCase):
+    service_options = {"max_queue": 2, "max_request_docs": 3}
+
+    def test_too_many_texts_is_413(self):
+        response = self.post("/v1/predict/batch", {"texts": ["a", "b", "c", "d"]})
+        assert response.code == 413
+
+    def test_full_queue_is_503_with_retry_after(self):
+        response = self.post("/v1/predict/batch", {"texts": ["a", "b", "c"]})
+        assert response.code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    @gen_test
+    async def test_backpressure_while_scoring_is_busy(self):
+        score = self.service.score
+        scoring, release = threading.Event(), threading.Event()
+
+        def blocking_score(texts):
+            scoring.set()
+            release.wait(5)
+            return score(texts)
+
+        self.service.batcher.score_fn = blocking_score
+        url = self.get_url("/v1/predict/batch")
+
+        async def wait_for(condition):
+            while not condition():
+                await tornado.gen.sleep(0.01)
+
+        # The first request is taken off the queue and held in the scorer;
+        # the next two fill the queue, so the fourth is turned away
+        first = self.http_client.fetch(url, method="POST", body=json.dumps({"texts": ["a"]}))
+        await wait_for(scoring.is_set)
+        queued = self.http_client.fetch(url, method="POST", body=json.dumps({"texts": ["b", "c"]}))
+        await wait_for(lambda: self.service.batcher.queue.qsize() == 2)
+        rejected = await self.http_client.fetch(url, method="POST", body=json.dumps({"texts": ["d"]}),
+                                                raise_error=False)
+        release.set()
+        assert rejected.code == 503
+        assert rejected.headers["Retry-After"] == "1"
+        assert (await first).code == 200
+        assert (await queued).code == 200
+
+
+class TestMetrics(ServerTestCase):
+    def test_closed_services_leave_the_registry(self):
+        other = ScoringService()
+        other.close()
+        response = self.fetch("/metrics")
+        assert response.code == 200
+        assert response.body.decode().count("# TYPE fakenews_queue_documents gauge") == 1
+        assert response.body.decode().count("\nfakenews_queue_documents ") == 1
+        assert other.collect_metrics not in REGISTRY.collectors
+
+
+class FailingVectorizer:
+    def transform(self, texts):
+        raise RuntimeError("vectorizer exploded")
+
+
+class RecordingProfiler:
+    def __init__(self):
+        self.stopped = 0
+
+    def start(self, name):
+        return self
+
+    def stop(self):
+        self.stopped += 1
+
+
+def test_profile_session_is_stopped_when_scoring_fails():
+    service = ScoringService(profiler=RecordingProfiler())
+    service.static = LoadedModel("broken", None, FailingVectorizer(), StubModel())
+    try:
+        with pytest.raises(RuntimeError):
+            service.score(["text"])
+        assert service.profiler.stopped == 1
+    finally:
+        service.close()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+import vocab
+
+
+def random_docs(rng, n, words):
+    return [" ".join(rng.choice(words, rng.integers(0, 80))) for _ in range(n)]
+
+
+def random_words(rng, n):
+    letters = list("abcdefghijklmnopqrstuvwxyzéß")
+    return ["".join(rng.choice(letters, rng.integers(2, 9))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"norm": "l1"},
+    {"norm": None},
+    {"sublinear_tf": True},
+    {"binary": True},
+    {"lowercase": False},
+])
+def test_transform_is_bit_identical_to_sklearn(tmp_path, options):
+    rng = np.random.default_rng(11)
+    words = random_words(rng, 400)
+    vectorizer = TfidfVectorizer(**options).fit(random_docs(rng, 300, words[:300]))
+    path = str(tmp_path / "vectorizer.vocab")
+    vocab.export_vectorizer(vectorizer, path)
+    compact = vocab.load_vectorizer(path)
+
+    # Unseen words and upper case exercise the dropped-token and lowercase paths
+    texts = random_docs(rng, 200, words + [word.upper() for word in words[:50]]) + ["", "!!"]
+    expected = vectorizer.transform(texts)
+    expected.sort_indices()
+    actual = compact.transform(texts)
+    assert np.array_equal(actual.indptr, expected.indptr)
+    assert np.array_equal(actual.indices, expected.indices)
+    assert np.array_equal(actual.data, expected.data)
+    assert vocab.verify(vectorizer, compact, texts) == 0
+    compact.close()
+    assert compact.vocabulary.mm.closed
+
+
+@pytest.mark.parametrize("norm", ["l1", "l2"])
+def test_normalize_rows_is_bit_identical_to_sklearn(norm):
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        X = sp.random(50, 300, density=rng.uniform(0.0, 0.3), format="csr", random_state=rng,
+                      data_rvs=lambda k: rng.normal(0, rng.uniform(0.01, 100), k))
+        data = X.data.copy()
+        vocab.normalize_rows(data, X.indptr, norm)
+        assert np.array_equal(data, normalize(X, norm=norm).data)
+
+
+def test_index_round_trips_every_term(tmp_path):
+    rng = np.random.default_rng(7)
+    vectorizer = TfidfVectorizer().fit(random_docs(rng, 100, random_words(rng, 500)))
+    path = str(tmp_path / "vectorizer.vocab")
+    vocab.export_vectorizer(vectorizer, path)
+    table = vocab.MmapVocabulary(path)
+    assert len(table) == len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        assert table.index(term) == index
+        assert table[index] == term
+    assert table.index("not-a-term") == -1
+    table.close()
+    assert table.mm.closed
@@ -0,0 +1,55 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("fakenews.timing")
+
+# Stages of a single-article analysis, in execution order
+ANALYSIS_STAGES = ["analyze", "vectorize", "score", "reliability", "render"]
+
+
+class StageTimer:
+    """Wall-clock timings for the named stages of one request.
+
+    on_stage(name, timer) is called as each stage finishes, which lets a
+    progress display follow real completion instead of a fixed animation.
+    """
+
+    def __init__(self, stages=ANALYSIS_STAGES, on_stage=None):
+        self.stages = list(stages)
+        self.on_stage = on_stage
+        self.timings = {}
+        self._current = None
+
+    def start(self, name):
+        self._current = (name, time.perf_counter())
+
+    def stop(self):
+        name, started = self._current
+        self._current = None
+        self.timings[name] = time.perf_counter() - started
+        if self.on_stage is not None:
+            self.on_stage(name, self)
+
+    @contextmanager
+    def stage(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    @property
+    def fraction_done(self):
+        return min(len(self.timings) / max(1, len(self.stages)), 1.0)
+
+    @property
+    def total(self):
+        return sum(self.timings.values())
+
+    def summary(self):
+        return ", ".join(f"{name}={seconds * 1000:.2f}ms" for name, seconds in self.timings.items())
+
+    def log(self, level=logging.INFO, **context):
+        extra = "".join(f" {key}={value}" for key, value in context.items())
+        logger.log(level, "analysis total=%.2fms %s%s", self.total * 1000, self.summary(), extra)
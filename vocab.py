@@ -0,0 +1,349 @@
+"""Compact, memory-mappable replacement for the pickled TF-IDF vectorizer.
+
+Unpickling vectorizer.jb builds a Python dict with one str and one int
+object per vocabulary term in every process. This module exports the fitted
+vectorizer into a flat file instead:
+
+    magic | header length | JSON header | uint64 offsets[n + 1] | float64 idf[n]
+          | uint32 slots[m] | term blob
+
+sklearn numbers its features in sorted term order, so the blob holds the
+UTF-8 terms sorted by feature index. `slots` is an open-addressing hash
+table (CRC32 of the term, linear probing, m a power of two at least 2n)
+mapping terms to feature indices, so a lookup is one hash and usually one
+comparison. Files from the first format version have no table and fall
+back to a binary search over the blob. The loader maps the file read-only,
+so any number of processes share the same physical pages.
+
+    python vocab.py export vectorizer.jb vectorizer.vocab
+    python vocab.py verify vectorizer.jb vectorizer.vocab [corpus.jsonl]
+"""
+import argparse
+import json
+from collections import Counter
+import mmap
+import re
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+import scipy.sparse as sp
+
+MAGIC = b"FNVOCAB2"
+MAGIC_V1 = b"FNVOCAB1"
+EMPTY_SLOT = 0xFFFFFFFF
+
+# Vectorizer settings the compact transform reproduces exactly
+SUPPORTED_PARAMS = {
+    "analyzer": "word",
+    "ngram_range": (1, 1),
+    "stop_words": None,
+    "preprocessor": None,
+    "tokenizer": None,
+    "strip_accents": None,
+    "use_idf": True,
+}
+
+
+def _pad8(n):
+    return (8 - n % 8) % 8
+
+
+def export_vectorizer(vectorizer, path):
+    params = vectorizer.get_params()
+    for name, expected in SUPPORTED_PARAMS.items():
+        if params[name] != expected:
+            raise ValueError(f"Unsupported vectorizer setting {name}={params[name]!r}")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    encoded = [term.encode("utf-8") for term in terms]
+    # Binary search over the blob relies on byte order matching index order,
+    # which holds because UTF-8 preserves code point order
+    if any(a >= b for a, b in zip(encoded, encoded[1:])):
+        raise ValueError("Vocabulary indices are not in sorted term order")
+
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(term) for term in encoded], out=offsets[1:])
+    slots = build_slots(encoded)
+    header = json.dumps({
+        "n_terms": len(encoded),
+        "n_slots": len(slots),
+        "lowercase": params["lowercase"],
+        "token_pattern": params["token_pattern"],
+        "norm": params["norm"],
+        "sublinear_tf": params["sublinear_tf"],
+        "binary": params["binary"],
+    }).encode("utf-8")
+    header += b" " * _pad8(len(MAGIC) + 4 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(np.asarray(vectorizer.idf_, dtype="<f8").tobytes())
+        f.write(slots.tobytes())
+        f.write(b"".join(encoded))
+
+
+def build_slots(encoded):
+    # Open-addressing table at most half full; see MmapVocabulary.index
+    n_slots = 2
+    while n_slots < 2 * len(encoded):
+        n_slots *= 2
+    mask = n_slots - 1
+    slots = np.full(n_slots, EMPTY_SLOT, dtype="<u4")
+    for index, term in enumerate(encoded):
+        slot = zlib.crc32(term) & mask
+        while slots[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        slots[slot] = index
+    return slots
+
+
+class TermTable:
+    """Term <-> feature index lookups over a UTF-8 term blob.
+
+    Term i is data[base + offsets[i]:base + offsets[i + 1]], and `slots` is
+    the hash table from build_slots, or None to binary search a blob in
+    sorted order. No per-term Python objects are kept.
+    """
+
+    def __init__(self, data, offsets, slots=None, base=0):
+        self.data = data
+        self.offsets = offsets
+        self.slots = slots
+        self.mask = len(slots) - 1 if slots is not None else -1
+        self.blob_start = base
+        self.n_terms = len(offsets) - 1
+
+    @classmethod
+    def from_terms(cls, terms):
+        # In-memory table for a term list in feature index order
+        encoded = [term.encode("utf-8") for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+        np.cumsum([len(term) for term in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), memoryview(offsets).cast("B").cast("Q"),
+                   memoryview(build_slots(encoded)).cast("B").cast("I"))
+
+    def __len__(self):
+        return self.n_terms
+
+    def term(self, index):
+        base = self.blob_start
+        return self.data[base + self.offsets[index]:base + self.offsets[index + 1]].decode("utf-8")
+
+    def __getitem__(self, index):
+        # Lets the table stand in for a term array (see explain.feature_terms)
+        return self.term(int(index))
+
+    def index(self, term):
+        # Hash table lookup; -1 when the term is unknown
+        key = term.encode("utf-8")
+        data, offsets, base, slots, mask = self.data, self.offsets, self.blob_start, self.slots, self.mask
+        if slots is None:
+            return self._search(key)
+        slot = zlib.crc32(key) & mask
+        while True:
+            index = slots[slot]
+            if index == EMPTY_SLOT:
+                return -1
+            if data[base + offsets[index]:base + offsets[index + 1]] == key:
+                return index
+            slot = (slot + 1) & mask
+
+    def _search(self, key):
+        # Binary search the sorted blob, for files without a hash table
+        data, offsets, base = self.data, self.offsets, self.blob_start
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = data[base + offsets[mid]:base + offsets[mid + 1]]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+
+class MmapVocabulary(TermTable):
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"{path} is not a compact vocabulary file")
+        (header_len,) = struct.unpack_from("<I", self.mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self.mm[start:start + header_len])
+        n = self.header["n_terms"]
+
+        pos = start + header_len
+        self.view = view = memoryview(self.mm)
+        offsets = view[pos:pos + 8 * (n + 1)].cast("Q")
+        pos += 8 * (n + 1)
+        self.idf = np.frombuffer(self.mm, dtype="<f8", count=n, offset=pos)
+        pos += 8 * n
+        n_slots = self.header.get("n_slots", 0)
+        slots = view[pos:pos + 4 * n_slots].cast("I") if n_slots else None
+        super().__init__(self.mm, offsets, slots, base=pos + 4 * n_slots)
+
+    def close(self):
+        # The idf array and the views pin the mapping; an idf array still
+        # referenced elsewhere leaves the unmap to garbage collection
+        self.offsets.release()
+        if self.slots is not None:
+            self.slots.release()
+        self.view.release()
+        self.idf = None
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+
+
+class MmapTfidfVectorizer:
+    """Drop-in for the fitted TfidfVectorizer's transform().
+
+    Produces the same CSR matrix (feature indices and values) as the
+    pickled vectorizer without ever building the vocabulary dict.
+    """
+
+    def __init__(self, path):
+        self.vocabulary = MmapVocabulary(path)
+        header = self.vocabulary.header
+        self.idf_ = self.vocabulary.idf
+        self.lowercase = header["lowercase"]
+        self.token_re = re.compile(header["token_pattern"])
+        self.norm = header["norm"]
+        self.sublinear_tf = header["sublinear_tf"]
+        self.binary = header["binary"]
+
+    def tokenize(self, text):
+        return self.token_re.findall(text.lower() if self.lowercase else text)
+
+    def transform(self, texts):
+        return self.transform_tokens(self.tokenize(text) for text in texts)
+
+    def transform_tokens(self, token_lists):
+        return tfidf_matrix(token_lists, self.vocabulary.index, self.idf_, self.norm,
+                            self.sublinear_tf, self.binary)
+
+    def close(self):
+        self.idf_ = None
+        self.vocabulary.close()
+
+
+def tfidf_matrix(token_lists, index_of, idf, norm="l2", sublinear_tf=False, binary=False):
+    # Build count rows from token lists, resolving each distinct token once
+    # per call through index_of (-1 drops the token), then apply idf
+    # weighting and row normalization the way TfidfTransformer does.
+    # Counter tallies each document in C; the only Python-level work is one
+    # index_of call per distinct token in the batch.
+    keys, counts, lengths = [], [], []
+    for tokens in token_lists:
+        tally = Counter(tokens)
+        keys.extend(tally)
+        counts.extend(tally.values())
+        lengths.append(len(tally))
+
+    lookup = {token: index_of(token) for token in set(keys)}
+    indices = np.fromiter(map(lookup.__getitem__, keys), dtype=np.int64, count=len(keys))
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    known = indices >= 0
+    # Distinct tokens can share an index (hashing collisions); the CSR
+    # conversion sums those and sorts each row's indices
+    X = sp.coo_matrix((np.asarray(counts, dtype=np.float64)[known], (rows[known], indices[known])),
+                      shape=(len(lengths), len(idf))).tocsr()
+    X.sum_duplicates()
+    data = X.data
+    if binary:
+        data[:] = 1.0
+    if sublinear_tf:
+        np.log(data, data)
+        data += 1.0
+    data *= idf[X.indices]
+    if norm:
+        normalize_rows(data, X.indptr, norm)
+    return X
+
+
+def normalize_rows(data, indptr, norm):
+    # In-place row normalization matching sklearn.preprocessing.normalize.
+    # bincount accumulates each row's entries sequentially, in order, as
+    # sklearn's kernel does, so the results are bit-identical rather than
+    # merely close.
+    n_rows = len(indptr) - 1
+    rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+    if norm == "l2":
+        totals = np.sqrt(np.bincount(rows, weights=data * data, minlength=n_rows))
+    elif norm == "l1":
+        totals = np.bincount(rows, weights=np.abs(data), minlength=n_rows)
+    else:
+        raise ValueError(f"Unsupported norm {norm!r}")
+    totals[totals == 0] = 1.0
+    data /= totals[rows]
+
+
+def load_vectorizer(path):
+    return MmapTfidfVectorizer(path)
+
+
+def verify(vectorizer, compact, texts):
+    # Returns the number of rows whose CSR structure or values differ
+    expected = vectorizer.transform(texts)
+    actual = compact.transform(texts)
+    mismatches = 0
+    for i in range(len(texts)):
+        a, b = expected[i], actual[i]
+        a.sort_indices()
+        if not (np.array_equal(a.indices, b.indices) and np.array_equal(a.data, b.data)):
+            mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or verify a compact vocabulary file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Write a .vocab file from a pickled vectorizer")
+    export.add_argument("vectorizer")
+    export.add_argument("output")
+    check = sub.add_parser("verify", help="Compare a .vocab file against the pickled vectorizer")
+    check.add_argument("vectorizer")
+    check.add_argument("compact")
+    check.add_argument("corpus", nargs="?", help="Optional JSONL corpus with a 'text' field")
+    check.add_argument("--limit", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    start = time.perf_counter()
+    vectorizer = joblib.load(args.vectorizer)
+    pickle_time = time.perf_counter() - start
+
+    if args.command == "export":
+        export_vectorizer(vectorizer, args.output)
+        print(f"wrote {args.output} ({len(vectorizer.vocabulary_)} terms)")
+        return
+
+    start = time.perf_counter()
+    compact = load_vectorizer(args.compact)
+    compact_time = time.perf_counter() - start
+    print(f"load time: pickle {pickle_time * 1000:.1f} ms, compact {compact_time * 1000:.2f} ms")
+
+    from pipeline import CANARY_TEXTS
+    texts = list(CANARY_TEXTS)
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            for line, _ in zip(f, range(args.limit)):
+                texts.append(json.loads(line).get("text") or "")
+    mismatches = verify(vectorizer, compact, texts)
+    print(f"{len(texts) - mismatches}/{len(texts)} documents identical")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()